@@ -1,25 +1,36 @@
 import tkinter as tk
 from tkinter import ttk
 from tkcalendar import DateEntry
-import json
-import os
 from datetime import datetime
 import tkinter.simpledialog
+from procurement import procurement_service
+from data_table import DataTable
+from atomic_io import load_data, save_data
+from storage import get_storage
+from io_worker import io_worker
+from events import event_bus, DATA_CHANGED
+from supplier_performance import summary_text
 
 class PRRise:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
         self.selected_items = []
+        self.items_table = None
         self.supplier_history = self.load_supplier_history()
+        self.storage = get_storage(department_name)
+        self.performance = None
         self.create_interface()
+        self.load_supplier_performance()
+        
+        # Deliveries recorded in Pending Materials and other LPO changes update the figures
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.load_supplier_performance(),
+                            self.supplier_stats_label, department=department_name, collection='lpo')
     
     def load_supplier_history(self):
         """Load supplier history from file"""
         try:
-            if os.path.exists('supplier_history.json'):
-                with open('supplier_history.json', 'r') as f:
-                    return json.load(f)
+            return load_data('supplier_history.json', [])
         except:
             pass
         return []
@@ -27,8 +38,7 @@ class PRRise:
     def save_supplier_history(self):
         """Save supplier history to file"""
         try:
-            with open('supplier_history.json', 'w') as f:
-                json.dump(self.supplier_history, f)
+            save_data('supplier_history.json', self.supplier_history)
         except:
             pass
     
@@ -143,6 +153,27 @@ class PRRise:
                                       font=('Inter', 10, 'bold'))
         self.required_date.pack(anchor='w')
         
+        # Supplier section with the supplier's delivery record
+        supplier_section = tk.Frame(content_area, bg='#1e293b')
+        supplier_section.pack(fill='x', pady=(0, 20))
+        
+        tk.Label(supplier_section, text="🏢 SUPPLIER", 
+                font=('Inter', 11, 'bold'), bg='#1e293b', fg='#06b6d4').pack(anchor='w', pady=(0, 8))
+        
+        supplier_row = tk.Frame(supplier_section, bg='#1e293b')
+        supplier_row.pack(fill='x')
+        
+        self.supplier_var = tk.StringVar()
+        self.supplier_combo = ttk.Combobox(supplier_row, textvariable=self.supplier_var, width=28,
+                                           values=sorted(self.supplier_history), font=('Inter', 10))
+        self.supplier_combo.pack(side='left')
+        self.supplier_combo.bind('<<ComboboxSelected>>', lambda e: self.show_supplier_performance())
+        self.supplier_combo.bind('<KeyRelease>', lambda e: self.show_supplier_performance())
+        
+        self.supplier_stats_label = tk.Label(supplier_row, text="", font=('Inter', 9),
+                                             bg='#1e293b', fg='#94a3b8', anchor='w', justify='left')
+        self.supplier_stats_label.pack(side='left', fill='x', expand=True, padx=(15, 0))
+        
         # Description section
         desc_section = tk.Frame(content_area, bg='#1e293b')
         desc_section.pack(fill='x')
@@ -212,8 +243,33 @@ class PRRise:
                  command=self.submit_pr).pack(side='right', padx=5, ipady=8, ipadx=15)
     
     def show_supplier_dropdown(self):
-        """Show supplier dropdown"""
-        pass
+        """Offer the suppliers used before and those with LPOs"""
+        names = set(self.supplier_history)
+        if self.performance is not None:
+            names.update(self.performance.names())
+        self.supplier_combo.configure(values=sorted(names))
+    
+    def load_supplier_performance(self):
+        """Get the supplier statistics on the I/O worker (built there the first time, or after
+        an outside change; storage keeps them current otherwise)"""
+        io_worker.submit(self.supplier_stats_label, self.storage.supplier_performance,
+                         self.supplier_performance_loaded,
+                         lambda e: print(f"Error loading supplier performance: {e}"))
+    
+    def supplier_performance_loaded(self, performance):
+        self.performance = performance
+        self.show_supplier_dropdown()
+        self.show_supplier_performance()
+    
+    def show_supplier_performance(self):
+        """Lead time, on-time and fill rate of the supplier being entered"""
+        supplier = self.supplier_var.get().strip()
+        if not supplier or self.performance is None:
+            self.supplier_stats_label.config(text="")
+            return
+        # Storage updates its statistics with each delivery, or rebuilds them after an outside change
+        self.performance = self.storage.supplier_performance()
+        self.supplier_stats_label.config(text=summary_text(self.performance.stats(supplier)))
     
     def show_empty_message(self):
         """Show empty message when no items selected"""
@@ -223,6 +279,7 @@ class PRRise:
     def update_selected_items(self, items):
         """Update the selected items list - keep section empty until Next is clicked"""
         self.selected_items = items
+        self.items_table = None
         
         # Clear existing content
         for widget in self.scrollable_frame.winfo_children():
@@ -243,6 +300,8 @@ class PRRise:
         self.update_selected_items(self.selected_items)
 
         self.pr_var.set("")
+        self.supplier_var.set("")
+        self.show_supplier_performance()
         self.description_text.delete('1.0', 'end')
         self.request_date.set_date(datetime.now().date())
         self.required_date.set_date(datetime.now().date())
@@ -274,6 +333,7 @@ class PRRise:
             'department': self.department_name,
             'request_date': self.request_date.get(),
             'required_date': self.required_date.get(),
+            'supplier_name': self.supplier_var.get().strip(),
 
             'description': self.description_text.get('1.0', 'end-1c').strip(),
             'status': 'Pending Approval',
@@ -286,9 +346,9 @@ class PRRise:
         # Add items with quantities
         for i, item in enumerate(self.selected_items):
             quantity = 1
-            if hasattr(self, 'quantity_vars') and i < len(self.quantity_vars):
+            if self.items_table is not None:
                 try:
-                    quantity = int(self.quantity_vars[i].get())
+                    quantity = int(self.items_table.get(str(i), 'quantity'))
                 except:
                     quantity = 1
             
@@ -303,24 +363,17 @@ class PRRise:
         
         print(f"DEBUG: PR data created: {pr_data}")
         
-        # Save to pending PRs JSON file directly
+        # Save to pending PRs store
         try:
-            data_file = f"pending_prs_{self.department_name.lower().replace(' ', '_')}.json"
+            procurement_service(self.department_name).submit_pr(pr_data)
             
-            # Load existing PRs
-            existing_prs = []
-            if os.path.exists(data_file):
-                with open(data_file, 'r', encoding='utf-8') as f:
-                    existing_prs = json.load(f)
+            # Remember the supplier for the dropdown
+            if pr_data['supplier_name'] and pr_data['supplier_name'] not in self.supplier_history:
+                self.supplier_history.append(pr_data['supplier_name'])
+                self.save_supplier_history()
+                self.show_supplier_dropdown()
             
-            # Add new PR
-            existing_prs.append(pr_data)
-            
-            # Save back to file
-            with open(data_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_prs, f, indent=2, ensure_ascii=False)
-            
-            print(f"DEBUG: PR saved to {data_file}")
+            print(f"DEBUG: PR {pr_data['pr_number']} saved to pending PRs")
             
             # Show success message
             import tkinter.messagebox as messagebox
@@ -344,94 +397,22 @@ class PRRise:
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         
-        # Create table frame
-        table_frame = tk.Frame(self.scrollable_frame, bg='white')
-        table_frame.pack(fill='both', expand=True, padx=5, pady=5)
-        
-        # Create headers
-        headers = ['S.No', 'Resource Code', 'Description', 'Unit', 'Quantity']
-        header_frame = tk.Frame(table_frame, bg='#3498db')
-        header_frame.pack(fill='x')
-        
-        for col, header in enumerate(headers):
-            tk.Label(header_frame, text=header, font=('Arial', 10, 'bold'),
-                    bg='#3498db', fg='white', relief='solid', bd=1).grid(
-                    row=0, column=col, sticky='nsew', padx=0, pady=0)
-        
-        # Configure column weights
-        header_frame.grid_columnconfigure(0, weight=0, minsize=50)
-        header_frame.grid_columnconfigure(1, weight=1, minsize=120)
-        header_frame.grid_columnconfigure(2, weight=3, minsize=250)
-        header_frame.grid_columnconfigure(3, weight=0, minsize=80)
-        header_frame.grid_columnconfigure(4, weight=0, minsize=80)
-        
-        # Store quantity variables
-        self.quantity_vars = []
-        
-        # Create rows with editable quantity WITH VALIDATION
-        for i, item in enumerate(items, 1):
-            row_frame = tk.Frame(table_frame, bg='white')
-            row_frame.pack(fill='x')
-            
-            # S.No
-            tk.Label(row_frame, text=str(i), font=('Arial', 9),
-                    bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                    row=0, column=0, sticky='nsew', padx=0, pady=0)
-            
-            # Resource Code
-            tk.Label(row_frame, text=item.get('resource_code', 'N/A'), font=('Arial', 9),
-                    bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                    row=0, column=1, sticky='nsew', padx=0, pady=0)
-            
-            # Description
-            tk.Label(row_frame, text=item.get('item_description', 'N/A'), font=('Arial', 9),
-                    bg='white', fg='#2c3e50', relief='solid', bd=1, wraplength=250).grid(
-                    row=0, column=2, sticky='nsew', padx=0, pady=0)
-            
-            # Unit
-            tk.Label(row_frame, text=item.get('unit', 'N/A'), font=('Arial', 9),
-                    bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                    row=0, column=3, sticky='nsew', padx=0, pady=0)
-            
-            # Quantity (Editable Entry WITH VALIDATION)
-            qty_var = tk.StringVar(value='0')
-            self.quantity_vars.append(qty_var)
-            
-            qty_entry = tk.Entry(row_frame, textvariable=qty_var, font=('Arial', 9),
-                               justify='center', width=8)
-            qty_entry.grid(row=0, column=4, sticky='nsew', padx=1, pady=1)
-            
-            # Add validation with available quantity
-            available_qty = item.get('available', 0)
-            if available_qty > 0:
-                qty_var.trace('w', lambda *args, var=qty_var, aq=available_qty: self.validate_quantity(var, aq))
-                qty_entry.bind('<FocusOut>', lambda e, var=qty_var, aq=available_qty: self.validate_quantity(var, aq))
-                
-                # Add tooltip on hover (positioned below)
-                def show_tooltip(event, aq=available_qty):
-                    tooltip = tk.Toplevel()
-                    tooltip.wm_overrideredirect(True)
-                    tooltip.configure(bg='#ffffcc', relief='solid', bd=1)
-                    tk.Label(tooltip, text=f"Max Available: {aq}", bg='#ffffcc', font=('Arial', 8)).pack(padx=3, pady=1)
-                    x = event.widget.winfo_rootx()
-                    y = event.widget.winfo_rooty() + event.widget.winfo_height() + 5
-                    tooltip.geometry(f"+{x}+{y}")
-                    event.widget.tooltip = tooltip
-                
-                def hide_tooltip(event):
-                    if hasattr(event.widget, 'tooltip'):
-                        event.widget.tooltip.destroy()
-                        delattr(event.widget, 'tooltip')
-                
-                qty_entry.bind('<Enter>', show_tooltip)
-                qty_entry.bind('<Leave>', hide_tooltip)
-            
-            # Configure column weights for each row
-            row_frame.grid_columnconfigure(0, weight=0, minsize=50)
-            row_frame.grid_columnconfigure(1, weight=1, minsize=120)
-            row_frame.grid_columnconfigure(2, weight=3, minsize=250)
-            row_frame.grid_columnconfigure(3, weight=0, minsize=80)
-            row_frame.grid_columnconfigure(4, weight=0, minsize=80)
+        # One Treeview for all rows; only the quantity cell is editable
+        columns = [
+            {'id': 'sno', 'text': 'S.No', 'width': 50},
+            {'id': 'resource_code', 'text': 'Resource Code', 'width': 120},
+            {'id': 'item_description', 'text': 'Description', 'width': 250, 'anchor': 'w', 'stretch': True},
+            {'id': 'unit', 'text': 'Unit', 'width': 80},
+            {'id': 'quantity', 'text': 'Quantity', 'width': 80, 'editable': True}
+        ]
+        self.items_table = DataTable(self.scrollable_frame, columns, heading_bg='#3498db',
+                                     on_edit=self.edit_quantity, tooltip=self.quantity_tooltip)
+        self.items_table.pack(fill='both', expand=True, padx=5, pady=5)
+        
+        for i, item in enumerate(items):
+            self.items_table.insert((i + 1, item.get('resource_code', 'N/A'), item.get('item_description', 'N/A'),
+                                     item.get('unit', 'N/A'), '0'), iid=str(i))
+        self.items_table.fit_height()
         
         # Update header count
         self.items_header_label.configure(text=f"Selected Items ({len(items)})")
@@ -442,29 +423,46 @@ class PRRise:
         
         print(f"DEBUG: Items table created successfully with {len(items)} items")
     
-    def validate_quantity(self, qty_var, available_qty):
-        """Validate quantity against available stock"""
+    def edit_quantity(self, row_id, column_id, value):
+        """Validate an edited quantity against the available stock"""
+        available_qty = self.selected_items[int(row_id)].get('available', 0)
+        if available_qty > 0:
+            return self.validate_quantity(value, available_qty)
+        return value
+    
+    def quantity_tooltip(self, row_id, column_id):
+        """Show the available stock when hovering a quantity cell"""
+        if column_id != 'quantity' or not row_id:
+            return None
+        available_qty = self.selected_items[int(row_id)].get('available', 0)
+        if available_qty > 0:
+            return f"Max Available: {available_qty}"
+        return None
+    
+    def validate_quantity(self, value, available_qty):
+        """Validate quantity against available stock, returning the corrected value"""
         try:
-            value = qty_var.get().strip()
+            value = value.strip()
             if not value:
-                return
+                return value
             
             requested_qty = float(value)
             
             # Check if quantity exceeds available
             if requested_qty > available_qty:
                 # Show warning and auto-correct
-                qty_var.set(str(int(available_qty)))
                 self.show_warning(f"⚠️ Quantity corrected to maximum available: {int(available_qty)}")
+                return str(int(available_qty))
             elif requested_qty < 0:
                 # Correct to minimum value
-                qty_var.set('0')
                 self.show_warning("⚠️ Quantity cannot be negative. Set to 0.")
+                return '0'
+            return value
                 
         except ValueError:
             # Invalid input, reset to 0
-            qty_var.set('0')
             self.show_warning("⚠️ Invalid quantity. Set to 0.")
+            return '0'
     
     def show_warning(self, message):
         """Show warning message briefly"""
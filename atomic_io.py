@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+
+# Previous versions kept next to a data file as <file>.bak1 (newest) .. <file>.bak<n>
+DEFAULT_BACKUPS = 2
+
+# On-disk formats: indented JSON, minified JSON, or MessagePack (needs the msgpack package).
+# Reading recognises each of them, so changing the format needs no conversion.
+PRETTY = 'pretty'
+COMPACT = 'compact'
+MSGPACK = 'msgpack'
+FORMATS = (PRETTY, COMPACT, MSGPACK)
+DEFAULT_FORMAT = COMPACT
+
+_msgpack = None
+_msgpack_missing = False
+
+
+def load_msgpack():
+    """The msgpack module, or None when it is not installed (reported once)"""
+    global _msgpack, _msgpack_missing
+    if _msgpack is None and not _msgpack_missing:
+        try:
+            import msgpack
+            _msgpack = msgpack
+        except ImportError:
+            _msgpack_missing = True
+            print("msgpack is not installed; writing compact JSON instead (pip install msgpack)")
+    return _msgpack
+
+
+def serialize(data, format=DEFAULT_FORMAT):
+    """File contents (bytes) for data in one of FORMATS"""
+    if format == MSGPACK:
+        msgpack = load_msgpack()
+        if msgpack is not None:
+            return msgpack.packb(data, use_bin_type=True)
+        format = COMPACT
+    if format == COMPACT:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def deserialize(raw):
+    """Data from file contents in any of FORMATS; ValueError when they cannot be parsed.
+
+    Stored documents are lists or objects, so JSON starts with '[' or '{' and
+    anything else is MessagePack.
+    """
+    if raw.lstrip()[:1] in (b'[', b'{', b''):
+        return json.loads(raw.decode('utf-8'))
+    msgpack = load_msgpack()
+    if msgpack is None:
+        raise ValueError("file is in MessagePack format; install msgpack to read it")
+    return msgpack.unpackb(raw, raw=False)
+
+
+def backup_path(path, number):
+    return f"{path}.bak{number}"
+
+
+def fsync_directory(directory):
+    """Make a rename in directory durable (not possible on Windows, where it is skipped)"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def rotate_backups(path, backups):
+    """Shift the backups up by one and keep the current file as backup 1"""
+    if backups <= 0 or not os.path.exists(path):
+        return
+    for number in range(backups, 1, -1):
+        if os.path.exists(backup_path(path, number - 1)):
+            os.replace(backup_path(path, number - 1), backup_path(path, number))
+    newest = backup_path(path, 1)
+    if os.path.exists(newest):
+        os.remove(newest)
+    try:
+        # A hard link keeps the old contents without copying them; the rename
+        # below only swaps which file the name points to
+        os.link(path, newest)
+    except (OSError, AttributeError):
+        shutil.copy2(path, newest)
+
+
+def write_atomic(path, content, backups=DEFAULT_BACKUPS):
+    """Replace path with content (bytes) so that a crash leaves either the old or the new file.
+
+    The content goes to a temporary file in the same directory, is flushed to disk,
+    and is then renamed over path.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        rotate_backups(path, backups)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(directory)
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return deserialize(f.read())
+
+
+def save_data(path, data, backups=DEFAULT_BACKUPS, format=DEFAULT_FORMAT):
+    """Serialize data first, then write it atomically (a failed dump leaves the file alone)"""
+    write_atomic(path, serialize(data, format), backups)
+
+
+def load_data(path, default=None, backups=DEFAULT_BACKUPS):
+    """Parse a data file; if it is unreadable, fall back to its newest readable backup.
+
+    Returns default when the file does not exist. Raises the original error when
+    neither the file nor any backup can be parsed.
+    """
+    if not os.path.exists(path):
+        return default
+    try:
+        return read_file(path)
+    except ValueError as error:
+        for number in range(1, backups + 1):
+            candidate = backup_path(path, number)
+            if not os.path.exists(candidate):
+                continue
+            try:
+                data = read_file(candidate)
+            except ValueError:
+                continue
+            print(f"Error reading {path}: {error}; recovered from {candidate}")
+            return data
+        raise
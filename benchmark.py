@@ -0,0 +1,327 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from document_cache import document_cache
+from storage import JsonStorage, JournalStorage, SQLiteStorage, SQLiteDatabase, TRENDS, find_trend
+
+# python benchmark.py [--items 100,10000] [--backend json,journal,sqlite] [--ui]
+#                     [--output results.json] [--compare previous.json]
+DEFAULT_SIZES = [100, 10000]
+BACKENDS = ('json', 'journal', 'sqlite')
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+ITEMS_PER_RECORD = 10
+PRICES_PER_TREND = 5
+SUPPLIERS = ['Gulf Steel', 'Al Noor Trading', 'Emirates Cables', 'Delta Pipes', 'Falcon Electric']
+WORDS = ['pipe', 'cable', 'valve', 'elbow', 'socket', 'duct', 'bracket', 'clamp', 'sensor', 'panel']
+SEARCHES = ['gulf', 'pipe 10', 'RC000', 'LPO-0001', 'no such thing']
+
+
+def item_description(code):
+    return f"{WORDS[code % len(WORDS)]} {WORDS[code // len(WORDS) % len(WORDS)]} {code}"
+
+
+def make_item(rng, codes):
+    code = rng.randrange(codes)
+    return {
+        'resource_code': f"RC{code:05d}",
+        'item_description': item_description(code),
+        'unit': 'Nos',
+        'quantity': rng.randint(1, 100)
+    }
+
+
+def make_pr(rng, number, codes, status='Pending Approval'):
+    return {
+        'pr_number': f"PR{number:06d}",
+        'date': '01/01/2025',
+        'description': f"Materials for block {number % 40}",
+        'status': status,
+        'items': [make_item(rng, codes) for _ in range(ITEMS_PER_RECORD)]
+    }
+
+
+def make_lpo(rng, number, codes, priced=False):
+    items = [make_item(rng, codes) for _ in range(ITEMS_PER_RECORD)]
+    if priced:
+        for item in items:
+            item['unit_price'] = f"{rng.uniform(1, 500):.2f}"
+    deliveries = []
+    for day in range(rng.randint(0, 3)):
+        deliveries.append({
+            'date': f"2025-01-{day + 1:02d}",
+            'items': {item['resource_code']: rng.randint(0, item['quantity']) for item in items}
+        })
+    return {
+        'lpo_number': f"LPO-{number:06d}",
+        'manual_lpo_number': f"M{number:06d}",
+        'pr_number': f"PR{number:06d}",
+        'supplier_name': SUPPLIERS[number % len(SUPPLIERS)],
+        'description': f"Supply for block {number % 40}",
+        'date': '02/01/2025',
+        'items': items,
+        'deliveries': deliveries
+    }
+
+
+def make_dataset(line_items, seed=1):
+    """Synthetic department data with line_items items in each PR/LPO collection"""
+    rng = random.Random(seed)
+    records = max(1, line_items // ITEMS_PER_RECORD)
+    codes = max(10, line_items // ITEMS_PER_RECORD)
+    trends = {}
+    for code in range(codes):
+        resource_code = f"RC{code:05d}"
+        description = item_description(code)
+        trends[f"{resource_code}_{description}"] = {
+            'resource_code': resource_code,
+            'item_description': description,
+            'unit': 'Nos',
+            'price_history': [{'price': round(rng.uniform(1, 500), 2), 'unit': 'Nos',
+                               'date': f"{day + 1:02d}/01/2025"} for day in range(PRICES_PER_TREND)]
+        }
+    return {
+        'pending_prs': [make_pr(rng, n, codes) for n in range(records)],
+        'rejected_prs': [make_pr(rng, records + n, codes, 'Rejected') for n in range(records)],
+        'lpo': [make_lpo(rng, n, codes) for n in range(records)],
+        'archived_lpos': [make_lpo(rng, records + n, codes, priced=True) for n in range(records)],
+        TRENDS: trends
+    }
+
+
+def open_storage(backend, department_name):
+    settings = {'backend': backend, 'database': 'benchmark.db'}
+    if backend == 'json':
+        return JsonStorage(department_name, settings)
+    if backend == 'journal':
+        return JournalStorage(department_name, settings)
+    return SQLiteStorage(department_name, SQLiteDatabase(settings['database']), settings, auto_migrate=False)
+
+
+class Run:
+    """Times operations and collects the results of one benchmark run"""
+
+    def __init__(self):
+        self.results = []
+
+    def time(self, backend, line_items, operation, func, repeat=1):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        seconds = time.perf_counter() - start
+        result = {
+            'backend': backend,
+            'line_items': line_items,
+            'operation': operation,
+            'repeat': repeat,
+            'seconds': round(seconds, 6),
+            'per_op_ms': round(seconds * 1000 / repeat, 4)
+        }
+        self.results.append(result)
+        print(f"{backend:8} {line_items:>9} {operation:28} {result['per_op_ms']:>12.3f} ms")
+        return result
+
+
+def bench_storage(run, backend, line_items, data):
+    storage = open_storage(backend, f"Bench {line_items}")
+    collections = ['pending_prs', 'rejected_prs', 'lpo', 'archived_lpos']
+
+    def save_all():
+        for collection in collections:
+            storage.save(collection, data[collection])
+        if backend != 'sqlite':
+            storage.save(TRENDS, data[TRENDS])
+
+    run.time(backend, line_items, 'save all collections', save_all)
+    if backend == 'sqlite':
+        # The database keeps trends as rows, written through record_price
+        def record_trends():
+            with storage.transaction():
+                for trend in data[TRENDS].values():
+                    for entry in trend['price_history']:
+                        storage.record_price(trend['resource_code'], trend['item_description'],
+                                             trend['unit'], entry['price'])
+        run.time(backend, line_items, 'save trends', record_trends)
+
+    def cold_load():
+        document_cache.entries.clear()
+        for collection in collections:
+            storage.load(collection)
+        storage.load_trends()
+
+    run.time(backend, line_items, 'load all (cold)', cold_load)
+    run.time(backend, line_items, 'load all (cached)', lambda: [storage.load(c) for c in collections], repeat=10)
+
+    lpos = storage.load('lpo')
+    storage.ledger = None
+    run.time(backend, line_items, 'delivery status (all LPOs)',
+             lambda: [storage.delivery_status(lpo) for lpo in lpos])
+    run.time(backend, line_items, 'delivery status (cached)',
+             lambda: [storage.delivery_status(lpo) for lpo in lpos], repeat=5)
+
+    storage.search_indexes = None
+    run.time(backend, line_items, 'search index build', lambda: storage.search_index('lpo'))
+    run.time(backend, line_items, 'search queries',
+             lambda: [storage.search('lpo', query) for query in SEARCHES], repeat=20)
+
+    trends = storage.load_trends()
+    items = [item for lpo in lpos[:100] for item in lpo['items']]
+    run.time(backend, line_items, f"trend lookup x{len(items)}",
+             lambda: [find_trend(trends, item['resource_code'], item['item_description']) for item in items])
+    storage.prices = None
+    run.time(backend, line_items, 'price index build', storage.price_index)
+    run.time(backend, line_items, f"unit rates x{len(items)}", lambda: storage.unit_rates(items), repeat=20)
+    try:
+        from price_analytics import PriceAnalytics
+        run.time(backend, line_items, 'price analytics (all items)', lambda: PriceAnalytics(trends))
+    except ImportError as e:
+        print(f"Skipping price analytics: {e}")
+
+    storage.rollup = None
+    run.time(backend, line_items, 'spend rollup build', storage.spend_rollup)
+    run.time(backend, line_items, 'spend queries',
+             lambda: [storage.spend_rollup().total(supplier) for supplier in SUPPLIERS], repeat=20)
+
+    lpo = dict(lpos[0], lpo_number='LPO-BENCH', items=[dict(item, unit_price='12.50') for item in lpos[0]['items']])
+
+    def costing():
+        storage.insert('archived_lpos', lpo)
+        storage.record_prices([(item['resource_code'], item['item_description'], item['unit'], item['unit_price'])
+                               for item in lpo['items']])
+        storage.delete('archived_lpos', lpo['lpo_number'])
+
+    run.time(backend, line_items, 'costing (archive + prices)', costing)
+
+    key = lpos[len(lpos) // 2]['lpo_number']
+    delivery = {'date': '2025-02-01', 'items': {lpos[len(lpos) // 2]['items'][0]['resource_code']: 1}}
+    run.time(backend, line_items, 'add delivery', lambda: storage.add_delivery(key, delivery), repeat=5)
+    run.time(backend, line_items, 'update fields',
+             lambda: storage.update_fields('pending_prs', data['pending_prs'][0]['pr_number'],
+                                           {'description': 'Benchmark'}), repeat=5)
+
+
+def table_rows(lpos):
+    """(iid, (code, description, quantity)) rows of the LPOs' items, as DataTable.set_rows takes them"""
+    items = [item for lpo in lpos for item in lpo['items']]
+    return [(str(i), (item['resource_code'], item['item_description'], item['quantity']))
+            for i, item in enumerate(items)]
+
+
+def bench_ui(run, line_items, data):
+    """Card and table renders (needs a display)"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"Skipping UI benchmarks: {e}")
+        return
+    from card_grid import CardList, VirtualCardGrid
+    from data_table import DataTable
+
+    root.withdraw()
+    lpos = data['lpo']
+
+    def build_card(frame, lpo):
+        tk.Label(frame, text=lpo['lpo_number'], bg='white').pack(anchor='w')
+        tk.Label(frame, text=lpo['supplier_name'], bg='white').pack(anchor='w')
+
+    shown = lpos[:500]
+    frame = tk.Frame(root)
+    cards = CardList(frame, build_card, key=lambda lpo: lpo['lpo_number'])
+    run.time('tk', line_items, f"card list build x{len(shown)}",
+             lambda: (cards.set_items(shown), root.update_idletasks()))
+    run.time('tk', line_items, 'card list reconcile',
+             lambda: (cards.set_items(shown[::-1]), root.update_idletasks()), repeat=5)
+
+    grid = VirtualCardGrid(tk.Frame(root), build_card, key=lambda lpo: lpo['lpo_number'])
+    run.time('tk', line_items, 'virtual grid set items', lambda: (grid.set_items(lpos), root.update_idletasks()),
+             repeat=5)
+
+    table = DataTable(tk.Frame(root), [{'id': 'code', 'text': 'Code'}, {'id': 'description', 'text': 'Description'},
+                                       {'id': 'quantity', 'text': 'Qty'}])
+    rows = table_rows(lpos[:100])
+    run.time('tk', line_items, f"table rows x{len(rows)}", lambda: (table.set_rows(rows), root.update_idletasks()))
+    root.destroy()
+
+
+def compare(results, previous_path):
+    """Print the change of each operation against a previous results file"""
+    try:
+        with open(previous_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except Exception as e:
+        print(f"Error loading {previous_path}: {e}")
+        return
+    before = {(r['backend'], r['line_items'], r['operation']): r['per_op_ms'] for r in previous['results']}
+    print(f"\nChange against {previous_path}:")
+    for result in results:
+        old = before.get((result['backend'], result['line_items'], result['operation']))
+        if old:
+            change = (result['per_op_ms'] - old) / old * 100
+            print(f"{result['backend']:8} {result['line_items']:>9} {result['operation']:28} {change:+8.1f}%")
+
+
+def parse_args(argv):
+    options = {'sizes': DEFAULT_SIZES, 'backends': list(BACKENDS), 'ui': False,
+               'output': DEFAULT_OUTPUT, 'compare': None}
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == '--items' and args:
+            options['sizes'] = [int(float(size)) for size in args.pop(0).split(',')]
+        elif arg == '--backend' and args:
+            options['backends'] = args.pop(0).split(',')
+        elif arg == '--ui':
+            options['ui'] = True
+        elif arg == '--output' and args:
+            options['output'] = args.pop(0)
+        elif arg == '--compare' and args:
+            options['compare'] = args.pop(0)
+        else:
+            print(f"Unknown argument: {arg}")
+            sys.exit(2)
+    return options
+
+
+def main(argv):
+    options = parse_args(argv)
+    output = os.path.abspath(options['output'])
+    compare_path = os.path.abspath(options['compare']) if options['compare'] else None
+    source = os.path.dirname(os.path.abspath(__file__))
+    run = Run()
+    for line_items in options['sizes']:
+        data = make_dataset(line_items)
+        for backend in options['backends']:
+            # Each backend writes into its own scratch directory
+            workdir = tempfile.mkdtemp(prefix='stock-bench-')
+            os.chdir(workdir)
+            try:
+                bench_storage(run, backend, line_items, data)
+            finally:
+                os.chdir(source)
+                shutil.rmtree(workdir, ignore_errors=True)
+        if options['ui']:
+            bench_ui(run, line_items, data)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'items_per_record': ITEMS_PER_RECORD,
+        'results': run.results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if compare_path:
+        compare(run.results, compare_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
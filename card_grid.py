@@ -0,0 +1,369 @@
+import tkinter as tk
+
+
+def record_version(record):
+    """Fingerprint of a record's content; a card is rebuilt only when it changes.
+
+    A reloaded copy with the same content keeps its card, so card callbacks must not
+    hold on to the record they were built for: they look up the current one by key
+    through command().
+    """
+    return repr(record)
+
+
+class VersionCache:
+    """Versions of the listed records, computed once per record object.
+
+    Filtering shows the same loaded records again, so only records new since the
+    last pass (a reload) are fingerprinted. Entries keep their record, so an id is
+    not reused while it is cached.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.entries = {}
+
+    def get(self, record):
+        entry = self.entries.get(id(record))
+        if entry is None or entry[0] is not record:
+            entry = (record, self.version(record))
+            self.entries[id(record)] = entry
+        return entry[1]
+
+    def retain(self, records):
+        """Forget the records no longer listed"""
+        self.entries = {id(record): self.entries[id(record)] for record in records
+                        if id(record) in self.entries}
+
+
+def find_record(records, key, wanted):
+    for record in records:
+        if key(record) == wanted:
+            return record
+    return None
+
+
+class RecordCards:
+    """Card callbacks bound to a record key rather than to a record object"""
+
+    def command(self, key, func):
+        """Card button command: func(record) with the record currently listed under key"""
+        def run():
+            record = self.record(key)
+            if record is not None:
+                func(record)
+        return run
+
+
+class VirtualCardGrid(RecordCards):
+    """Scrollable grid of fixed-size cards that only builds widgets for visible rows.
+
+    Cards are placed on the canvas as windows. Scrolling hands card frames that leave
+    the viewport back to a pool and reuses them for the rows coming into view, so the
+    number of live widgets depends on the window size, not on the number of records.
+
+    Cards are keyed by key(record). When the list changes (filtering, refresh) a card
+    still showing the same record in the same version is only moved; it is filled
+    again only when the record is new to it or its content changed.
+    """
+
+    def __init__(self, parent, build_card, columns=3, card_width=450, card_height=200,
+                 padx=5, pady=5, margin=10, overscan=1, key=id, version=record_version):
+        self.build_card = build_card
+        self.key = key
+        self.versions = VersionCache(version)
+        self.columns = columns
+        self.card_width = card_width
+        self.card_height = card_height
+        self.padx = padx
+        self.pady = pady
+        self.margin = margin
+        self.overscan = overscan
+        self.items = []
+        self.active = {}
+        self.pool = []
+        self.message = None
+        self.render_job = None
+
+        self.canvas = tk.Canvas(parent, bg='white', highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(parent, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self.canvas.bind('<Configure>', lambda e: self.schedule_render())
+        self.canvas.bind('<Enter>', self.bind_mousewheel)
+        self.canvas.bind('<Leave>', self.unbind_mousewheel)
+
+    @property
+    def row_height(self):
+        return self.card_height + 2 * self.pady
+
+    def set_items(self, items):
+        """Show a new list of records, refilling only cards whose record changed"""
+        self.clear_message()
+        self.items = list(items)
+        self.versions.retain(self.items)
+        rows = (len(self.items) + self.columns - 1) // self.columns
+        width = self.margin * 2 + self.columns * (self.card_width + 2 * self.padx)
+        self.canvas.configure(scrollregion=(0, 0, width, self.margin * 2 + rows * self.row_height))
+        for slot in self.active.values():
+            self.release(slot)
+        self.active = {}
+        if self.canvas.canvasy(0) > rows * self.row_height:
+            self.canvas.yview_moveto(0)
+        self.render()
+
+    def show_message(self, text):
+        """Replace the cards with a single message (empty list, errors)"""
+        self.set_items([])
+        self.message = tk.Label(self.canvas, text=text, font=('Segoe UI', 12), bg='white', fg='#7f8c8d')
+        self.canvas.create_window(self.canvas.winfo_width() // 2, 50, window=self.message,
+                                  anchor='n', tags='message')
+
+    def clear_message(self):
+        if self.message is not None:
+            self.canvas.delete('message')
+            self.message.destroy()
+            self.message = None
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_render()
+
+    def bind_mousewheel(self, event=None):
+        self.canvas.bind_all('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind_all('<Button-4>', lambda e: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind_all('<Button-5>', lambda e: self.canvas.yview_scroll(1, 'units'))
+
+    def unbind_mousewheel(self, event=None):
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.canvas.unbind_all(sequence)
+
+    def on_mousewheel(self, event):
+        self.canvas.yview_scroll(int(-event.delta / 120) or (-1 if event.delta > 0 else 1), 'units')
+
+    def schedule_render(self):
+        if self.render_job is None:
+            self.render_job = self.canvas.after_idle(self.render)
+
+    def visible_range(self):
+        """Indexes of the records whose row intersects the viewport"""
+        top = self.canvas.canvasy(0) - self.margin
+        height = self.canvas.winfo_height()
+        first_row = max(0, int(top // self.row_height) - self.overscan)
+        last_row = int((top + height) // self.row_height) + self.overscan
+        return range(first_row * self.columns, min(len(self.items), (last_row + 1) * self.columns))
+
+    def render(self):
+        """Create, recycle or hide card frames so exactly the visible rows are shown"""
+        self.render_job = None
+        if self.message is not None:
+            self.canvas.coords('message', self.canvas.winfo_width() // 2, 50)
+        visible = self.visible_range()
+
+        for index in list(self.active):
+            if index not in visible:
+                self.release(self.active.pop(index))
+
+        for index in visible:
+            if index in self.active:
+                continue
+            item = self.items[index]
+            key = self.key(item)
+            version = self.versions.get(item)
+            slot = self.acquire(key, version)
+            row, column = divmod(index, self.columns)
+            x = self.margin + column * (self.card_width + 2 * self.padx) + self.padx
+            y = self.margin + row * self.row_height + self.pady
+            self.canvas.coords(slot['window'], x, y)
+            self.canvas.itemconfigure(slot['window'], state='normal')
+            if slot['key'] != key or slot['version'] != version:
+                for child in slot['frame'].winfo_children():
+                    child.destroy()
+                self.build_card(slot['frame'], item)
+                slot['key'] = key
+                slot['version'] = version
+            self.active[index] = slot
+
+    def record(self, key):
+        """The listed record with key (the current copy after a reload), None when it is gone"""
+        return find_record(self.items, self.key, key)
+
+    def acquire(self, key, version):
+        """Take a pooled card, preferring one that already shows this record"""
+        fallback = None
+        for i, slot in enumerate(self.pool):
+            if slot['key'] == key:
+                if slot['version'] == version:
+                    return self.pool.pop(i)
+                fallback = i if fallback is None else fallback
+        if fallback is not None:
+            return self.pool.pop(fallback)
+        if self.pool:
+            return self.pool.pop(0)
+        frame = tk.Frame(self.canvas, bg='white', relief='solid', bd=1,
+                         width=self.card_width, height=self.card_height)
+        frame.pack_propagate(False)
+        window = self.canvas.create_window(0, 0, window=frame, anchor='nw')
+        return {'frame': frame, 'window': window, 'key': None, 'version': None}
+
+    def release(self, slot):
+        self.canvas.itemconfigure(slot['window'], state='hidden')
+        self.pool.append(slot)
+
+
+class CardList(RecordCards):
+    """Vertical list of variable-height cards packed into a frame, keyed by record.
+
+    set_items() reconciles the shown cards with a new list: cards whose record is
+    unchanged are kept (including anything typed into them) and only re-packed when
+    the order changes, changed records get a fresh card, and cards of records that
+    are gone are destroyed. Records filtered out but still listed in known are only
+    hidden, so clearing a search brings their cards back as they were.
+    """
+
+    def __init__(self, parent, build_card, key, version=record_version, padx=10, pady=5,
+                 batch_size=20):
+        self.parent = parent
+        self.batch_size = batch_size
+        self.build_card = build_card
+        self.key = key
+        self.versions = VersionCache(version)
+        self.padx = padx
+        self.pady = pady
+        self.cards = {}
+        self.order = []
+        self.listed = []
+        self.message = None
+
+    def keys(self, items):
+        """Card keys for items; repeated record keys are told apart by occurrence"""
+        seen = {}
+        keys = []
+        for item in items:
+            key = self.key(item)
+            seen[key] = seen.get(key, 0) + 1
+            keys.append((key, seen[key]))
+        return keys
+
+    def set_items(self, items, known=None, after=None):
+        """Show items in order; cards of records in known but not in items are hidden.
+
+        With a scheduler (after(ms, func), e.g. SearchController.after) at most
+        batch_size cards are built per pass and the rest follow in later passes.
+        """
+        self.clear_message()
+        items = list(items)
+        keys = self.keys(items)
+        self.listed = items if known is None else items + list(known)
+        self.versions.retain(self.listed)
+
+        retained = set(keys if known is None else self.keys(known))
+        retained.update(keys)
+        for key in list(self.cards):
+            if key not in retained:
+                self.cards.pop(key)['frame'].destroy()
+
+        built = 0
+        ready = []
+        for key, item in zip(keys, items):
+            version = self.versions.get(item)
+            card = self.cards.get(key)
+            if card is None or card['version'] != version:
+                if after is not None and built >= self.batch_size:
+                    continue
+                if card is not None:
+                    card['frame'].destroy()
+                    if key in self.order:
+                        self.order.remove(key)
+                frame = tk.Frame(self.parent, bg='white', relief='solid', bd=1)
+                self.build_card(frame, item)
+                self.cards[key] = {'frame': frame, 'version': version}
+                built += 1
+            ready.append(key)
+
+        shown = [key for key in self.order if key in self.cards]
+        if shown != ready:
+            for key in shown:
+                self.cards[key]['frame'].pack_forget()
+            for key in ready:
+                self.cards[key]['frame'].pack(fill='x', padx=self.padx, pady=self.pady)
+        self.order = ready
+
+        if len(ready) < len(keys):
+            after(1, lambda: self.set_items(items, known, after))
+
+    def record(self, key):
+        """The listed record with key (the current copy after a reload), None when it is gone"""
+        return find_record(self.listed, self.key, key)
+
+    def show_message(self, text, fg='#7f8c8d', known=None):
+        """Hide the cards behind a single message (empty list, no search matches)"""
+        self.set_items([], known=known)
+        self.message = tk.Label(self.parent, text=text, font=('Segoe UI', 12), bg='white', fg=fg)
+        self.message.pack(pady=30)
+
+    def clear_message(self):
+        if self.message is not None:
+            self.message.destroy()
+            self.message = None
+
+
+class Selection:
+    """Records checked for a bulk action, kept by record key.
+
+    Cards come and go (virtual scrolling, reloads); each one asks checkbox() for a
+    check box bound to its record, so the checked state lives here and survives
+    the card. on_change(count) is called whenever the selection changes.
+    """
+
+    def __init__(self, on_change=None):
+        self.keys = set()
+        self.vars = {}
+        self.on_change = on_change
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def checkbox(self, parent, key, **options):
+        var = tk.BooleanVar(parent, value=key in self.keys)
+        self.vars[key] = var
+        return tk.Checkbutton(parent, variable=var, command=lambda: self.toggle(key, var.get()), **options)
+
+    def toggle(self, key, checked):
+        if checked:
+            self.keys.add(key)
+        else:
+            self.keys.discard(key)
+        self.changed()
+
+    def set(self, keys):
+        """Check exactly keys"""
+        self.keys = set(keys)
+        for key, var in list(self.vars.items()):
+            try:
+                var.set(key in self.keys)
+            except tk.TclError:
+                del self.vars[key]
+        self.changed()
+
+    def clear(self):
+        self.set(())
+
+    def retain(self, keys):
+        """Forget checked records that are no longer listed (after a reload)"""
+        keys = set(keys)
+        if not self.keys <= keys:
+            self.set(self.keys & keys)
+
+    def selected(self, records, key):
+        """The checked records among records, in their order"""
+        return [record for record in records if key(record) in self.keys]
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change(len(self.keys))
@@ -1,16 +1,19 @@
 import tkinter as tk
 from tkinter import ttk
-import json
-import os
 from datetime import datetime
+from storage import get_storage
+from data_table import DataTable
+from events import event_bus, DATA_CHANGED
 
 class CompletedPRs:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
-        self.data_file = f"completed_prs_{department_name.lower().replace(' ', '_')}.json"
+        self.storage = get_storage(department_name)
         self.create_page()
         self.load_completed_prs()
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.load_completed_prs(), self.table.tree,
+                            department=department_name, collection='completed_prs')
     
     def create_page(self):
         # Main container
@@ -42,54 +45,26 @@ class CompletedPRs:
         table_container = tk.Frame(main_container, bg='white', relief='solid', bd=1)
         table_container.pack(fill='both', expand=True)
         
-        # Create canvas and scrollbar
-        canvas = tk.Canvas(table_container, bg='white')
-        v_scrollbar = ttk.Scrollbar(table_container, orient='vertical', command=canvas.yview)
-        h_scrollbar = ttk.Scrollbar(table_container, orient='horizontal', command=canvas.xview)
-        
-        self.table_frame = tk.Frame(canvas, bg='white')
-        canvas.create_window((0, 0), window=self.table_frame, anchor='nw')
-        
-        canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        def configure_scroll_region(event=None):
-            canvas.configure(scrollregion=canvas.bbox('all'))
-        
-        self.table_frame.bind('<Configure>', configure_scroll_region)
-        
-        v_scrollbar.pack(side='right', fill='y')
-        h_scrollbar.pack(side='bottom', fill='x')
-        canvas.pack(side='left', fill='both', expand=True)
-        
-        self.canvas = canvas
-        
-        # Create table headers
-        self.create_table_headers()
-    
-    def create_table_headers(self):
-        headers = ['PR ID', 'Date Submitted', 'Items Count', 'Status', 'Approved By', 'Actions']
-        
-        # Header row
-        header_frame = tk.Frame(self.table_frame, bg='#3498db')
-        header_frame.pack(fill='x', padx=1, pady=1)
-        
-        for col, header in enumerate(headers):
-            tk.Label(header_frame, text=header, font=('Arial', 10, 'bold'), 
-                    bg='#3498db', fg='white', relief='solid', bd=1, 
-                    width=15 if col != 4 else 20).grid(row=0, column=col, sticky='nsew', padx=0, pady=0)
-        
-        # Configure column weights
-        for col in range(len(headers)):
-            header_frame.grid_columnconfigure(col, weight=1)
+        # PR table
+        columns = [
+            {'id': 'pr_id', 'text': 'PR ID', 'width': 110},
+            {'id': 'date_submitted', 'text': 'Date Submitted', 'width': 120},
+            {'id': 'items_count', 'text': 'Items Count', 'width': 100},
+            {'id': 'status', 'text': 'Status', 'width': 110},
+            {'id': 'approved_by', 'text': 'Approved By', 'width': 160, 'stretch': True},
+            {'id': 'actions', 'text': 'Actions', 'width': 80, 'command': self.view_pr_row}
+        ]
+        self.table = DataTable(table_container, columns, height=20, heading_bg='#3498db')
+        self.table.pack(fill='both', expand=True)
+        self.displayed_prs = {}
     
     def load_completed_prs(self):
-        """Load completed PRs from file"""
+        """Load completed PRs from storage"""
         self.completed_prs = []
         
-        if os.path.exists(self.data_file):
+        if self.storage.exists('completed_prs'):
             try:
-                with open(self.data_file, 'r') as f:
-                    self.completed_prs = json.load(f)
+                self.completed_prs = self.storage.load('completed_prs')
             except Exception as e:
                 print(f"Error loading completed PRs: {e}")
         else:
@@ -137,29 +112,26 @@ class CompletedPRs:
         self.save_completed_prs()
     
     def save_completed_prs(self):
-        """Save completed PRs to file"""
+        """Replace all completed PRs in storage"""
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.completed_prs, f, indent=2)
+            self.storage.save('completed_prs', self.completed_prs)
         except Exception as e:
             print(f"Error saving completed PRs: {e}")
     
     def display_prs(self):
         """Display PRs in table format"""
-        # Clear existing rows
-        for widget in self.table_frame.winfo_children()[1:]:
-            widget.destroy()
-        
         # Filter PRs based on status
         filtered_prs = self.get_filtered_prs()
         
-        # Display each PR
-        for pr in filtered_prs:
-            self.create_pr_row(pr)
-        
-        # Update scroll region
-        self.table_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox('all'))
+        # Display each PR, status colour coded
+        self.table.clear()
+        self.displayed_prs = {}
+        for i, pr in enumerate(filtered_prs):
+            status_color = self.get_status_color(pr['status'])
+            self.table.tag_configure(status_color, foreground=status_color)
+            row_id = self.table.insert((pr['pr_id'], pr['date_submitted'], len(pr['items']), pr['status'],
+                                        pr['approved_by'], "View"), iid=str(i), tags=(status_color,))
+            self.displayed_prs[row_id] = pr
     
     def get_filtered_prs(self):
         """Get PRs filtered by selected status"""
@@ -169,48 +141,11 @@ class CompletedPRs:
         else:
             return [pr for pr in self.completed_prs if pr['status'] == status_filter]
     
-    def create_pr_row(self, pr):
-        """Create a row for a PR"""
-        row_frame = tk.Frame(self.table_frame, bg='white')
-        row_frame.pack(fill='x', padx=1, pady=1)
-        
-        # PR ID
-        tk.Label(row_frame, text=pr['pr_id'], font=('Arial', 9), 
-                bg='white', fg='#2c3e50', relief='solid', bd=1, 
-                width=15).grid(row=0, column=0, sticky='nsew')
-        
-        # Date Submitted
-        tk.Label(row_frame, text=pr['date_submitted'], font=('Arial', 9), 
-                bg='white', fg='#2c3e50', relief='solid', bd=1, 
-                width=15).grid(row=0, column=1, sticky='nsew')
-        
-        # Items Count
-        tk.Label(row_frame, text=str(len(pr['items'])), font=('Arial', 9), 
-                bg='white', fg='#2c3e50', relief='solid', bd=1, 
-                width=15).grid(row=0, column=2, sticky='nsew')
-        
-        # Status with color coding
-        status_color = self.get_status_color(pr['status'])
-        tk.Label(row_frame, text=pr['status'], font=('Arial', 9, 'bold'), 
-                bg=status_color, fg='white', relief='solid', bd=1, 
-                width=15).grid(row=0, column=3, sticky='nsew')
-        
-        # Approved By
-        tk.Label(row_frame, text=pr['approved_by'], font=('Arial', 9), 
-                bg='white', fg='#2c3e50', relief='solid', bd=1, 
-                width=20).grid(row=0, column=4, sticky='nsew')
-        
-        # Actions
-        action_frame = tk.Frame(row_frame, bg='white', relief='solid', bd=1)
-        action_frame.grid(row=0, column=5, sticky='nsew')
-        
-        view_btn = tk.Button(action_frame, text="View", bg='#3498db', fg='white', 
-                            font=('Arial', 8), command=lambda: self.view_pr_details(pr))
-        view_btn.pack(side='left', padx=2, pady=2)
-        
-        # Configure column weights
-        for col in range(6):
-            row_frame.grid_columnconfigure(col, weight=1)
+    def view_pr_row(self, row_id):
+        """Open the PR behind a table row"""
+        pr = self.displayed_prs.get(row_id)
+        if pr is not None:
+            self.view_pr_details(pr)
     
     def get_status_color(self, status):
         """Get color for status"""
@@ -263,37 +198,14 @@ class CompletedPRs:
         tk.Label(items_frame, text="Items:", font=('Arial', 12, 'bold'), 
                 bg='white', fg='#2c3e50').pack(anchor='w', pady=(0, 5))
         
-        # Items table headers
-        items_header = tk.Frame(items_frame, bg='#3498db')
-        items_header.pack(fill='x')
-        
-        tk.Label(items_header, text="S.No", font=('Arial', 10, 'bold'), 
-                bg='#3498db', fg='white', relief='solid', bd=1).grid(row=0, column=0, sticky='nsew')
-        tk.Label(items_header, text="Resource Code", font=('Arial', 10, 'bold'), 
-                bg='#3498db', fg='white', relief='solid', bd=1).grid(row=0, column=1, sticky='nsew')
-        tk.Label(items_header, text="Item Description", font=('Arial', 10, 'bold'), 
-                bg='#3498db', fg='white', relief='solid', bd=1).grid(row=0, column=2, sticky='nsew')
-        
-        items_header.grid_columnconfigure(0, weight=0, minsize=60)
-        items_header.grid_columnconfigure(1, weight=1, minsize=150)
-        items_header.grid_columnconfigure(2, weight=2, minsize=300)
-        
-        # Items rows
-        for i, item in enumerate(pr['items'], 1):
-            item_row = tk.Frame(items_frame, bg='white')
-            item_row.pack(fill='x')
-            
-            tk.Label(item_row, text=str(i), font=('Arial', 9), 
-                    bg='white', fg='#2c3e50', relief='solid', bd=1).grid(row=0, column=0, sticky='nsew')
-            tk.Label(item_row, text=item['resource_code'], font=('Arial', 9), 
-                    bg='white', fg='#2c3e50', relief='solid', bd=1).grid(row=0, column=1, sticky='nsew')
-            tk.Label(item_row, text=item['item_description'], font=('Arial', 9), 
-                    bg='white', fg='#2c3e50', relief='solid', bd=1, 
-                    wraplength=280, justify='left').grid(row=0, column=2, sticky='nsew')
-            
-            item_row.grid_columnconfigure(0, weight=0, minsize=60)
-            item_row.grid_columnconfigure(1, weight=1, minsize=150)
-            item_row.grid_columnconfigure(2, weight=2, minsize=300)
+        columns = [
+            {'id': 'sno', 'text': 'S.No', 'width': 60},
+            {'id': 'resource_code', 'text': 'Resource Code', 'width': 150},
+            {'id': 'item_description', 'text': 'Item Description', 'width': 300, 'anchor': 'w', 'stretch': True}
+        ]
+        items_table = DataTable(items_frame, columns, heading_bg='#3498db').pack(fill='both', expand=True)
+        items_table.set_rows((str(i), (i, item['resource_code'], item['item_description']))
+                             for i, item in enumerate(pr['items'], 1))
         
         # Close button
         tk.Button(detail_window, text="Close", bg='#95a5a6', fg='white', 
@@ -316,5 +228,5 @@ class CompletedPRs:
         }
         
         self.completed_prs.append(new_pr)
-        self.save_completed_prs()
+        self.storage.insert('completed_prs', new_pr)
         self.display_prs()
\ No newline at end of file
@@ -1,12 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import os
+from storage import get_storage
+from procurement import ProcurementService, summary
+from data_table import DataTable
+from card_grid import CardList
+from search import SearchController
+from io_worker import io_worker
+from events import event_bus, DATA_CHANGED, VIEW_LOADED
 
 class Costs:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
+        self.storage = get_storage(department_name)
+        self.service = ProcurementService(self.storage)
         self.create_page()
     
     def create_page(self):
@@ -34,7 +41,8 @@ class Costs:
         search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=('Segoe UI', 11),
                                width=30, relief='solid', bd=1)
         search_entry.pack(side='left', padx=5, pady=12)
-        search_entry.bind('<KeyRelease>', self.filter_lpos)
+        self.search = SearchController(search_entry, self.filter_lpos)
+        search_entry.bind('<KeyRelease>', self.search.schedule)
         
         tk.Button(search_frame, text="Clear", command=self.clear_search,
                  bg='#95a5a6', fg='white', font=('Segoe UI', 9, 'bold')).pack(side='left', padx=5, pady=12)
@@ -44,6 +52,9 @@ class Costs:
         
         tk.Button(search_frame, text="🔄 Revert", command=self.show_archived_lpos,
                  bg='#e67e22', fg='white', font=('Segoe UI', 9, 'bold')).pack(side='left', padx=5, pady=12)
+        
+        tk.Button(search_frame, text="💾 Save All Priced", command=self.save_all_prices,
+                 bg='#27ae60', fg='white', font=('Segoe UI', 9, 'bold')).pack(side='right', padx=10, pady=12)
                 
         # LPO list container - increased size
         lpo_container = tk.Frame(main_container, bg='white', relief='solid', bd=1)
@@ -63,67 +74,61 @@ class Costs:
         self.scrollable_frame.bind('<Configure>', 
                                   lambda e: canvas.configure(scrollregion=canvas.bbox('all')))
         
+        # LPO cards keyed by LPO number
+        self.card_list = CardList(self.scrollable_frame, self.create_lpo_cost_card,
+                                  key=lambda lpo: lpo.get('lpo_number'))
+        
         # Store all LPOs for filtering
         self.all_lpos = []
         
-        # Load and display LPOs
+        # Load and display LPOs; reload when LPOs are approved, priced or reverted
         self.load_lpos_for_costing()
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.load_lpos_for_costing(), self.scrollable_frame,
+                            department=self.department_name, collection=('lpo', 'archived_lpos'))
     
     def load_lpos_for_costing(self):
-        """Load real LPO data for cost management - separate copy"""
-        try:
-            # Use separate file for costs but copy real LPO data
-            archive_file = f"archived_lpos_{self.department_name.lower().replace(' ', '_')}.json"
-            main_lpo_file = f"lpo_{self.department_name.lower().replace(' ', '_')}.json"
-            
-            # Always refresh from main LPO file to get latest data
-            if os.path.exists(main_lpo_file):
-                with open(main_lpo_file, 'r', encoding='utf-8') as f:
-                    main_lpos = json.load(f)
-                
-                # Load archived LPOs to exclude them
-                archived_lpos = []
-                if os.path.exists(archive_file):
-                    try:
-                        with open(archive_file, 'r', encoding='utf-8') as f:
-                            archived_lpos = json.load(f)
-                    except:
-                        archived_lpos = []
-                
-                # Get archived LPO IDs
-                archived_ids = [lpo.get('lpo_number') for lpo in archived_lpos]
-                
-                # Filter to show only non-archived LPOs
-                lpos = [lpo for lpo in main_lpos if lpo.get('lpo_number') not in archived_ids]
-            else:
-                # No main LPO file exists
-                lpos = []
-            
-            # Update all_lpos
-            self.all_lpos = lpos
-            
-            # Clear existing display
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
-            
-            # Display LPOs or show empty message
-            if not lpos:
-                tk.Label(self.scrollable_frame, text="No cost items available",
-                        font=('Segoe UI', 14), bg='white', fg='#7f8c8d').pack(pady=50)
-            else:
-                for lpo in lpos:
-                    self.create_lpo_cost_card(lpo)
-                
-        except Exception as e:
-            tk.Label(self.scrollable_frame, text=f"Error loading LPOs: {str(e)}",
-                    font=('Segoe UI', 12), bg='white', fg='#e74c3c').pack(pady=20)
+        """Load real LPO data for cost management on the I/O worker"""
+        if not self.all_lpos:
+            self.card_list.show_message("Loading LPOs...")
+        io_worker.submit(self.scrollable_frame, self.read_lpos_for_costing, self.show_lpos_for_costing,
+                         self.show_load_error)
+    
+    def read_lpos_for_costing(self):
+        """Non-archived LPOs (I/O worker)"""
+        # Always refresh from main LPO store to get latest data
+        if not self.storage.exists('lpo'):
+            # No LPO store exists yet
+            return []
+        main_lpos = self.storage.load('lpo')
+        self.storage.search_index('lpo')
+        
+        # Index archived LPOs to exclude them
+        archived = self.storage.index('archived_lpos') if self.storage.exists('archived_lpos') else set()
+        
+        # Filter to show only non-archived LPOs
+        return [lpo for lpo in main_lpos if lpo.get('lpo_number') not in archived]
     
-    def create_lpo_cost_card(self, lpo):
-        """Create a card for each LPO with items for cost entry"""
-        # Main card frame - vertical layout
-        card_frame = tk.Frame(self.scrollable_frame, bg='white', relief='solid', bd=1)
-        card_frame.pack(fill='x', padx=10, pady=5)
+    def show_lpos_for_costing(self, lpos):
+        """Display loaded LPOs"""
+        # Reloaded LPOs are new records, so their cards are rebuilt: keep what was typed
+        self.keep_entered_prices()
         
+        # Update all_lpos
+        self.all_lpos = lpos
+        
+        # Display LPOs (keeping the current search) or show empty message
+        self.search.run_now()
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='costs')
+    
+    def show_load_error(self, error):
+        self.search.cancel()
+        self.card_list.show_message(f"Error loading LPOs: {str(error)}", fg='#e74c3c')
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='costs', error=str(error))
+    
+    def create_lpo_cost_card(self, card_frame, lpo):
+        """Fill a card for an LPO with its items for cost entry"""
+        # Buttons act on the current copy of the record, which a reload may have replaced
+        key = lpo.get('lpo_number')
         # Header
         header_frame = tk.Frame(card_frame, bg='#16a085', height=40)
         header_frame.pack(fill='x')
@@ -133,74 +138,27 @@ class Costs:
         tk.Label(header_frame, text=f"📋 {lpo_number} - Unit Price Entry",
                 font=('Segoe UI', 12, 'bold'), bg='#16a085', fg='white').pack(side='left', padx=10, pady=8)
         
-        # Items table with proper layout
-        table_frame = tk.Frame(card_frame, bg='white')
-        table_frame.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        # Create table with fixed column widths
-        columns = ['Resource Code', 'Item Description', 'Unit', 'Unit Price']
-        col_widths = [20, 50, 12, 15]  # Character widths for each column
-        
-        # Headers with consistent layout
-        header_row = tk.Frame(table_frame, bg='#34495e')
-        header_row.pack(fill='x', pady=(0, 2))
-        
-        # Resource Code header
-        tk.Label(header_row, text='Resource Code', font=('Segoe UI', 10, 'bold'),
-                bg='#34495e', fg='white', width=col_widths[0], anchor='center').pack(side='left', padx=1, pady=2)
-        
-        # Item Description header - expandable
-        tk.Label(header_row, text='Item Description', font=('Segoe UI', 10, 'bold'),
-                bg='#34495e', fg='white', anchor='center').pack(side='left', fill='x', expand=True, padx=1, pady=2)
-        
-        # Unit header
-        tk.Label(header_row, text='Unit', font=('Segoe UI', 10, 'bold'),
-                bg='#34495e', fg='white', width=col_widths[2], anchor='center').pack(side='left', padx=1, pady=2)
+        # Items table - unit is picked from a dropdown, unit price is typed in
+        columns = [
+            {'id': 'resource_code', 'text': 'Resource Code', 'width': 140},
+            {'id': 'item_description', 'text': 'Item Description', 'width': 380, 'anchor': 'w', 'stretch': True},
+            {'id': 'unit', 'text': 'Unit', 'width': 90, 'editable': True,
+             'choices': ('Nos', 'Mtr', 'Gln', 'Ctn', 'Roll', 'Box', 'Kg', 'Ltr', 'Pcs', 'Set')},
+            {'id': 'unit_price', 'text': 'Unit Price', 'width': 110, 'editable': True}
+        ]
+        table = DataTable(card_frame, columns).pack(fill='both', expand=True, padx=10, pady=10)
+        unsaved = getattr(self, 'unsaved_prices', {}).get(lpo_number, {})
+        rows = []
+        for i, item in enumerate(lpo.get('items', [])):
+            price, unit = unsaved.get((str(i), item.get('resource_code', '')), ('', item.get('unit', 'Nos')))
+            rows.append((str(i), (item.get('resource_code', ''), item.get('item_description', ''), unit, price)))
+        table.set_rows(rows)
+        table.fit_height()
         
-        # Unit Price header
-        tk.Label(header_row, text='Unit Price', font=('Segoe UI', 10, 'bold'),
-                bg='#34495e', fg='white', width=col_widths[3], anchor='center').pack(side='left', padx=1, pady=2)
-        
-        # Items rows with consistent layout
-        items = lpo.get('items', [])
-        if not hasattr(self, 'price_entries'):
-            self.price_entries = {}
-        
-        for i, item in enumerate(items):
-            row_frame = tk.Frame(table_frame, bg='white' if i % 2 == 0 else '#f8f9fa')
-            row_frame.pack(fill='x', pady=1)
-            
-            # Resource Code
-            tk.Label(row_frame, text=item.get('resource_code', ''), font=('Segoe UI', 9),
-                    bg=row_frame['bg'], fg='#2c3e50', width=col_widths[0], anchor='center').pack(side='left', padx=1)
-            
-            # Item Description - with proper width
-            desc_text = item.get('item_description', '')
-            desc_label = tk.Label(row_frame, text=desc_text, font=('Segoe UI', 9),
-                                bg=row_frame['bg'], fg='#2c3e50', anchor='w', width=60)
-            desc_label.pack(side='left', padx=1)
-            
-            # Unit - Editable dropdown
-            unit_var = tk.StringVar(value=item.get('unit', 'Nos'))
-            unit_combo = ttk.Combobox(row_frame, textvariable=unit_var, font=('Segoe UI', 9),
-                                    width=col_widths[2]-2, justify='center', state='readonly')
-            unit_combo['values'] = ('Nos', 'Mtr', 'Gln', 'Ctn', 'Roll', 'Box', 'Kg', 'Ltr', 'Pcs', 'Set')
-            unit_combo.pack(side='left', padx=1, pady=1)
-            
-            # Unit Price Entry
-            price_var = tk.StringVar()
-            price_entry = tk.Entry(row_frame, textvariable=price_var, font=('Segoe UI', 9),
-                                  justify='center', width=col_widths[3], relief='solid', bd=1)
-            price_entry.pack(side='left', padx=1, pady=1)
-            
-            # Store references with unique key
-            item_key = f"{lpo_number}_{i}"
-            self.price_entries[item_key] = {
-                'price_var': price_var,
-                'unit_var': unit_var,
-                'item': item
-            }
-            print(f"DEBUG: Stored price entry for {item_key}")
+        # Store the table by LPO number
+        if not hasattr(self, 'price_tables'):
+            self.price_tables = {}
+        self.price_tables[lpo_number] = table
         
         # Action buttons
         action_frame = tk.Frame(card_frame, bg='white')
@@ -208,106 +166,108 @@ class Costs:
         
         tk.Button(action_frame, text="💾 Save Prices", bg='#27ae60', fg='white',
                  font=('Segoe UI', 9, 'bold'), padx=15, pady=5,
-                 command=lambda: self.save_lpo_prices(lpo)).pack(side='right', padx=5)
+                 command=self.card_list.command(key, self.save_lpo_prices)).pack(side='right', padx=5)
     
 
     
+    def entered_prices(self, lpo):
+        """Prices and units entered in the LPO card's table, by item index"""
+        lpo_number = lpo.get('manual_lpo_number') or lpo.get('lpo_number', 'N/A')
+        prices = {}
+        table = getattr(self, 'price_tables', {}).get(lpo_number)
+        for i in range(len(lpo.get('items', []))):
+            row_id = str(i)
+            if table is not None and table.exists() and table.has_row(row_id):
+                prices[i] = (table.get(row_id, 'unit_price'), table.get(row_id, 'unit'))
+        return prices
+    
+    def keep_entered_prices(self):
+        """Prices and units typed into the cards and not saved yet, by LPO number and
+        (row, resource code), for the cards built again after a reload"""
+        self.unsaved_prices = {}
+        for lpo in self.all_lpos:
+            entered = {}
+            items = lpo.get('items', [])
+            for i, (price, unit) in self.entered_prices(lpo).items():
+                if (price or '').strip() or unit != items[i].get('unit', 'Nos'):
+                    entered[(str(i), items[i].get('resource_code', ''))] = (price, unit)
+            if entered:
+                self.unsaved_prices[lpo.get('manual_lpo_number') or lpo.get('lpo_number', 'N/A')] = entered
+    
     def save_lpo_prices(self, lpo):
         """Save unit prices for LPO items"""
         try:
             lpo_number = lpo.get('manual_lpo_number') or lpo.get('lpo_number', 'N/A')
             
-            # Update items with prices and units
-            updated_items = []
-            for i, item in enumerate(lpo.get('items', [])):
-                item_key = f"{lpo_number}_{i}"
-                print(f"DEBUG: Looking for price entry {item_key}")
-                if item_key in self.price_entries:
-                    price = self.price_entries[item_key]['price_var'].get().strip()
-                    unit = self.price_entries[item_key]['unit_var'].get()
-                    print(f"DEBUG: Found price '{price}' for {item_key}")
-                    item['unit_price'] = price if price else None
-                    item['unit'] = unit
-                else:
-                    print(f"DEBUG: No price entry found for {item_key}")
-                    item['unit_price'] = None
-                updated_items.append(item)
-            
-            # Update LPO with prices
-            lpo['items'] = updated_items
-            lpo['pricing_updated'] = True
-            
-            # Archive LPO
-            self.archive_lpo(lpo)
-            
-            # Refresh display to remove archived LPO
-            self.load_lpos_for_costing()
+            # Priced copy: the loaded LPO is shared with the other views
+            lpo = self.service.priced_lpo(lpo, self.entered_prices(lpo))
             
-            # Update trends data
-            from trends import Trends
-            trends_updated = 0
-            for i, item in enumerate(updated_items):
-                price = item.get('unit_price', '').strip()
-                if price and price != '':
-                    print(f"DEBUG: Updating trend for {item.get('resource_code')} with price {price}")
-                    success = Trends.update_price_trend(
-                        self.department_name,
-                        item.get('resource_code', ''),
-                        item.get('item_description', ''),
-                        item.get('unit', ''),
-                        price
-                    )
-                    if success:
-                        trends_updated += 1
-                else:
-                    print(f"DEBUG: Skipping trend update for {item.get('resource_code')} - no price entered")
-            
-            print(f"DEBUG: Updated {trends_updated} items in trends")
-            
-            # Show revert section immediately after saving (no blocking messagebox)
-            self.show_archived_lpos()
-            
-            # Show success message after revert window is displayed
-            if trends_updated > 0:
-                print(f"Success: Prices saved for {lpo_number}, {trends_updated} items added to price trends")
-            else:
-                print(f"Success: Prices saved for {lpo_number}, no prices entered for trend tracking")
+            # Archive and update trends on the I/O worker
+            io_worker.submit(self.scrollable_frame, lambda: self.service.store_prices(lpo),
+                             lambda trends_updated: self.prices_saved(lpo_number, trends_updated),
+                             lambda e: messagebox.showerror("Error", f"Failed to save prices: {str(e)}"))
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save prices: {str(e)}")
     
+    def prices_saved(self, lpo_number, trends_updated):
+        """Report an LPO's stored prices (the archive change reloads the list)"""
+        # Show revert section immediately after saving (no blocking messagebox)
+        self.show_archived_lpos()
+        
+        # Show success message after revert window is displayed
+        if trends_updated > 0:
+            print(f"Success: Prices saved for {lpo_number}, {trends_updated} items added to price trends")
+        else:
+            print(f"Success: Prices saved for {lpo_number}, no prices entered for trend tracking")
+    
+    def save_all_prices(self):
+        """Archive every LPO that has prices entered, with one write per store"""
+        priced = []
+        for lpo in self.all_lpos:
+            prices = self.entered_prices(lpo)
+            if any((price or '').strip() for price, unit in prices.values()):
+                priced.append(self.service.priced_lpo(lpo, prices))
+        if not priced:
+            messagebox.showwarning("Warning", "Enter unit prices on the LPOs to save first.")
+            return
+        
+        io_worker.submit(self.scrollable_frame, lambda: self.service.store_prices_batch(priced),
+                         self.all_prices_saved,
+                         lambda e: messagebox.showerror("Error", f"Failed to save prices: {str(e)}"))
+    
+    def all_prices_saved(self, result):
+        """Report a bulk save (the archive change reloads the list)"""
+        archived, trends_updated, problems = result
+        print(f"Success: Prices saved for {len(archived)} LPOs, {trends_updated} items added to price trends")
+        messagebox.showinfo("Prices Saved", summary("Archived", len(archived), problems))
+    
     def filter_lpos(self, event=None):
         """Filter LPOs based on search text"""
-        search_text = self.search_var.get().lower().strip()
+        matches = self.storage.search('lpo', self.search_var.get())
         
-        # Clear current display
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+        if not self.all_lpos:
+            self.card_list.show_message("No cost items available")
+            return
         
-        # Show filtered LPOs
-        if not search_text:
+        # Show filtered LPOs; cards already built are reused
+        if matches is None:
             # Show all LPOs if no search text
-            for lpo in self.all_lpos:
-                self.create_lpo_cost_card(lpo)
+            self.card_list.set_items(self.all_lpos, after=self.search.after)
         else:
-            # Filter LPOs by LPO number
-            found_lpos = []
-            for lpo in self.all_lpos:
-                lpo_number = lpo.get('manual_lpo_number') or lpo.get('lpo_number', '')
-                if search_text in lpo_number.lower():
-                    found_lpos.append(lpo)
+            # Filter LPOs by number, supplier, description or items
+            found_lpos = [lpo for lpo in self.all_lpos if lpo.get('lpo_number') in matches]
             
             if found_lpos:
-                for lpo in found_lpos:
-                    self.create_lpo_cost_card(lpo)
+                self.card_list.set_items(found_lpos, known=self.all_lpos, after=self.search.after)
             else:
-                tk.Label(self.scrollable_frame, text=f"No LPOs found matching '{self.search_var.get()}'",
-                        font=('Segoe UI', 12), bg='white', fg='#e74c3c').pack(pady=30)
+                self.card_list.show_message(f"No LPOs found matching '{self.search_var.get()}'",
+                                            fg='#e74c3c', known=self.all_lpos)
     
     def clear_search(self):
         """Clear search and show all LPOs"""
         self.search_var.set('')
-        self.filter_lpos()
+        self.search.run_now()
     
     def refresh_data(self):
         """Refresh LPO data from main file"""
@@ -325,40 +285,15 @@ class Costs:
         except Exception as e:
             print(f"Navigation error: {e}")
     
-    def archive_lpo(self, lpo):
-        """Move LPO to archived file after pricing"""
-        try:
-            archive_file = f"archived_lpos_{self.department_name.lower().replace(' ', '_')}.json"
-            
-            # Load existing archived LPOs
-            if os.path.exists(archive_file):
-                with open(archive_file, 'r', encoding='utf-8') as f:
-                    archived_lpos = json.load(f)
-            else:
-                archived_lpos = []
-            
-            # Add current LPO to archive
-            archived_lpos.append(lpo)
-            
-            # Save archived LPOs
-            with open(archive_file, 'w', encoding='utf-8') as f:
-                json.dump(archived_lpos, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            print(f"Error archiving LPO: {e}")
-    
     def show_archived_lpos(self):
+        """Load archived LPOs on the I/O worker, then show them with revert option"""
+        io_worker.submit(self.scrollable_frame, lambda: self.storage.load('archived_lpos'),
+                         self.create_archive_window,
+                         lambda e: messagebox.showerror("Error", f"Failed to load archived LPOs: {str(e)}"))
+    
+    def create_archive_window(self, archived_lpos):
         """Show archived LPOs with revert option"""
         try:
-            archive_file = f"archived_lpos_{self.department_name.lower().replace(' ', '_')}.json"
-            
-            if not os.path.exists(archive_file):
-                messagebox.showinfo("No Archived LPOs", "No archived LPOs found.")
-                return
-            
-            with open(archive_file, 'r', encoding='utf-8') as f:
-                archived_lpos = json.load(f)
-            
             if not archived_lpos:
                 messagebox.showinfo("No Archived LPOs", "No archived LPOs found.")
                 return
@@ -415,28 +350,14 @@ class Costs:
     def revert_lpo(self, lpo_index, revert_window):
         """Revert an archived LPO back to active list"""
         try:
-            archive_file = f"archived_lpos_{self.department_name.lower().replace(' ', '_')}.json"
-            
             # Load archived LPOs
-            with open(archive_file, 'r', encoding='utf-8') as f:
-                archived_lpos = json.load(f)
+            archived_lpos = self.storage.load('archived_lpos')
             
             # Get the LPO to revert
             lpo_to_revert = archived_lpos[lpo_index]
             
-            # Remove pricing data to make it available for re-pricing
-            for item in lpo_to_revert.get('items', []):
-                item.pop('unit_price', None)
-            lpo_to_revert['pricing_updated'] = False
-            
-            # Remove from archived list
-            archived_lpos.pop(lpo_index)
-            
-            with open(archive_file, 'w', encoding='utf-8') as f:
-                json.dump(archived_lpos, f, indent=2, ensure_ascii=False)
-            
-            # Refresh display
-            self.load_lpos_for_costing()
+            # Remove pricing data and take it out of the archive for re-pricing
+            self.service.revert_pricing(lpo_to_revert)
             
             messagebox.showinfo("Success", f"LPO {lpo_to_revert.get('manual_lpo_number') or lpo_to_revert.get('lpo_number', 'N/A')} reverted successfully!")
             
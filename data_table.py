@@ -0,0 +1,237 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+def sort_key(value):
+    """Numbers sort numerically, everything else case-insensitively"""
+    try:
+        return (0, float(str(value).replace(',', '')), '')
+    except ValueError:
+        return (1, 0, str(value).lower())
+
+
+class DataTable:
+    """Table on a single ttk.Treeview instead of one widget per cell.
+
+    columns is a list of dicts: id, text, width, anchor ('center'), stretch (False),
+    editable (False), choices (list for a dropdown editor) and command (called with
+    the row id when a cell of that column is clicked). Editing places one Entry or
+    Combobox over the clicked cell; on_edit(row_id, column_id, value) may return a
+    corrected value, or None to reject the edit.
+    """
+
+    def __init__(self, parent, columns, height=10, on_edit=None, tooltip=None,
+                 heading_bg='#34495e', font=('Segoe UI', 9)):
+        self.columns = columns
+        self.column_ids = [column['id'] for column in columns]
+        self.on_edit = on_edit
+        self.tooltip = tooltip
+        self.sort_state = {}
+        self.editor = None
+        self.tip = None
+        self.tip_cell = None
+        # Row ids in display order, so striping and sizing need no Tcl round-trip
+        self.row_ids = []
+
+        style = ttk.Style(parent)
+        style_name = f"DataTable{heading_bg.lstrip('#')}.Treeview"
+        style.configure(style_name, font=font, rowheight=24)
+        style.configure(f"{style_name}.Heading", font=(font[0], 10, 'bold'),
+                        background=heading_bg, foreground='white')
+        style.map(f"{style_name}.Heading", background=[('active', heading_bg)])
+
+        self.frame = tk.Frame(parent, bg='white')
+        self.tree = ttk.Treeview(self.frame, columns=self.column_ids, show='headings',
+                                 height=height, style=style_name)
+        scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        for column in columns:
+            self.tree.heading(column['id'], text=column['text'],
+                              command=lambda c=column['id']: self.sort_by(c))
+            self.tree.column(column['id'], width=column.get('width', 100),
+                             minwidth=column.get('minwidth', 40),
+                             anchor=column.get('anchor', 'center'),
+                             stretch=column.get('stretch', False))
+
+        self.tree.tag_configure('odd', background='white')
+        self.tree.tag_configure('even', background='#f8f9fa')
+
+        self.tree.bind('<ButtonRelease-1>', self.on_click)
+        self.tree.bind('<Motion>', self.on_motion)
+        self.tree.bind('<Leave>', lambda e: self.hide_tooltip())
+        self.tree.bind('<MouseWheel>', lambda e: self.finish_edit())
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+        return self
+
+    def exists(self):
+        try:
+            return bool(self.tree.winfo_exists())
+        except tk.TclError:
+            return False
+
+    # Rows
+
+    def clear(self):
+        self.cancel_edit()
+        self.tree.delete(*self.row_ids)
+        self.row_ids = []
+
+    def insert(self, values, iid=None, tags=()):
+        """Append a row; values follow the column order"""
+        stripe = 'even' if len(self.row_ids) % 2 else 'odd'
+        iid = self.tree.insert('', 'end', iid=iid, values=list(values), tags=(stripe,) + tuple(tags))
+        self.row_ids.append(iid)
+        return iid
+
+    def set_rows(self, rows):
+        """Replace all rows with (iid, values) pairs"""
+        self.clear()
+        for iid, values in rows:
+            self.insert(values, iid=iid)
+
+    def rows(self):
+        return list(self.row_ids)
+
+    def has_row(self, iid):
+        return self.tree.exists(iid)
+
+    def get(self, iid, column_id):
+        return self.tree.set(iid, column_id)
+
+    def set(self, iid, column_id, value):
+        self.tree.set(iid, column_id, value)
+
+    def tag_configure(self, tag, **options):
+        self.tree.tag_configure(tag, **options)
+
+    def fit_height(self, max_rows=15):
+        self.tree.configure(height=max(1, min(len(self.row_ids), max_rows)))
+
+    # Sorting
+
+    def sort_by(self, column_id):
+        """Sort on a column; clicking the same heading again reverses the order"""
+        self.finish_edit()
+        descending = self.sort_state.get(column_id, False)
+        rows = [(sort_key(self.tree.set(iid, column_id)), iid) for iid in self.row_ids]
+        rows.sort(reverse=descending)
+        for position, (_, iid) in enumerate(rows):
+            self.tree.move(iid, '', position)
+            self.restripe(iid, position)
+        self.row_ids = [iid for _, iid in rows]
+        self.sort_state = {column_id: not descending}
+
+        for column in self.columns:
+            arrow = ''
+            if column['id'] == column_id:
+                arrow = ' ▼' if descending else ' ▲'
+            self.tree.heading(column['id'], text=column['text'] + arrow)
+
+    def restripe(self, iid, position):
+        tags = [tag for tag in self.tree.item(iid, 'tags') if tag not in ('odd', 'even')]
+        self.tree.item(iid, tags=['even' if position % 2 else 'odd'] + tags)
+
+    # Editing
+
+    def cell_at(self, x, y):
+        iid = self.tree.identify_row(y)
+        column = self.tree.identify_column(x)
+        if not iid or not column:
+            return None, None
+        index = int(column[1:]) - 1
+        if index < 0 or index >= len(self.columns):
+            return None, None
+        return iid, self.columns[index]
+
+    def on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != 'cell':
+            return
+        iid, column = self.cell_at(event.x, event.y)
+        if column is None:
+            return
+        if column.get('command'):
+            column['command'](iid)
+        elif column.get('editable'):
+            self.start_edit(iid, column)
+
+    def start_edit(self, iid, column):
+        """Place an editor over one cell"""
+        self.finish_edit()
+        self.tree.see(iid)
+        self.tree.update_idletasks()
+        bbox = self.tree.bbox(iid, column['id'])
+        if not bbox:
+            return
+        x, y, width, height = bbox
+
+        value = tk.StringVar(value=self.tree.set(iid, column['id']))
+        if column.get('choices'):
+            editor = ttk.Combobox(self.tree, textvariable=value, values=column['choices'],
+                                  state='readonly', justify='center')
+            editor.bind('<<ComboboxSelected>>', lambda e: self.finish_edit())
+        else:
+            editor = tk.Entry(self.tree, textvariable=value, justify='center', relief='solid', bd=1)
+            editor.select_range(0, 'end')
+            editor.bind('<Return>', lambda e: self.finish_edit(move=1))
+            editor.bind('<Down>', lambda e: self.finish_edit(move=1))
+            editor.bind('<Up>', lambda e: self.finish_edit(move=-1))
+            editor.bind('<FocusOut>', lambda e, current=editor: self.finish_edit()
+                        if self.editor is not None and self.editor[0] is current else None)
+        editor.bind('<Escape>', lambda e: self.cancel_edit())
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        self.editor = (editor, value, iid, column)
+
+    def finish_edit(self, move=0):
+        """Commit the open editor, optionally moving to the next/previous row"""
+        if self.editor is None:
+            return
+        editor, value, iid, column = self.editor
+        self.editor = None
+        new_value = value.get()
+        if self.on_edit is not None:
+            new_value = self.on_edit(iid, column['id'], new_value)
+        if new_value is not None and self.tree.exists(iid):
+            self.tree.set(iid, column['id'], new_value)
+        editor.destroy()
+
+        if move and self.tree.exists(iid):
+            target = self.tree.next(iid) if move > 0 else self.tree.prev(iid)
+            if target:
+                self.start_edit(target, column)
+
+    def cancel_edit(self):
+        if self.editor is not None:
+            self.editor[0].destroy()
+            self.editor = None
+
+    # Tooltips
+
+    def on_motion(self, event):
+        if self.tooltip is None:
+            return
+        iid, column = self.cell_at(event.x, event.y)
+        cell = (iid, column['id']) if column else None
+        if cell == self.tip_cell:
+            return
+        self.hide_tooltip()
+        text = self.tooltip(iid, column['id']) if column else None
+        if not text:
+            return
+        self.tip_cell = cell
+        self.tip = tk.Toplevel(self.tree)
+        self.tip.wm_overrideredirect(True)
+        self.tip.configure(bg='#ffffcc', relief='solid', bd=1)
+        tk.Label(self.tip, text=text, bg='#ffffcc', font=('Arial', 8)).pack(padx=3, pady=1)
+        self.tip.geometry(f"+{event.x_root + 10}+{event.y_root + 20}")
+
+    def hide_tooltip(self):
+        if self.tip is not None:
+            self.tip.destroy()
+            self.tip = None
+        self.tip_cell = None
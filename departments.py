@@ -1,21 +1,36 @@
+import importlib
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk
-from view_details import ViewDetails
-from purchase_request import PurchaseRequest
-from material_received import MaterialReceived
-from suppliers import Suppliers
-from statistics import Statistics
-from costs import Costs
-from trends import Trends
-from inventory_overview import InventoryOverview
-from home_page import HomePage
-from pending_prs import PendingPRs
-from lpo_s import LPOSystem
-from pending import PendingMaterials
-from received import History
+from inventory_highlight import register_inventory
 from loading_widget import LoadingWidget
 import threading
 
+# Tab views are imported the first time they are opened
+VIEW_CLASSES = {
+    'HomePage': ('home_page', 'HomePage'),
+    'ViewDetails': ('view_details', 'ViewDetails'),
+    'InventoryOverview': ('inventory_overview', 'InventoryOverview'),
+    'PurchaseRequest': ('purchase_request', 'PurchaseRequest'),
+    'PendingPRs': ('pending_prs', 'PendingPRs'),
+    'LPOSystem': ('lpo_s', 'LPOSystem'),
+    'MaterialReceived': ('material_received', 'MaterialReceived'),
+    'PendingMaterials': ('pending', 'PendingMaterials'),
+    'Suppliers': ('suppliers', 'Suppliers'),
+    'Statistics': ('statistics', 'Statistics'),
+    'Trends': ('trends', 'Trends'),
+    'Costs': ('costs', 'Costs')
+}
+
+# Built tab views kept per department (least recently shown are destroyed first)
+MAX_CACHED_VIEWS = 6
+
+
+def view_class(name):
+    module_name, class_name = VIEW_CLASSES[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
 class BaseDepartment:
     def __init__(self, parent_frame, back_callback, department_name):
         self.parent_frame = parent_frame
@@ -25,6 +40,9 @@ class BaseDepartment:
         # Pre-create inventory instance to ensure it's available for highlighting
         self.inventory_instance = None
         
+        # (tab, subtab) -> {'frame', 'view', 'inventory'}; hidden, not destroyed, on switch
+        self.views = OrderedDict()
+        
         self.create_page()
     
     def create_page(self):
@@ -167,8 +185,33 @@ class BaseDepartment:
                 font=('Helvetica', 14), bg='#ecf0f1', fg='#7f8c8d').pack(pady=20)
     
     def clear_content(self):
+        """Hide cached tab views and destroy everything else in the content area"""
+        cached = {entry['frame'] for entry in self.views.values()}
         for widget in self.content_frame.winfo_children():
-            widget.destroy()
+            if widget in cached:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+    
+    def tab_target(self, tab_key):
+        """(tab name, subtab) that a main tab currently shows"""
+        tab_mapping = {
+            "🏠 Home": "Home Page",
+            "📦 Products": "View Products", 
+            "🛒 Purchase": "Purchase Request",
+            "📥 Received": "Material Received",
+            "🏢 Suppliers": "Suppliers",
+            "📊 Stats": "Statistics"
+        }
+        
+        # Get current subtab or main tab
+        current_display = self.tab_config[tab_key]["current"]
+        base_tab = tab_key.split()[0] + " " + tab_key.split()[1]
+        return tab_mapping.get(base_tab, "Home Page"), current_display
+    
+    def is_cached(self, tab_name, current_subtab):
+        entry = self.views.get((tab_name, current_subtab))
+        return entry is not None and entry['frame'].winfo_exists()
     
     def handle_tab_click(self, tab_index, tab_key):
         """Handle tab click - either switch tab or show dropdown"""
@@ -181,10 +224,6 @@ class BaseDepartment:
             self.switch_tab(tab_index, tab_key)
     
     def switch_tab(self, tab_index, tab_key):
-        # Show quick loading indicator
-        loader = LoadingWidget(self.content_frame)
-        loader.show_loading(f"Loading {tab_key.split()[1]}...")
-        
         # Update button colors immediately
         for i, btn in enumerate(self.tab_buttons):
             if i == tab_index:
@@ -194,20 +233,16 @@ class BaseDepartment:
         
         self.active_tab = tab_index
         
-        # Map tab key to full names
-        tab_mapping = {
-            "🏠 Home": "Home Page",
-            "📦 Products": "View Products", 
-            "🛒 Purchase": "Purchase Request",
-            "📥 Received": "Material Received",
-            "🏢 Suppliers": "Suppliers",
-            "📊 Stats": "Statistics"
-        }
+        full_tab_name, current_display = self.tab_target(tab_key)
         
-        # Get current subtab or main tab
-        current_display = self.tab_config[tab_key]["current"]
-        base_tab = tab_key.split()[0] + " " + tab_key.split()[1]
-        full_tab_name = tab_mapping.get(base_tab, "Home Page")
+        # Views visited before are still built: show them right away
+        if self.is_cached(full_tab_name, current_display):
+            self.show_tab(full_tab_name, current_display)
+            return
+        
+        # Show quick loading indicator
+        loader = LoadingWidget(self.content_frame)
+        loader.show_loading(f"Loading {tab_key.split()[1]}...")
         
         # Load tab immediately, then hide loading
         self.parent_frame.after(50, lambda: [
@@ -253,16 +288,20 @@ class BaseDepartment:
         """Select a subtab and update the tab display"""
         dropdown.destroy()
         
-        # Quick loading without threading
-        loader = LoadingWidget(self.content_frame)
-        loader.show_loading(f"Loading {subtab.split()[1] if len(subtab.split()) > 1 else subtab}...")
-        
         # Update the current subtab in config
         self.tab_config[tab_key]["current"] = subtab
         
         # Update the tab button text with splitter icon
         self.tab_buttons[tab_index].configure(text=f"{subtab} ▼")
         
+        if self.is_cached(*self.tab_target(tab_key)):
+            self.switch_tab(tab_index, tab_key)
+            return
+        
+        # Quick loading without threading
+        loader = LoadingWidget(self.content_frame)
+        loader.show_loading(f"Loading {subtab.split()[1] if len(subtab.split()) > 1 else subtab}...")
+        
         # Switch tab immediately
         self.parent_frame.after(30, lambda: [
             self.switch_tab(tab_index, tab_key),
@@ -323,67 +362,88 @@ class BaseDepartment:
     def show_tab(self, tab_name, current_subtab=None):
         self.clear_content()
         
+        key = (tab_name, current_subtab)
+        entry = self.views.get(key)
+        if entry is not None and entry['frame'].winfo_exists():
+            # Cached views stay current through storage change events
+            self.views.move_to_end(key)
+            entry['frame'].pack(fill='both', expand=True)
+            if entry['inventory'] is not None:
+                register_inventory(self.department_name, entry['inventory'])
+            return
+        
+        frame = tk.Frame(self.content_frame, bg='#ecf0f1')
+        frame.pack(fill='both', expand=True)
+        view = self.build_tab(frame, tab_name, current_subtab)
+        
+        inventory = None
+        if current_subtab == "📋 Inventory":
+            inventory = view
+        elif view is not None:
+            inventory = getattr(view, 'inventory_overview', None)
+        self.views[key] = {'frame': frame, 'view': view, 'inventory': inventory}
+        
+        while len(self.views) > MAX_CACHED_VIEWS:
+            old_key, old_entry = self.views.popitem(last=False)
+            old_entry['frame'].destroy()
+    
+    def build_tab(self, frame, tab_name, current_subtab=None):
+        """Create the view for a tab inside frame and return it"""
         # Handle specific subtabs
         if current_subtab == "📋 Inventory":
             # Show InventoryOverview for Inventory subtab
-            self.inventory_instance = InventoryOverview(self.content_frame, self.department_name)
-            return
+            self.inventory_instance = view_class('InventoryOverview')(frame, self.department_name)
+            register_inventory(self.department_name, self.inventory_instance)
+            return self.inventory_instance
         elif current_subtab == "📋 View Details":
             # Show ViewDetails for View Details subtab
-            ViewDetails(self.content_frame, self.department_name, include_inventory=True)
-            return
+            return view_class('ViewDetails')(frame, self.department_name, include_inventory=True)
         elif current_subtab == "📋 Pending PR'S":
             # Show PendingPRs for Pending PR'S subtab
-            PendingPRs(self.content_frame, self.department_name)
-            return
+            return view_class('PendingPRs')(frame, self.department_name)
         elif current_subtab == "✅ LPO":
             # Show LPO System for LPO subtab
-            LPOSystem(self.content_frame, self.department_name)
-            return
+            return view_class('LPOSystem')(frame, self.department_name)
         elif current_subtab == "💰 Costs":
             # Show Costs management
-            Costs(self.content_frame, self.department_name)
-            return
+            return view_class('Costs')(frame, self.department_name)
         elif current_subtab == "📉 Trends":
             # Show Trends
-            Trends(self.content_frame, self.department_name)
-            return
+            return view_class('Trends')(frame, self.department_name)
         elif current_subtab == "📈 Reports":
             # Show Statistics with specific subtab
-            Statistics(self.content_frame, self.department_name, current_subtab)
-            return
+            return view_class('Statistics')(frame, self.department_name, current_subtab)
         elif current_subtab == "📦 Pending":
             # Show Pending Materials for Pending subtab under Received
-            PendingMaterials(self.content_frame, self.department_name)
-            return
+            return view_class('PendingMaterials')(frame, self.department_name)
         
         tab_classes = {
-            "Home Page": HomePage,
+            "Home Page": lambda frame, dept: view_class('HomePage')(frame, dept),
             # Use ViewDetails with embedded inventory for the "View Products" tab
-            "View Products": lambda frame, dept: ViewDetails(frame, dept, include_inventory=True),
-            "Purchase Request": PurchaseRequest,
-            "Material Received": MaterialReceived,
-            "Suppliers": Suppliers,
-            "Statistics": lambda frame, dept: Statistics(frame, dept, "📈 Reports")
+            "View Products": lambda frame, dept: view_class('ViewDetails')(frame, dept, include_inventory=True),
+            "Purchase Request": lambda frame, dept: view_class('PurchaseRequest')(frame, dept),
+            "Material Received": lambda frame, dept: view_class('MaterialReceived')(frame, dept),
+            "Suppliers": lambda frame, dept: view_class('Suppliers')(frame, dept),
+            "Statistics": lambda frame, dept: view_class('Statistics')(frame, dept, "📈 Reports")
         }
         
         # Handle Purchase subtabs
         if tab_name == "Purchase Request" and current_subtab == "📝 New PR":
-            PurchaseRequest(self.content_frame, self.department_name)
-            return
+            return view_class('PurchaseRequest')(frame, self.department_name)
         
         if tab_name in tab_classes:
             # Create the main tab content
-            tab_instance = tab_classes[tab_name](self.content_frame, self.department_name)
+            tab_instance = tab_classes[tab_name](frame, self.department_name)
             
             # If there's a current subtab, show subtab info
             if current_subtab and current_subtab != tab_name and current_subtab != "📋 Inventory":
-                info_frame = tk.Frame(self.content_frame, bg='#3498db', height=30)
+                info_frame = tk.Frame(frame, bg='#3498db', height=30)
                 info_frame.pack(fill='x', pady=(0, 5))
                 info_frame.pack_propagate(False)
                 
                 tk.Label(info_frame, text=f"Current View: {current_subtab}", 
                         font=('Helvetica', 10, 'bold'), bg='#3498db', fg='white').pack(pady=5)
+            return tab_instance
 
 class ElectricalDepartment(BaseDepartment):
     def __init__(self, parent_frame, back_callback):
@@ -0,0 +1,71 @@
+import os
+import threading
+
+
+def file_signature(*paths):
+    """(mtime, size) of each file, None for missing files"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class DocumentCache:
+    """Process-wide cache of parsed documents.
+
+    Entries are stored with a signature (file mtime/size, database version, ...) and
+    are parsed again only when the signature a caller presents no longer matches.
+    Cached structures are shared by every view; storage mutations never start from
+    them, they re-read the source and put the new result back.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, signature, loader):
+        """Return the cached document for key, calling loader when it is stale"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = loader()
+        with self.lock:
+            self.entries[key] = (signature, value)
+        return value
+
+    def derived(self, key, document, builder):
+        """Value built from a cached document, rebuilt once that document is replaced"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is document:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = builder(document)
+        with self.lock:
+            self.entries[key] = (document, value)
+        return value
+
+    def put(self, key, signature, value):
+        with self.lock:
+            self.entries[key] = (signature, value)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when no key is given"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+
+document_cache = DocumentCache()
@@ -0,0 +1,212 @@
+import os
+import queue
+import struct
+import threading
+
+# Any write to a stored collection: department, collection, operation, key
+DATA_CHANGED = 'data_changed'
+
+PR_CREATED = 'pr_created'
+PR_APPROVED = 'pr_approved'
+PR_REJECTED = 'pr_rejected'
+DELIVERY_RECORDED = 'delivery_recorded'
+LPO_ARCHIVED = 'lpo_archived'
+LPO_REVERTED = 'lpo_reverted'
+
+# A view shows the data of a finished load: department, view (and error if it failed)
+VIEW_LOADED = 'view_loaded'
+
+# (collection, operation) -> the business event it stands for
+OPERATION_EVENTS = {
+    ('pending_prs', 'insert'): PR_CREATED,
+    ('lpo', 'insert'): PR_APPROVED,
+    ('rejected_prs', 'insert'): PR_REJECTED,
+    ('lpo', 'add_delivery'): DELIVERY_RECORDED,
+    ('archived_lpos', 'insert'): LPO_ARCHIVED,
+    ('archived_lpos', 'delete'): LPO_REVERTED
+}
+
+
+class EventBus:
+    """In-process publish/subscribe so views refresh only when their data changes.
+
+    Events published from other threads (I/O worker, file watcher) are queued and
+    delivered on the Tk thread. Subscriptions tied to a widget end when the widget
+    is destroyed, and a burst of events reaches them once, on the next idle.
+    """
+
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.root = None
+
+    def subscribe(self, topic, handler, widget=None, **match):
+        """Call handler(event) for events on topic whose fields equal match.
+
+        A match value may be a tuple of accepted values. Events that leave a field
+        unset (None) match any value, e.g. an external edit of an unknown collection.
+        """
+        subscription = {'topic': topic, 'handler': handler, 'widget': widget,
+                        'match': match, 'event': None}
+        if widget is not None and self.root is None:
+            self.root = widget.nametowidget('.')
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def publish(self, topic, **event):
+        """Deliver an event now on the Tk thread, or queue it from other threads"""
+        event['topic'] = topic
+        if threading.current_thread() is threading.main_thread():
+            self.deliver(event)
+            return
+        self.queue.put(event)
+        if self.root is not None:
+            try:
+                self.root.after(0, self.flush)
+            except Exception:
+                pass
+
+    def flush(self):
+        """Deliver events queued by other threads (Tk thread)"""
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.deliver(event)
+
+    def deliver(self, event):
+        with self.lock:
+            subscriptions = [s for s in self.subscriptions if s['topic'] == event['topic']]
+        for subscription in subscriptions:
+            if not matches(subscription['match'], event):
+                continue
+            widget = subscription['widget']
+            if widget is None:
+                subscription['handler'](event)
+            elif not exists(widget):
+                self.unsubscribe(subscription)
+            elif subscription['event'] is None:
+                subscription['event'] = event
+                widget.after_idle(lambda s=subscription: self.run(s))
+            else:
+                subscription['event'] = event
+
+    def run(self, subscription):
+        event = subscription['event']
+        subscription['event'] = None
+        if exists(subscription['widget']):
+            subscription['handler'](event)
+
+
+def matches(match, event):
+    for field, accepted in match.items():
+        value = event.get(field)
+        if value is None:
+            continue
+        if isinstance(accepted, tuple):
+            if value not in accepted:
+                return False
+        elif value != accepted:
+            return False
+    return True
+
+
+def exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:
+        return False
+
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """Publishes DATA_CHANGED when data files are changed by another program.
+
+    Uses Linux inotify through libc, so a blocked thread waits for the kernel and
+    nothing is polled. Where inotify is not available start() returns False and
+    only in-process changes are reported.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.files = {}
+        self.watches = {}
+        self.fd = None
+        self.libc = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.fd is not None:
+            return True
+        # Imported here: ctypes.util is slow to import and only needed with watch_files
+        import ctypes
+        import ctypes.util
+        name = ctypes.util.find_library('c')
+        if not name or not hasattr(os, 'read'):
+            return False
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            fd = libc.inotify_init()
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        self.libc = libc
+        self.fd = fd
+        threading.Thread(target=self.run, name='file-watcher', daemon=True).start()
+        return True
+
+    def watch(self, path, department_name, collection=None):
+        """Report changes of path as changes of a department's collection (None: any)"""
+        if not self.start():
+            return
+        path = os.path.abspath(path)
+        directory = os.path.dirname(path)
+        with self.lock:
+            self.files[path] = (department_name, collection)
+            if directory not in self.watches.values():
+                mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+                if wd >= 0:
+                    self.watches[wd] = directory
+
+    def run(self):
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError:
+                return
+            changed = set()
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                with self.lock:
+                    directory = self.watches.get(wd)
+                    if directory is not None:
+                        target = self.files.get(os.path.join(directory, os.fsdecode(name)))
+                        if target is not None:
+                            changed.add(target)
+            for department_name, collection in changed:
+                self.bus.publish(DATA_CHANGED, department=department_name, collection=collection,
+                                 operation=None, key=None, external=True)
+
+
+event_bus = EventBus()
+file_watcher = FileWatcher(event_bus)
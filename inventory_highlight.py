@@ -0,0 +1,111 @@
+PENDING = 'pending'
+LPO = 'lpo'
+LAYERS = (PENDING, LPO)
+
+# InventoryOverview methods that (highlight, clear) a whole layer, for tables
+# without the per-row highlight_code/clear_code_highlight methods
+LAYER_METHODS = {
+    PENDING: ('highlight_pending_items', 'clear_pending_highlights'),
+    LPO: ('highlight_lpo_items', 'clear_lpo_highlights')
+}
+
+
+def code_key(code):
+    return str(code or '').strip().upper()
+
+
+class InventoryHighlights:
+    """Highlight state of one department's inventory table.
+
+    Keeps the resource codes requested for each layer (pending PR or LPO) and the
+    codes last applied to the attached InventoryOverview. A refresh only paints the
+    codes added to a layer and clears the codes removed from it, through the
+    table's highlight_code/clear_code_highlight, which find the row in the table's
+    own code -> row index. The requested layers outlive the table, so an inventory
+    opened later starts with the current highlights.
+    """
+
+    def __init__(self):
+        self.inventory = None
+        self.items = {}
+        self.codes = {}
+        self.applied = {}
+
+    def attach(self, inventory):
+        if inventory is not self.inventory:
+            # Unpaint the previous table if it is still around (e.g. a cached tab)
+            for layer in list(self.applied):
+                self.apply(layer, frozenset(), self.applied[layer])
+            self.inventory = inventory
+            self.applied = {}
+        return self.refresh()
+
+    def highlight(self, layer, items):
+        """Highlight the rows of items' resource codes in layer (replacing its rows)"""
+        self.items[layer] = list(items)
+        self.codes[layer] = frozenset(code_key(item.get('resource_code')) for item in self.items[layer])
+        return self.refresh()
+
+    def clear(self, layer):
+        self.items.pop(layer, None)
+        self.codes.pop(layer, None)
+        return self.refresh()
+
+    def refresh(self):
+        """Paint the added and clear the removed codes of each layer; returns how
+        many codes changed"""
+        changed = 0
+        for layer in LAYERS:
+            if self.inventory is None:
+                break
+            new = self.codes.get(layer, frozenset())
+            applied = self.applied.get(layer, frozenset())
+            if new == applied:
+                continue
+            if not self.apply(layer, new, applied):
+                # The table is gone (or broken); highlights go to the next one attached
+                self.inventory = None
+                self.applied = {}
+                break
+            if new:
+                self.applied[layer] = new
+            else:
+                self.applied.pop(layer, None)
+            changed += len(new ^ applied)
+        return changed
+
+    def apply(self, layer, new, applied):
+        """Move the table's layer from the applied codes to the new ones"""
+        if self.inventory is None:
+            return False
+        try:
+            if hasattr(self.inventory, 'highlight_code'):
+                for code in applied - new:
+                    self.inventory.clear_code_highlight(layer, code)
+                for code in new - applied:
+                    self.inventory.highlight_code(layer, code)
+            else:
+                highlight_method, clear_method = LAYER_METHODS[layer]
+                if new:
+                    getattr(self.inventory, highlight_method)(self.items[layer])
+                else:
+                    getattr(self.inventory, clear_method)()
+            return True
+        except Exception as e:
+            print(f"Error highlighting inventory items: {e}")
+            return False
+
+
+highlights = {}
+
+
+def inventory_highlights(department_name):
+    """The department's highlight state (created on first use)"""
+    if department_name not in highlights:
+        highlights[department_name] = InventoryHighlights()
+    return highlights[department_name]
+
+
+def register_inventory(department_name, inventory):
+    """Make inventory the department's highlight target and apply current highlights"""
+    inventory_highlights(department_name).attach(inventory)
@@ -0,0 +1,82 @@
+import queue
+import threading
+import tkinter as tk
+
+from events import event_bus
+
+
+class IOWorker:
+    """Background thread for storage loads and saves.
+
+    submit() queues a function; its result (or exception) comes back through a
+    thread-safe queue that the Tk thread polls with after() while anything is still
+    outstanding, so parsing and serialization never block the mainloop. A single
+    thread runs tasks in submission order: a load queued after a save sees the save.
+    """
+
+    def __init__(self, poll_ms=25):
+        self.poll_ms = poll_ms
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.poll_job = None
+        self.root = None
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='io-worker', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            widget, func, callback, errback = self.tasks.get()
+            try:
+                result = func()
+            except Exception as e:
+                self.results.put((widget, errback, e, True))
+            else:
+                self.results.put((widget, callback, result, False))
+
+    def submit(self, widget, func, callback=None, errback=None):
+        """Run func() off the Tk thread, then callback(result) or errback(error) on it.
+
+        The handlers are skipped when widget has been destroyed in the meantime.
+        """
+        self.start()
+        self.pending += 1
+        self.tasks.put((widget, func, callback, errback))
+        if self.poll_job is None:
+            self.root = widget.nametowidget('.')
+            self.poll_job = self.root.after(self.poll_ms, self.poll)
+
+    def poll(self):
+        """Hand finished tasks to their handlers; stops polling once nothing is pending"""
+        self.poll_job = None
+        try:
+            # Change events raised by a finished save reach views before its callback
+            event_bus.flush()
+            while True:
+                try:
+                    widget, handler, value, failed = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                self.pending -= 1
+                if handler is None:
+                    if failed:
+                        print(f"Error in background task: {value}")
+                elif exists(widget):
+                    handler(value)
+        finally:
+            if self.pending > 0:
+                self.poll_job = self.root.after(self.poll_ms, self.poll)
+
+
+def exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+io_worker = IOWorker()
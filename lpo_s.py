@@ -1,17 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import os
-from datetime import datetime
+from storage import get_storage
+from procurement import ProcurementService, summary
+from card_grid import VirtualCardGrid, Selection
+from search import SearchController
+from io_worker import io_worker
+from events import event_bus, DATA_CHANGED, VIEW_LOADED
+from inventory_highlight import inventory_highlights, LPO
+from data_table import DataTable
 
 class LPOSystem:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
         self.lpo_items = []
-        self.data_file = f"lpo_{department_name.lower().replace(' ', '_')}.json"
+        self.storage = get_storage(department_name)
+        self.service = ProcurementService(self.storage)
+        self.selection = Selection(self.selection_changed)
         self.create_interface()
         self.load_lpo_data()
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.load_lpo_data(), self.canvas,
+                            department=department_name, collection='lpo')
     
     def create_interface(self):
         # Header
@@ -37,132 +46,100 @@ class LPOSystem:
         search_entry = tk.Entry(filter_frame, textvariable=self.search_var, width=30,
                                font=('Segoe UI', 10))
         search_entry.pack(side='left', padx=(0, 10))
-        search_entry.bind('<KeyRelease>', self.filter_lpos)
+        self.search = SearchController(search_entry, self.display_lpos)
+        search_entry.bind('<KeyRelease>', self.search.schedule)
         
         tk.Button(filter_frame, text="🔄 Refresh", bg='#3498db', fg='white',
                  font=('Segoe UI', 9, 'bold'), command=self.refresh_data).pack(side='right', padx=5)
         
+        # Bulk actions on the checked LPOs
+        bulk_frame = tk.Frame(content_frame, bg='#ecf0f1')
+        bulk_frame.pack(fill='x', pady=(0, 10))
+        
+        tk.Button(bulk_frame, text="☑ Select All", bg='#95a5a6', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.select_all).pack(side='left', padx=(0, 5))
+        tk.Button(bulk_frame, text="☐ Clear", bg='#95a5a6', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.selection.clear).pack(side='left', padx=(0, 10))
+        self.selection_label = tk.Label(bulk_frame, text="0 selected", font=('Segoe UI', 9, 'bold'),
+                                        bg='#ecf0f1', fg='#2c3e50')
+        self.selection_label.pack(side='left')
+        
+        tk.Button(bulk_frame, text="🗑️ Delete Selected", bg='#e74c3c', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.delete_selected).pack(side='right', padx=(5, 0))
+        tk.Button(bulk_frame, text="📦 Mark Delivered", bg='#27ae60', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.mark_selected_delivered).pack(side='right', padx=(5, 0))
+        
         # LPO List with scrollbar
         list_container = tk.Frame(content_frame, bg='white', relief='solid', bd=1)
         list_container.pack(fill='both', expand=True)
         
-        # Canvas for scrolling
-        self.canvas = tk.Canvas(list_container, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(list_container, orient='vertical', command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg='white')
-        
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
-        self.canvas.pack(side='left', fill='both', expand=True)
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
-        
-        # Configure scroll region
-        self.scrollable_frame.bind('<Configure>', 
-                                  lambda e: self.canvas.configure(scrollregion=self.canvas.bbox('all')))
+        # LPO cards; only the rows in view are built
+        self.card_grid = VirtualCardGrid(list_container, self.create_lpo_card, card_height=220,
+                                         key=lambda lpo: lpo.get('lpo_number'))
+        self.canvas = self.card_grid.canvas
     
     def load_lpo_data(self):
-        """Load LPO data from file"""
+        """Load LPO data from storage on the I/O worker"""
+        if not self.lpo_items:
+            self.card_grid.show_message("Loading LPOs...")
+        io_worker.submit(self.canvas, self.read_lpo_data, self.show_lpo_data)
+    
+    def read_lpo_data(self):
+        """LPO records and their search index (I/O worker)"""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.lpo_items = json.load(f)
-            else:
-                self.lpo_items = []
+            records = self.storage.load('lpo')
+            self.storage.search_index('lpo')
+            return records
         except Exception as e:
             print(f"Error loading LPO data: {e}")
-            self.lpo_items = []
-        
+            return []
+    
+    def show_lpo_data(self, records):
+        """Display loaded LPOs"""
+        self.lpo_items = records
+        self.selection.retain(lpo.get('lpo_number') for lpo in self.lpo_items)
         self.display_lpos()
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='lpo')
     
     def save_lpo_data(self):
-        """Save LPO data to file"""
+        """Replace all LPO data in storage"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.lpo_items, f, indent=2, ensure_ascii=False)
+            self.storage.save('lpo', self.lpo_items)
         except Exception as e:
             print(f"Error saving LPO data: {e}")
     
-    def add_approved_pr(self, pr_data):
-        """Add approved PR to LPO system"""
-        # Update status and add approval date
-        pr_data['status'] = 'LPO - Awaiting Delivery'
-        pr_data['approval_date'] = datetime.now().strftime('%d/%m/%Y')
-        pr_data['lpo_status'] = 'Invoice Prepared'
-        
-        # Preserve manually entered LPO details from PR Details section
-        manual_lpo = pr_data.get('lpo_number', '')
-        if manual_lpo and manual_lpo.strip():
-            pr_data['manual_lpo_number'] = manual_lpo
-        
-        # Generate system LPO number based on PR number for internal tracking
-        pr_number = pr_data.get('pr_number', 'PR-000')
-        pr_data['lpo_number'] = pr_number.replace('PR-', 'LPO-')
-        
-        # Add to LPO list
-        self.lpo_items.append(pr_data)
-        self.save_lpo_data()
-        self.display_lpos()
-        
-        return True
-    
     def display_lpos(self):
-        """Display LPO items in the scrollable frame"""
-        # Clear existing content
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
+        """Display LPO items in the card grid"""
         if not self.lpo_items:
-            tk.Label(self.scrollable_frame, text="No LPO items found",
-                    font=('Segoe UI', 12), bg='white', fg='#7f8c8d').pack(pady=50)
+            self.card_grid.show_message("No LPO items found")
             return
         
-        # Filter LPOs based on search
-        search_text = self.search_var.get().lower()
+        # Filter LPOs based on search (numbers, supplier, description, items)
+        matches = self.storage.search('lpo', self.search_var.get())
         filtered_lpos = [lpo for lpo in self.lpo_items 
-                        if search_text in lpo.get('pr_number', '').lower() or
-                           search_text in lpo.get('description', '').lower()]
-        
-        # Create container for horizontal layout
-        self.cards_container = tk.Frame(self.scrollable_frame, bg='white')
-        self.cards_container.pack(fill='both', expand=True, padx=10, pady=10)
+                        if matches is None or lpo.get('lpo_number') in matches]
         
-        self.current_row = None
-        self.cards_in_row = 0
-        
-        for i, lpo in enumerate(filtered_lpos):
-            self.create_lpo_card(lpo, i)
+        self.card_grid.set_items(filtered_lpos)
     
     def get_receiving_status(self, lpo):
         """Calculate receiving status based on deliveries"""
-        deliveries = lpo.get('deliveries', [])
-        if not deliveries:
+        if not lpo.get('deliveries'):
             return 'Yet to Receive'
         
+        received = self.storage.received(lpo)
         items = lpo.get('items', [])
         for item in items:
             ordered_qty = float(item.get('quantity', 0))
-            received_qty = sum([float(d.get('items', {}).get(item.get('resource_code', ''), 0)) 
-                               for d in deliveries])
+            received_qty = received.get(item.get('resource_code', ''), 0)
             if received_qty < ordered_qty:
                 return 'Partially Received'
         
         return 'Completely Received'
     
-    def create_lpo_card(self, lpo, index):
-        """Create a card for each LPO item"""
-        # Create new row if needed (3 cards per row)
-        if self.cards_in_row == 0 or self.cards_in_row >= 3:
-            self.current_row = tk.Frame(self.cards_container, bg='white')
-            self.current_row.pack(fill='x', pady=5)
-            self.cards_in_row = 0
-        
-        # Main card frame with fixed width
-        card_frame = tk.Frame(self.current_row, bg='white', relief='solid', bd=1, width=450, height=220)
-        card_frame.pack(side='left', padx=5, pady=0)
-        card_frame.pack_propagate(False)
-        
-        self.cards_in_row += 1
-        
+    def create_lpo_card(self, card_frame, lpo):
+        """Fill a card frame for an LPO item"""
+        # Buttons act on the current copy of the record, which a reload may have replaced
+        key = lpo.get('lpo_number')
         # Card header with PR number and status
         header_frame = tk.Frame(card_frame, bg='#16a085', height=40)
         header_frame.pack(fill='x')
@@ -170,8 +147,10 @@ class LPOSystem:
         
         # Show manually entered LPO details if available, otherwise show generated LPO number
         display_lpo = lpo.get('manual_lpo_number') or lpo.get('lpo_number', lpo.get('pr_number', 'N/A'))
+        self.selection.checkbox(header_frame, lpo.get('lpo_number'), bg='#16a085', activebackground='#16a085',
+                                selectcolor='white').pack(side='left', padx=(8, 0))
         tk.Label(header_frame, text=f"📋 {display_lpo}", 
-                font=('Segoe UI', 12, 'bold'), bg='#16a085', fg='white').pack(side='left', padx=10, pady=8)
+                font=('Segoe UI', 12, 'bold'), bg='#16a085', fg='white').pack(side='left', padx=(2, 10), pady=8)
         
         # LPO Status badge - calculate from deliveries
         receiving_status = self.get_receiving_status(lpo)
@@ -233,13 +212,13 @@ class LPOSystem:
         
         tk.Button(action_frame, text="👁️ View", bg='#3498db', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.view_lpo(lpo)).pack(side='left', padx=(0, 5))
+                 command=self.card_grid.command(key, self.view_lpo)).pack(side='left', padx=(0, 5))
         
 
         
         tk.Button(action_frame, text="🗑️ Delete", bg='#95a5a6', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.delete_lpo(lpo)).pack(side='right')
+                 command=self.card_grid.command(key, self.delete_lpo)).pack(side='right')
     
     def view_lpo(self, lpo):
         """View LPO details with selected items"""
@@ -320,87 +299,29 @@ class LPOSystem:
         table_container = tk.Frame(items_frame, bg='white')
         table_container.pack(fill='both', expand=True, padx=10, pady=10)
         
-        # Canvas for scrolling
-        canvas = tk.Canvas(table_container, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(table_container, orient='vertical', command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='white')
-        
-        canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
-        canvas.pack(side='left', fill='both', expand=True)
-        canvas.create_window((0, 0), window=scrollable_frame, anchor='nw')
-        
-        # Configure scroll region
-        scrollable_frame.bind('<Configure>', 
-                             lambda e: canvas.configure(scrollregion=canvas.bbox('all')))
-        
         # Display items
         items = lpo.get('items', [])
         if items:
-            # Headers
-            headers = ['S.No', 'Resource Code', 'Item Description', 'Unit', 'Quantity', 'Status']
-            header_frame = tk.Frame(scrollable_frame, bg='#16a085')
-            header_frame.pack(fill='x')
-            
-            for col, header in enumerate(headers):
-                tk.Label(header_frame, text=header, font=('Segoe UI', 10, 'bold'),
-                        bg='#16a085', fg='white', relief='solid', bd=1).grid(
-                        row=0, column=col, sticky='nsew', padx=0, pady=0)
+            columns = [
+                {'id': 'sno', 'text': 'S.No', 'width': 50},
+                {'id': 'resource_code', 'text': 'Resource Code', 'width': 120},
+                {'id': 'item_description', 'text': 'Item Description', 'width': 300, 'anchor': 'w', 'stretch': True},
+                {'id': 'unit', 'text': 'Unit', 'width': 80},
+                {'id': 'quantity', 'text': 'Quantity', 'width': 80},
+                {'id': 'status', 'text': 'Status', 'width': 120}
+            ]
+            items_table = DataTable(table_container, columns, heading_bg='#16a085')
+            items_table.pack(fill='both', expand=True)
             
-            # Configure column weights
-            header_frame.grid_columnconfigure(0, weight=0, minsize=50)
-            header_frame.grid_columnconfigure(1, weight=1, minsize=120)
-            header_frame.grid_columnconfigure(2, weight=3, minsize=300)
-            header_frame.grid_columnconfigure(3, weight=0, minsize=80)
-            header_frame.grid_columnconfigure(4, weight=0, minsize=80)
-            header_frame.grid_columnconfigure(5, weight=0, minsize=120)
-            
-            # Items rows
             for i, item in enumerate(items, 1):
-                row_frame = tk.Frame(scrollable_frame, bg='white')
-                row_frame.pack(fill='x')
-                
-                # S.No
-                tk.Label(row_frame, text=str(i), font=('Segoe UI', 9),
-                        bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                        row=0, column=0, sticky='nsew', padx=0, pady=0)
-                
-                # Resource Code
-                tk.Label(row_frame, text=item.get('resource_code', 'N/A'), font=('Segoe UI', 9),
-                        bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                        row=0, column=1, sticky='nsew', padx=0, pady=0)
-                
-                # Description
-                tk.Label(row_frame, text=item.get('item_description', 'N/A'), font=('Segoe UI', 9),
-                        bg='white', fg='#2c3e50', relief='solid', bd=1, wraplength=300).grid(
-                        row=0, column=2, sticky='nsew', padx=0, pady=0)
-                
-                # Unit
-                tk.Label(row_frame, text=item.get('unit', 'N/A'), font=('Segoe UI', 9),
-                        bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                        row=0, column=3, sticky='nsew', padx=0, pady=0)
-                
-                # Quantity
-                quantity = item.get('quantity', '1')
-                tk.Label(row_frame, text=quantity, font=('Segoe UI', 9),
-                        bg='white', fg='#2c3e50', relief='solid', bd=1).grid(
-                        row=0, column=4, sticky='nsew', padx=0, pady=0)
-                
-                # Status - check receiving status
+                # Status - check receiving status, colour the row text by it
                 status_text, status_color = self.get_item_status(lpo, item)
-                tk.Label(row_frame, text=status_text, font=('Segoe UI', 9, 'bold'),
-                        bg=status_color, fg='white', relief='solid', bd=1).grid(
-                        row=0, column=5, sticky='nsew', padx=0, pady=0)
-                
-                # Configure column weights for each row
-                row_frame.grid_columnconfigure(0, weight=0, minsize=50)
-                row_frame.grid_columnconfigure(1, weight=1, minsize=120)
-                row_frame.grid_columnconfigure(2, weight=3, minsize=300)
-                row_frame.grid_columnconfigure(3, weight=0, minsize=80)
-                row_frame.grid_columnconfigure(4, weight=0, minsize=80)
-                row_frame.grid_columnconfigure(5, weight=0, minsize=120)
+                items_table.tag_configure(status_color, foreground=status_color)
+                items_table.insert((i, item.get('resource_code', 'N/A'), item.get('item_description', 'N/A'),
+                                    item.get('unit', 'N/A'), item.get('quantity', '1'), status_text),
+                                   tags=(status_color,))
         else:
-            tk.Label(scrollable_frame, text="No items found for this LPO",
+            tk.Label(table_container, text="No items found for this LPO",
                     font=('Segoe UI', 12), bg='white', fg='#7f8c8d').pack(pady=50)
         
         # Close button
@@ -419,9 +340,7 @@ class LPOSystem:
         result = messagebox.askyesno("Confirm Delivery", 
                                     f"Mark LPO {lpo.get('lpo_number', lpo.get('pr_number'))} as delivered?")
         if result:
-            lpo['lpo_status'] = 'Delivered'
-            lpo['delivery_date'] = datetime.now().strftime('%d/%m/%Y')
-            self.save_lpo_data()
+            self.service.mark_delivered(lpo)
             self.display_lpos()
             messagebox.showinfo("Success", f"LPO {lpo.get('lpo_number', lpo.get('pr_number'))} marked as delivered!")
     
@@ -432,14 +351,61 @@ class LPOSystem:
         if result:
             self.lpo_items = [item for item in self.lpo_items 
                              if item.get('lpo_number') != lpo.get('lpo_number')]
-            self.save_lpo_data()
+            self.service.delete_lpo(lpo)
             self.display_lpos()
             messagebox.showinfo("Success", f"LPO {lpo.get('lpo_number', lpo.get('pr_number'))} deleted!")
     
-    def filter_lpos(self, event=None):
-        """Filter LPOs based on search text"""
+    def selection_changed(self, count):
+        self.selection_label.config(text=f"{count} selected")
+    
+    def select_all(self):
+        """Check every LPO the current search shows"""
+        self.selection.set(lpo.get('lpo_number') for lpo in self.card_grid.items)
+    
+    def selected_lpos(self):
+        return self.selection.selected(self.lpo_items, lambda lpo: lpo.get('lpo_number'))
+    
+    def mark_selected_delivered(self):
+        """Mark all checked LPOs as delivered in one write"""
+        lpos = self.selected_lpos()
+        if not lpos:
+            messagebox.showwarning("Warning", "Please select the LPOs to mark as delivered.")
+            return
+        if not messagebox.askyesno("Confirm Delivery", f"Mark {len(lpos)} LPO(s) as delivered?"):
+            return
+        try:
+            self.service.mark_lpos_delivered(lpos)
+        except Exception as e:
+            print(f"Error marking LPOs delivered: {e}")
+            messagebox.showerror("Error", f"Failed to mark LPOs as delivered: {str(e)}")
+            return
+        self.selection.clear()
+        self.display_lpos()
+        messagebox.showinfo("Success", summary("Marked as delivered:", len(lpos), []))
+    
+    def delete_selected(self):
+        """Delete all checked LPOs in one write"""
+        lpos = self.selected_lpos()
+        if not lpos:
+            messagebox.showwarning("Warning", "Please select the LPOs to delete.")
+            return
+        if not messagebox.askyesno("Confirm Delete", f"Delete {len(lpos)} LPO(s)?"):
+            return
+        try:
+            self.service.delete_lpos(lpos)
+        except Exception as e:
+            print(f"Error deleting LPOs: {e}")
+            messagebox.showerror("Error", f"Failed to delete LPOs: {str(e)}")
+            return
+        deleted = self.selection.keys
+        self.lpo_items = [item for item in self.lpo_items if item.get('lpo_number') not in deleted]
+        self.selection.clear()
         self.display_lpos()
     
+    def filter_lpos(self, event=None):
+        """Filter LPOs based on search text once typing pauses"""
+        self.search.schedule()
+    
     def refresh_data(self):
         """Refresh LPO data"""
         self.load_lpo_data()
@@ -447,34 +413,14 @@ class LPOSystem:
     def highlight_inventory_items(self, lpo_items):
         """Highlight matching items in inventory overview with green color for LPO items"""
         try:
-            print(f"\n=== GREEN HIGHLIGHTING DEBUG ===")
-            print(f"DEBUG: Highlighting {len(lpo_items)} LPO items in green")
-            for item in lpo_items:
-                print(f"DEBUG: LPO Item - Resource: '{item.get('resource_code')}', Description: '{item.get('item_description')}'")
-            
-            # Find inventory overview widget in the application
-            inventory_widget = self.find_inventory_widget()
-            print(f"DEBUG: Found inventory widget: {inventory_widget is not None}")
-            if inventory_widget:
-                print(f"DEBUG: Calling highlight_lpo_items on widget: {type(inventory_widget)}")
-                inventory_widget.highlight_lpo_items(lpo_items)
-                print(f"DEBUG: highlight_lpo_items called successfully")
-            else:
-                print("DEBUG: No inventory widget found - checking registry...")
-                from inventory_overview import get_all_inventory_instances
-                all_instances = get_all_inventory_instances()
-                print(f"DEBUG: All available inventory instances: {list(all_instances.keys())}")
+            inventory_highlights(self.department_name).highlight(LPO, lpo_items)
         except Exception as e:
-            print(f"ERROR highlighting inventory items: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error highlighting inventory items: {e}")
     
     def clear_inventory_highlights(self):
         """Clear green highlights from inventory overview"""
         try:
-            inventory_widget = self.find_inventory_widget()
-            if inventory_widget:
-                inventory_widget.clear_lpo_highlights()
+            inventory_highlights(self.department_name).clear(LPO)
         except Exception as e:
             print(f"Error clearing inventory highlights: {e}")
     
@@ -484,28 +430,15 @@ class LPOSystem:
         resource_code = item.get('resource_code', '')
         ordered_qty = float(item.get('quantity', 0))
         
-        # Check if LPO exists in pending materials
-        pending_file = f"lpo_{self.department_name.lower().replace(' ', '_')}.json"
-        if not os.path.exists(pending_file):
-            return 'Completely Received', '#27ae60'
-        
         try:
-            with open(pending_file, 'r', encoding='utf-8') as f:
-                pending_lpos = json.load(f)
-            
-            # Find matching LPO
-            matching_lpo = None
-            for pending_lpo in pending_lpos:
-                if pending_lpo.get('lpo_number') == lpo_number:
-                    matching_lpo = pending_lpo
-                    break
+            # Find matching LPO in pending materials
+            matching_lpo = self.storage.index('lpo').get(lpo_number)
             
             if not matching_lpo:
                 return 'Completely Received', '#27ae60'
             
-            # Calculate received quantity for this item
-            deliveries = matching_lpo.get('deliveries', [])
-            received_qty = sum([float(d.get('items', {}).get(resource_code, 0)) for d in deliveries])
+            # Received quantity for this item
+            received_qty = self.storage.received(matching_lpo).get(resource_code, 0)
             pending_qty = ordered_qty - received_qty
             
             if pending_qty <= 0:
@@ -515,35 +448,4 @@ class LPOSystem:
         
         except Exception as e:
             print(f"Error checking item status: {e}")
-            return 'Unknown', '#95a5a6'
-    
-    def find_inventory_widget(self):
-        """Find the inventory overview widget in the application"""
-        try:
-            # Import the function to get inventory instance
-            from inventory_overview import get_inventory_instance, get_all_inventory_instances
-            
-            all_instances = get_all_inventory_instances()
-            
-            # Find the most recently created inventory instance for this department
-            best_match = None
-            for key, instance in all_instances.items():
-                # Check if it's for the same department
-                if self.department_name.lower().replace(' ', '_') in key.lower():
-                    # Test if the widget is still valid by trying to access a property
-                    try:
-                        # Try to access the cells to see if widget is still alive
-                        if hasattr(instance, 'cells') and len(instance.cells) > 0:
-                            # Try to access the first cell to test if it's valid
-                            test_cell = instance.cells[0][1]
-                            test_cell.winfo_exists()  # This will raise an error if widget is destroyed
-                            best_match = instance
-                            break
-                    except Exception as e:
-                        continue
-            
-            return best_match
-            
-        except Exception as e:
-            print(f"Error finding inventory widget: {e}")
-            return None
\ No newline at end of file
+            return 'Unknown', '#95a5a6'
\ No newline at end of file
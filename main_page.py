@@ -1,7 +1,12 @@
+import sys
+import startup_profile
+
+# Started before the remaining imports so that their cost is measured
+startup = startup_profile.from_args(sys.argv) if __name__ == "__main__" else None
+
 import tkinter as tk
 from tkinter import ttk
-import json
-import os
+from atomic_io import PRETTY, load_data, save_data
 from departments import ElectricalDepartment, PlumbingDepartment, DuctingDepartment, FirefightingDepartment, FireAlarmDepartment, BaseDepartment
 
 class MainPage:
@@ -134,10 +139,9 @@ class MainPage:
         }
         
         if department in department_classes:
-            department_classes[department](self.main_frame, self.show_home_page)
-        else:
-            # Use BaseDepartment for custom departments
-            BaseDepartment(self.main_frame, self.show_home_page, department)
+            return department_classes[department](self.main_frame, self.show_home_page)
+        # Use BaseDepartment for custom departments
+        return BaseDepartment(self.main_frame, self.show_home_page, department)
     
     def add_department(self):
         """Add a new department"""
@@ -178,19 +182,14 @@ class MainPage:
     def load_custom_departments(self):
         """Load custom departments from file"""
         try:
-            if os.path.exists('custom_departments.json'):
-                with open('custom_departments.json', 'r', encoding='utf-8') as f:
-                    self.custom_departments = json.load(f)
-            else:
-                self.custom_departments = []
+            self.custom_departments = load_data('custom_departments.json', [])
         except Exception:
             self.custom_departments = []
     
     def save_custom_departments(self):
         """Save custom departments to file"""
         try:
-            with open('custom_departments.json', 'w', encoding='utf-8') as f:
-                json.dump(self.custom_departments, f, indent=2, ensure_ascii=False)
+            save_data('custom_departments.json', self.custom_departments, format=PRETTY)
         except Exception as e:
             print(f"Error saving custom departments: {e}")
     
@@ -223,4 +222,6 @@ if __name__ == "__main__":
     root = tk.Tk()
     root.resizable(True, True)  # Allow resizing and maximize
     app = MainPage(root)
+    if startup is not None:
+        startup.run(root, app)
     root.mainloop()
\ No newline at end of file
@@ -1,22 +1,31 @@
 import tkinter as tk
 from tkinter import messagebox
 from tkcalendar import DateEntry
-import json
-import os
 from datetime import datetime
+from storage import get_storage
+from procurement import ProcurementService, ValidationError, delivery_lines, parse_quantities
+from card_grid import VirtualCardGrid
+from search import SearchController
+from io_worker import io_worker
+from events import event_bus, DATA_CHANGED, VIEW_LOADED
+from data_table import DataTable
 
 class PendingMaterials:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
         self.lpo_items = []
-        self.data_file = f"lpo_{department_name.lower().replace(' ', '_')}.json"
+        self.storage = get_storage(department_name)
+        self.service = ProcurementService(self.storage)
         self.auto_refresh_enabled = False
-        self.refresh_job = None
         self.receive_auto_refresh_enabled = False
-        self.receive_refresh_job = None
+        self.items_table = None
         self.create_interface()
         self.load_lpo_data()
+        
+        # Reload on LPO or delivery changes while auto refresh is on
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.lpo_data_changed(), self.canvas,
+                            department=department_name, collection='lpo')
     
     def create_interface(self):
         # Header
@@ -42,13 +51,14 @@ class PendingMaterials:
         search_entry = tk.Entry(filter_frame, textvariable=self.search_var, width=30,
                                font=('Segoe UI', 10))
         search_entry.pack(side='left', padx=(0, 10))
-        search_entry.bind('<KeyRelease>', self.filter_lpos)
+        self.search = SearchController(search_entry, self.display_lpos)
+        search_entry.bind('<KeyRelease>', self.search.schedule)
         
         tk.Button(filter_frame, text="🔄 Refresh", bg='#3498db', fg='white',
                  font=('Segoe UI', 9, 'bold'), command=self.refresh_data).pack(side='right', padx=5)
         
         self.auto_refresh_var = tk.BooleanVar(value=False)
-        auto_refresh_check = tk.Checkbutton(filter_frame, text="Auto Refresh (30s)", variable=self.auto_refresh_var,
+        auto_refresh_check = tk.Checkbutton(filter_frame, text="Auto Refresh", variable=self.auto_refresh_var,
                                            font=('Segoe UI', 9, 'bold'), bg='#ecf0f1', fg='#2c3e50',
                                            command=self.toggle_auto_refresh)
         auto_refresh_check.pack(side='right', padx=5)
@@ -57,48 +67,42 @@ class PendingMaterials:
         list_container = tk.Frame(content_frame, bg='white', relief='solid', bd=1)
         list_container.pack(fill='both', expand=True)
         
-        # Canvas for scrolling
-        self.canvas = tk.Canvas(list_container, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(list_container, orient='vertical', command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg='white')
-        
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
-        self.canvas.pack(side='left', fill='both', expand=True)
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
-        
-        # Configure scroll region
-        self.scrollable_frame.bind('<Configure>', 
-                                  lambda e: self.canvas.configure(scrollregion=self.canvas.bbox('all')))
+        # LPO cards; only the rows in view are built
+        self.card_grid = VirtualCardGrid(list_container, self.create_lpo_card, card_height=220,
+                                         key=lambda lpo: lpo.get('lpo_number'))
+        self.canvas = self.card_grid.canvas
     
     def load_lpo_data(self):
-        """Load LPO data from file"""
+        """Load LPO data from storage on the I/O worker"""
+        if not self.lpo_items:
+            self.card_grid.show_message("Loading LPOs...")
+        io_worker.submit(self.canvas, self.read_lpo_data, self.show_lpo_data)
+    
+    def read_lpo_data(self):
+        """LPO records and their search index (I/O worker)"""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.lpo_items = json.load(f)
-            else:
-                self.lpo_items = []
+            records = self.storage.load('lpo')
+            self.storage.search_index('lpo')
+            return records
         except Exception as e:
             print(f"Error loading LPO data: {e}")
-            self.lpo_items = []
-        
+            return []
+    
+    def show_lpo_data(self, records):
+        """Display loaded LPOs"""
+        self.lpo_items = records
         self.display_lpos()
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='pending')
     
     def save_lpo_data(self):
-        """Save LPO data to file"""
+        """Replace all LPO data in storage"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.lpo_items, f, indent=2, ensure_ascii=False)
+            self.storage.save('lpo', self.lpo_items)
         except Exception as e:
             print(f"Error saving LPO data: {e}")
     
     def display_lpos(self):
         """Display pending LPO items in card format"""
-        # Clear existing content
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
         # Filter only pending LPOs (not fully received)
         pending_lpos = []
         for lpo in self.lpo_items:
@@ -107,41 +111,20 @@ class PendingMaterials:
                 pending_lpos.append(lpo)
         
         if not pending_lpos:
-            tk.Label(self.scrollable_frame, text="No pending materials to receive",
-                    font=('Segoe UI', 12), bg='white', fg='#7f8c8d').pack(pady=50)
+            self.card_grid.show_message("No pending materials to receive")
             return
         
-        # Filter LPOs based on search
-        search_text = self.search_var.get().lower()
+        # Filter LPOs based on search (numbers, supplier, description, items)
+        matches = self.storage.search('lpo', self.search_var.get())
         filtered_lpos = [lpo for lpo in pending_lpos 
-                        if search_text in lpo.get('lpo_number', '').lower() or
-                           search_text in lpo.get('supplier_name', '').lower()]
+                        if matches is None or lpo.get('lpo_number') in matches]
         
-        # Create container for horizontal layout
-        self.cards_container = tk.Frame(self.scrollable_frame, bg='white')
-        self.cards_container.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        self.current_row = None
-        self.cards_in_row = 0
-        
-        for i, lpo in enumerate(filtered_lpos):
-            self.create_lpo_card(lpo, i)
+        self.card_grid.set_items(filtered_lpos)
     
-    def create_lpo_card(self, lpo, index):
-        """Create a card for each pending LPO item"""
-        # Create new row if needed (3 cards per row)
-        if self.cards_in_row == 0 or self.cards_in_row >= 3:
-            self.current_row = tk.Frame(self.cards_container, bg='white')
-            self.current_row.pack(fill='x', pady=5)
-            self.cards_in_row = 0
-        
-        # Main card frame with fixed width
-        card_frame = tk.Frame(self.current_row, bg='white', relief='solid', bd=1, width=450, height=220)
-        card_frame.pack(side='left', padx=5, pady=0)
-        card_frame.pack_propagate(False)
-        
-        self.cards_in_row += 1
-        
+    def create_lpo_card(self, card_frame, lpo):
+        """Fill a card frame for a pending LPO item"""
+        # Buttons act on the current copy of the record, which a reload may have replaced
+        key = lpo.get('lpo_number')
         # Card header with LPO number and status
         header_frame = tk.Frame(card_frame, bg='#e67e22', height=40)
         header_frame.pack(fill='x')
@@ -207,43 +190,25 @@ class PendingMaterials:
         
         tk.Button(action_frame, text="📥 Receive", bg='#27ae60', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.receive_materials(lpo)).pack(side='left', padx=(0, 5))
+                 command=self.card_grid.command(key, self.receive_materials)).pack(side='left', padx=(0, 5))
         
         tk.Button(action_frame, text="👁️ View", bg='#3498db', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.view_lpo(lpo)).pack(side='left', padx=(0, 5))
+                 command=self.card_grid.command(key, self.view_lpo)).pack(side='left', padx=(0, 5))
     
     def get_delivery_status(self, lpo):
         """Get delivery status of LPO"""
-        deliveries = lpo.get('deliveries', [])
-        if not deliveries:
-            return 'Pending'
-        
-        # Check if all items are fully received
-        items = lpo.get('items', [])
-        for item in items:
-            ordered_qty = float(item.get('quantity', 0))
-            received_qty = sum([float(d.get('items', {}).get(item.get('resource_code', ''), 0)) 
-                               for d in deliveries])
-            if received_qty < ordered_qty:
-                return 'Partial'
-        
-        return 'Completed'
+        return self.storage.delivery_status(lpo)
     
     def receive_materials(self, lpo):
         """Open material receiving dialog"""
         # Check if LPO is priced
-        archive_file = f"archived_lpos_{self.department_name.lower().replace(' ', '_')}.json"
-        is_priced = False
-        
-        if os.path.exists(archive_file):
-            try:
-                with open(archive_file, 'r', encoding='utf-8') as f:
-                    archived_lpos = json.load(f)
-                lpo_id = lpo.get('lpo_number')
-                is_priced = any(archived_lpo.get('lpo_number') == lpo_id for archived_lpo in archived_lpos)
-            except:
-                pass
+        try:
+            is_priced = (self.storage.exists('archived_lpos')
+                         and lpo.get('lpo_number') in self.storage.index('archived_lpos'))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load archived LPOs: {str(e)}")
+            return
         
         # If not priced, ask for permission
         if not is_priced:
@@ -256,6 +221,8 @@ class PendingMaterials:
             if not result:
                 return
         
+        deliveries = lpo.get('deliveries', [])
+        
         # Create popup window
         receive_window = tk.Toplevel(self.parent_frame)
         receive_window.title(f"Receive Materials - {lpo.get('manual_lpo_number') or lpo.get('lpo_number', 'N/A')}")
@@ -294,9 +261,10 @@ class PendingMaterials:
         
         # Auto refresh checkbox
         self.receive_auto_refresh_var = tk.BooleanVar(value=False)
-        auto_refresh_check = tk.Checkbutton(control_frame, text="Auto Refresh (30s)", variable=self.receive_auto_refresh_var,
+        self.receive_auto_refresh_enabled = False
+        auto_refresh_check = tk.Checkbutton(control_frame, text="Auto Refresh", variable=self.receive_auto_refresh_var,
                                            font=('Segoe UI', 9, 'bold'), bg='#ecf0f1', fg='#2c3e50',
-                                           command=lambda: self.toggle_receive_auto_refresh(lpo, receive_window))
+                                           command=lambda: self.toggle_receive_auto_refresh(lpo))
         auto_refresh_check.pack(side='left', padx=10)
         
         # Save button in top right corner
@@ -309,138 +277,11 @@ class PendingMaterials:
         items_container = tk.Frame(items_frame, bg='white')
         items_container.pack(fill='both', expand=True, padx=10, pady=(10, 10))
         
-        # Canvas for scrolling items
-        items_canvas = tk.Canvas(items_container, bg='white', highlightthickness=0)
-        items_scrollbar = tk.Scrollbar(items_container, orient='vertical', command=items_canvas.yview)
-        items_scrollable = tk.Frame(items_canvas, bg='white')
-        
-        items_canvas.configure(yscrollcommand=items_scrollbar.set)
-        items_scrollbar.pack(side='right', fill='y')
-        items_canvas.pack(side='left', fill='both', expand=True)
-        items_canvas.create_window((0, 0), window=items_scrollable, anchor='nw')
-        
-        items_scrollable.bind('<Configure>', 
-                             lambda e: items_canvas.configure(scrollregion=items_canvas.bbox('all')))
-        
-        # Display items with receive quantity inputs
-        self.receive_entries = {}
-        items = lpo.get('items', [])
-        deliveries = lpo.get('deliveries', [])
-        
-        # Create table with proper grid layout
-        table_frame = tk.Frame(items_scrollable, bg='white')
-        table_frame.pack(fill='both', expand=True, padx=5, pady=5)
-        
-        # Store reference for refreshing
-        self.items_table_frame = table_frame
-        
-        # Headers with grid
-        headers = ["Resource Code", "Item Description", "Unit", "Ordered", "Received", "Pending", "Receive Now", "Unit Rate", "Total Price"]
-        col_widths = [12, 25, 6, 8, 8, 8, 10, 10, 12]
-        
-        for col, (header, width) in enumerate(zip(headers, col_widths)):
-            header_label = tk.Label(table_frame, text=header, font=('Segoe UI', 10, 'bold'),
-                                   bg='#34495e', fg='white', relief='solid', bd=1)
-            header_label.grid(row=0, column=col, sticky='nsew', padx=0, pady=0)
-            table_frame.grid_columnconfigure(col, weight=1 if col == 1 else 0, minsize=width*8)
-        
-        # Calculate totals
-        total_amount = 0
-        balance_amount = 0
-        
-        # Data rows with grid
-        for i, item in enumerate(items, 1):
-            row_bg = 'white' if i % 2 == 1 else '#f8f9fa'
-            
-            # Resource Code
-            resource_code = item.get('resource_code', '')
-            code_label = tk.Label(table_frame, text=resource_code, 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='center')
-            code_label.grid(row=i, column=0, sticky='nsew', padx=0, pady=0)
-            
-            # Item description
-            item_label = tk.Label(table_frame, text=item.get('item_description', 'N/A'), 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='w', wraplength=220)
-            item_label.grid(row=i, column=1, sticky='nsew', padx=0, pady=0)
-            
-            # Unit
-            unit_label = tk.Label(table_frame, text=item.get('unit', 'Nos'), 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='center')
-            unit_label.grid(row=i, column=2, sticky='nsew', padx=0, pady=0)
-            
-            # Ordered quantity
-            ordered_qty = float(item.get('quantity', 0))
-            ordered_label = tk.Label(table_frame, text=f"{ordered_qty:.0f}", 
-                                   font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', relief='solid', bd=1)
-            ordered_label.grid(row=i, column=3, sticky='nsew', padx=0, pady=0)
-            
-            # Already received quantity
-            received_qty = sum([float(d.get('items', {}).get(resource_code, 0)) for d in deliveries])
-            received_label = tk.Label(table_frame, text=f"{received_qty:.0f}", 
-                                    font=('Segoe UI', 9), bg=row_bg, fg='#27ae60', relief='solid', bd=1)
-            received_label.grid(row=i, column=4, sticky='nsew', padx=0, pady=0)
-            
-            # Pending quantity
-            pending_qty = ordered_qty - received_qty
-            pending_label = tk.Label(table_frame, text=f"{pending_qty:.0f}", 
-                                   font=('Segoe UI', 9), bg=row_bg, fg='#e74c3c', relief='solid', bd=1)
-            pending_label.grid(row=i, column=5, sticky='nsew', padx=0, pady=0)
-            
-            # Receive quantity entry
-            entry_frame = tk.Frame(table_frame, bg=row_bg, relief='solid', bd=1)
-            entry_frame.grid(row=i, column=6, sticky='nsew', padx=0, pady=0)
-            
-            receive_entry = tk.Entry(entry_frame, font=('Segoe UI', 9), justify='center', bd=0)
-            receive_entry.pack(fill='both', expand=True, padx=2, pady=2)
-            receive_entry.insert(0, "0")
-            self.receive_entries[resource_code] = receive_entry
-            
-            # Get unit rate from trends
-            unit_rate = self.get_unit_rate(resource_code, item.get('item_description', ''))
-            
-            # Calculate amounts
-            total_amount += received_qty * unit_rate
-            balance_amount += pending_qty * unit_rate
-            
-            # Unit Rate display
-            rate_label = tk.Label(table_frame, text=f"{unit_rate:.2f}" if unit_rate else "0.00", 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', relief='solid', bd=1)
-            rate_label.grid(row=i, column=7, sticky='nsew', padx=0, pady=0)
-            
-            # Total Price display
-            total_label = tk.Label(table_frame, text="0.00", 
-                                  font=('Segoe UI', 9, 'bold'), bg=row_bg, fg='#27ae60', relief='solid', bd=1)
-            total_label.grid(row=i, column=8, sticky='nsew', padx=0, pady=0)
-            
-            # Bind entry to update total price
-            receive_entry.bind('<KeyRelease>', lambda e, rate=unit_rate, label=total_label, entry=receive_entry: 
-                              self.update_total_price(entry, rate, label))
-        
-        # Add summary rows
-        summary_row = len(items) + 1
-        
-        # Total Amount
-        total_label_frame = tk.Frame(table_frame, bg='#2c3e50', relief='solid', bd=1)
-        total_label_frame.grid(row=summary_row, column=0, columnspan=7, sticky='nsew', padx=0, pady=0)
-        tk.Label(total_label_frame, text="Total Amount (Received):", font=('Segoe UI', 10, 'bold'),
-                bg='#2c3e50', fg='white', anchor='e', padx=10).pack(fill='both', expand=True)
-        
-        total_amount_label = tk.Label(table_frame, text=f"{total_amount:.2f}", 
-                                     font=('Segoe UI', 10, 'bold'), bg='#27ae60', fg='white', relief='solid', bd=1)
-        total_amount_label.grid(row=summary_row, column=7, columnspan=2, sticky='nsew', padx=0, pady=0)
-        
-        # Balance Amount
-        balance_label_frame = tk.Frame(table_frame, bg='#2c3e50', relief='solid', bd=1)
-        balance_label_frame.grid(row=summary_row+1, column=0, columnspan=7, sticky='nsew', padx=0, pady=0)
-        tk.Label(balance_label_frame, text="Balance Amount (Pending):", font=('Segoe UI', 10, 'bold'),
-                bg='#2c3e50', fg='white', anchor='e', padx=10).pack(fill='both', expand=True)
-        
-        balance_amount_label = tk.Label(table_frame, text=f"{balance_amount:.2f}", 
-                                       font=('Segoe UI', 10, 'bold'), bg='#e74c3c', fg='white', relief='solid', bd=1)
-        balance_amount_label.grid(row=summary_row+1, column=7, columnspan=2, sticky='nsew', padx=0, pady=0)
+        # Items with receive quantity inputs
+        self.create_items_table(items_container)
+        self.refresh_items_table(lpo)
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.receive_data_changed(lpo), self.items_table.tree,
+                            department=self.department_name, collection=('lpo', 'trends'))
         
         # Bottom section - Delivery History
         history_frame = tk.LabelFrame(main_frame, text="Delivery History", font=('Segoe UI', 12, 'bold'),
@@ -520,17 +361,8 @@ class PendingMaterials:
                 tk.Label(headers_frame, text="Quantity", font=('Segoe UI', 10, 'bold'),
                         bg='#ecf0f1', fg='#2c3e50', width=10).pack(side='left', padx=5)
                 
-                # Items data
-                for j, (item_code, qty) in enumerate(delivery.get('items', {}).items()):
-                    # Find item description and unit from LPO items
-                    item_desc = 'N/A'
-                    item_unit = 'Nos'
-                    for lpo_item in items:
-                        if lpo_item.get('resource_code') == item_code:
-                            item_desc = lpo_item.get('item_description', 'N/A')
-                            item_unit = lpo_item.get('unit', 'Nos')
-                            break
-                    
+                # Items data, with description and unit from the LPO items
+                for j, (item_code, item_desc, item_unit, qty) in enumerate(delivery_lines(lpo, delivery)):
                     item_row = tk.Frame(items_frame, bg='white' if j % 2 == 0 else '#f8f9fa')
                     item_row.pack(fill='x', pady=1)
                     
@@ -563,56 +395,26 @@ class PendingMaterials:
     def record_delivery(self, lpo, window):
         """Record a new delivery"""
         # Collect received quantities
-        delivery_items = {}
-        has_items = False
-        
-        for resource_code, entry in self.receive_entries.items():
-            try:
-                qty = float(entry.get() or 0)
-                if qty > 0:
-                    delivery_items[resource_code] = qty
-                    has_items = True
-            except ValueError:
-                messagebox.showerror("Error", f"Invalid quantity for {resource_code}")
-                return
-        
-        if not has_items:
-            messagebox.showwarning("Warning", "Please enter quantities to receive")
+        try:
+            delivery_items = parse_quantities(self.receive_quantities())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        # Create delivery record with selected date
+        # Save the delivery with the selected date and update the LPO status
         selected_date = self.delivery_date.get_date().strftime('%Y-%m-%d')
-        delivery = {
-            'date': selected_date,
-            'items': delivery_items
-        }
-        
-        # Add to LPO deliveries
-        if 'deliveries' not in lpo:
-            lpo['deliveries'] = []
-        lpo['deliveries'].append(delivery)
-        
-        # Update LPO status - mark as completed if all items received
-        delivery_status = self.get_delivery_status(lpo)
-        if delivery_status == 'Completed':
-            lpo['lpo_status'] = 'Completed'
-        else:
-            lpo['lpo_status'] = 'Partially Received'
-        
-        # Save data
-        self.save_lpo_data()
+        try:
+            self.service.record_delivery(lpo, delivery_items, selected_date)
+        except ValidationError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
         
         # Don't show success message - just update silently
         
         # Refresh the delivery history in the same window
         self.refresh_delivery_history(window, lpo)
         
-        # Clear the input fields
-        for entry in self.receive_entries.values():
-            entry.delete(0, tk.END)
-            entry.insert(0, "0")
-        
-        # Update the received quantities display
+        # Update the received quantities display and clear the input fields
         self.refresh_items_table(lpo)
         
         # Don't close the window - keep it open for more deliveries
@@ -672,20 +474,15 @@ class PendingMaterials:
         
         def save_edit():
             # Update delivery
-            delivery['date'] = edit_date.get_date().strftime('%Y-%m-%d')
-            for item_code, entry in edit_entries.items():
-                try:
-                    qty = float(entry.get() or 0)
-                    if qty > 0:
-                        delivery['items'][item_code] = qty
-                    else:
-                        del delivery['items'][item_code]
-                except ValueError:
-                    messagebox.showerror("Error", f"Invalid quantity for {item_code}")
-                    return
+            try:
+                quantities = parse_quantities({code: entry.get() for code, entry in edit_entries.items()})
+            except ValidationError as e:
+                messagebox.showerror("Error", str(e))
+                return
             
             # Save and refresh
-            self.save_lpo_data()
+            self.service.update_delivery(lpo, delivery_index, edit_date.get_date().strftime('%Y-%m-%d'),
+                                         quantities)
             messagebox.showinfo("Success", "Delivery updated successfully!")
             edit_window.destroy()
             self.refresh_delivery_history(parent_window, lpo)
@@ -703,15 +500,9 @@ class PendingMaterials:
         result = messagebox.askyesno("Confirm Delete", 
                                     f"Delete Delivery #{delivery_index + 1}?\nThis action cannot be undone.")
         if result:
-            deliveries = lpo.get('deliveries', [])
-            if delivery_index < len(deliveries):
-                del deliveries[delivery_index]
-                
-                # Update LPO status
-                lpo['lpo_status'] = self.get_delivery_status(lpo)
-                
+            if delivery_index < len(lpo.get('deliveries', [])):
                 # Save and refresh
-                self.save_lpo_data()
+                self.service.delete_delivery(lpo, delivery_index)
                 messagebox.showinfo("Success", "Delivery deleted successfully!")
                 self.refresh_delivery_history(parent_window, lpo)
     
@@ -772,8 +563,8 @@ class PendingMaterials:
                  command=view_window.destroy).pack(side='right')
     
     def filter_lpos(self, event=None):
-        """Filter LPOs based on search text"""
-        self.display_lpos()
+        """Filter LPOs based on search text once typing pauses"""
+        self.search.schedule()
     
     def refresh_data(self):
         """Refresh LPO data"""
@@ -781,65 +572,35 @@ class PendingMaterials:
     
     def toggle_auto_refresh(self):
         """Toggle auto refresh on/off"""
-        if self.auto_refresh_var.get():
-            self.auto_refresh_enabled = True
-            self.schedule_refresh()
-        else:
-            self.auto_refresh_enabled = False
-            if self.refresh_job:
-                self.parent_frame.after_cancel(self.refresh_job)
-                self.refresh_job = None
+        self.auto_refresh_enabled = self.auto_refresh_var.get()
+        if self.auto_refresh_enabled:
+            self.refresh_data()
     
-    def schedule_refresh(self):
-        """Schedule next auto refresh"""
+    def lpo_data_changed(self):
+        """Reload the list after an LPO change when auto refresh is on"""
         if self.auto_refresh_enabled:
             self.refresh_data()
-            self.refresh_job = self.parent_frame.after(30000, self.schedule_refresh)
     
-    def toggle_receive_auto_refresh(self, lpo, receive_window):
+    def toggle_receive_auto_refresh(self, lpo):
         """Toggle auto refresh in receive materials window"""
-        if self.receive_auto_refresh_var.get():
-            self.receive_auto_refresh_enabled = True
-            self.schedule_receive_refresh(lpo)
-        else:
-            self.receive_auto_refresh_enabled = False
-            if hasattr(self, 'receive_refresh_job') and self.receive_refresh_job:
-                receive_window.after_cancel(self.receive_refresh_job)
-                self.receive_refresh_job = None
-    
-    def schedule_receive_refresh(self, lpo):
-        """Schedule next auto refresh for receive window"""
-        if hasattr(self, 'receive_auto_refresh_enabled') and self.receive_auto_refresh_enabled:
+        self.receive_auto_refresh_enabled = self.receive_auto_refresh_var.get()
+        if self.receive_auto_refresh_enabled:
             self.refresh_items_table(lpo)
-            if hasattr(self, 'items_table_frame'):
-                self.receive_refresh_job = self.items_table_frame.after(30000, lambda: self.schedule_receive_refresh(lpo))
     
-    def get_unit_rate(self, resource_code, item_description):
-        """Get unit rate from trends file"""
-        try:
-            trends_file = f"trends_{self.department_name.lower().replace(' ', '_')}.json"
-            if os.path.exists(trends_file):
-                with open(trends_file, 'r', encoding='utf-8') as f:
-                    trends_data = json.load(f)
-                
-                for item_key, trend in trends_data.items():
-                    if (trend.get('resource_code', '').lower() == resource_code.lower() and 
-                        trend.get('item_description', '').lower() == item_description.lower()):
-                        price_history = trend.get('price_history', [])
-                        if price_history:
-                            return float(price_history[-1].get('price', 0))
-            return 0.0
-        except:
-            return 0.0
+    def receive_data_changed(self, lpo):
+        """Update received quantities and rates after a change when auto refresh is on"""
+        if self.receive_auto_refresh_enabled:
+            self.refresh_items_table(lpo)
     
-    def update_total_price(self, entry, unit_rate, label):
-        """Update total price when quantity changes"""
+    def update_total_price(self, row_id, column_id, value):
+        """Update total price when the receive quantity changes"""
         try:
-            qty = float(entry.get() or 0)
-            total = qty * unit_rate
-            label.configure(text=f"{total:.2f}")
-        except:
-            label.configure(text="0.00")
+            qty = float(value or 0)
+            unit_rate = float(self.items_table.get(row_id, 'unit_rate') or 0)
+            self.items_table.set(row_id, 'total_price', f"{qty * unit_rate:.2f}")
+        except ValueError:
+            self.items_table.set(row_id, 'total_price', "0.00")
+        return value
     
     def refresh_delivery_history(self, receive_window, lpo):
         """Refresh the delivery history section without closing the window"""
@@ -912,18 +673,8 @@ class PendingMaterials:
                 tk.Label(headers_frame, text="Quantity", font=('Segoe UI', 9, 'bold'),
                         bg='#ecf0f1', fg='#2c3e50', width=10).pack(side='left', padx=5)
                 
-                # Items data
-                items = lpo.get('items', [])
-                for j, (item_code, qty) in enumerate(delivery.get('items', {}).items()):
-                    # Find item description and unit
-                    item_desc = 'N/A'
-                    item_unit = 'Nos'
-                    for lpo_item in items:
-                        if lpo_item.get('resource_code') == item_code:
-                            item_desc = lpo_item.get('item_description', 'N/A')
-                            item_unit = lpo_item.get('unit', 'Nos')
-                            break
-                    
+                # Items data, with description and unit from the LPO items
+                for j, (item_code, item_desc, item_unit, qty) in enumerate(delivery_lines(lpo, delivery)):
                     item_row = tk.Frame(items_frame, bg='white' if j % 2 == 0 else '#f8f9fa')
                     item_row.pack(fill='x', pady=1)
                     
@@ -945,129 +696,82 @@ class PendingMaterials:
             tk.Label(empty_frame, text="Deliveries will appear here after saving",
                     font=('Segoe UI', 10), bg='white', fg='#95a5a6').pack(pady=(0, 20))
     
+    def create_items_table(self, parent):
+        """Create the items-to-receive table and its totals"""
+        columns = [
+            {'id': 'resource_code', 'text': 'Resource Code', 'width': 100},
+            {'id': 'item_description', 'text': 'Item Description', 'width': 200, 'anchor': 'w', 'stretch': True},
+            {'id': 'unit', 'text': 'Unit', 'width': 50},
+            {'id': 'ordered', 'text': 'Ordered', 'width': 65},
+            {'id': 'received', 'text': 'Received', 'width': 65},
+            {'id': 'pending', 'text': 'Pending', 'width': 65},
+            {'id': 'receive_now', 'text': 'Receive Now', 'width': 85, 'editable': True},
+            {'id': 'unit_rate', 'text': 'Unit Rate', 'width': 80},
+            {'id': 'total_price', 'text': 'Total Price', 'width': 95}
+        ]
+        self.items_table = DataTable(parent, columns, on_edit=self.update_total_price)
+        self.items_table.pack(fill='both', expand=True, padx=5, pady=5)
+        
+        # Summary rows
+        summary_frame = tk.Frame(parent, bg='#2c3e50')
+        summary_frame.pack(fill='x', padx=5, pady=(0, 5))
+        summary_frame.grid_columnconfigure(0, weight=1)
+        
+        tk.Label(summary_frame, text="Total Amount (Received):", font=('Segoe UI', 10, 'bold'),
+                bg='#2c3e50', fg='white', anchor='e', padx=10).grid(row=0, column=0, sticky='nsew')
+        self.total_amount_label = tk.Label(summary_frame, text="0.00", font=('Segoe UI', 10, 'bold'),
+                                          bg='#27ae60', fg='white', width=18, relief='solid', bd=1)
+        self.total_amount_label.grid(row=0, column=1, sticky='nsew')
+        
+        tk.Label(summary_frame, text="Balance Amount (Pending):", font=('Segoe UI', 10, 'bold'),
+                bg='#2c3e50', fg='white', anchor='e', padx=10).grid(row=1, column=0, sticky='nsew')
+        self.balance_amount_label = tk.Label(summary_frame, text="0.00", font=('Segoe UI', 10, 'bold'),
+                                            bg='#e74c3c', fg='white', width=18, relief='solid', bd=1)
+        self.balance_amount_label.grid(row=1, column=1, sticky='nsew')
+    
     def refresh_items_table(self, lpo):
         """Refresh the items table to show updated received quantities"""
-        if not hasattr(self, 'items_table_frame'):
+        if self.items_table is None or not self.items_table.exists():
             return
         
-        # Clear existing table
-        for widget in self.items_table_frame.winfo_children():
-            widget.destroy()
-        
-        # Recreate table with updated data
         items = lpo.get('items', [])
-        deliveries = lpo.get('deliveries', [])
-        
-        # Headers with grid
-        headers = ["Resource Code", "Item Description", "Unit", "Ordered", "Received", "Pending", "Receive Now", "Unit Rate", "Total Price"]
-        col_widths = [12, 25, 6, 8, 8, 8, 10, 10, 12]
+        received = self.storage.received(lpo)
         
-        for col, (header, width) in enumerate(zip(headers, col_widths)):
-            header_label = tk.Label(self.items_table_frame, text=header, font=('Segoe UI', 10, 'bold'),
-                                   bg='#34495e', fg='white', relief='solid', bd=1)
-            header_label.grid(row=0, column=col, sticky='nsew', padx=0, pady=0)
-            self.items_table_frame.grid_columnconfigure(col, weight=1 if col == 1 else 0, minsize=width*8)
+        # Latest unit rates from the price trends, for all rows at once
+        try:
+            unit_rates = self.storage.unit_rates(items)
+        except Exception as e:
+            print(f"Error loading unit rates: {e}")
+            unit_rates = [0.0] * len(items)
         
         # Calculate totals
         total_amount = 0
         balance_amount = 0
         
-        # Data rows with updated received quantities
-        for i, item in enumerate(items, 1):
-            row_bg = 'white' if i % 2 == 1 else '#f8f9fa'
-            
-            # Resource Code
+        rows = []
+        for i, item in enumerate(items):
             resource_code = item.get('resource_code', '')
-            code_label = tk.Label(self.items_table_frame, text=resource_code, 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='center')
-            code_label.grid(row=i, column=0, sticky='nsew', padx=0, pady=0)
-            
-            # Item description
-            item_label = tk.Label(self.items_table_frame, text=item.get('item_description', 'N/A'), 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='w', wraplength=220)
-            item_label.grid(row=i, column=1, sticky='nsew', padx=0, pady=0)
-            
-            # Unit
-            unit_label = tk.Label(self.items_table_frame, text=item.get('unit', 'Nos'), 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', 
-                                 relief='solid', bd=1, anchor='center')
-            unit_label.grid(row=i, column=2, sticky='nsew', padx=0, pady=0)
-            
-            # Ordered quantity
             ordered_qty = float(item.get('quantity', 0))
-            ordered_label = tk.Label(self.items_table_frame, text=f"{ordered_qty:.0f}", 
-                                   font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', relief='solid', bd=1)
-            ordered_label.grid(row=i, column=3, sticky='nsew', padx=0, pady=0)
-            
-            # Already received quantity (updated)
-            received_qty = sum([float(d.get('items', {}).get(resource_code, 0)) for d in deliveries])
-            received_label = tk.Label(self.items_table_frame, text=f"{received_qty:.0f}", 
-                                    font=('Segoe UI', 9), bg=row_bg, fg='#27ae60', relief='solid', bd=1)
-            received_label.grid(row=i, column=4, sticky='nsew', padx=0, pady=0)
-            
-            # Pending quantity (updated)
+            received_qty = received.get(resource_code, 0)
             pending_qty = ordered_qty - received_qty
-            pending_label = tk.Label(self.items_table_frame, text=f"{pending_qty:.0f}", 
-                                   font=('Segoe UI', 9), bg=row_bg, fg='#e74c3c', relief='solid', bd=1)
-            pending_label.grid(row=i, column=5, sticky='nsew', padx=0, pady=0)
             
-            # Receive quantity entry (keep existing entry)
-            entry_frame = tk.Frame(self.items_table_frame, bg=row_bg, relief='solid', bd=1)
-            entry_frame.grid(row=i, column=6, sticky='nsew', padx=0, pady=0)
-            
-            if resource_code in self.receive_entries:
-                # Keep existing entry
-                existing_entry = self.receive_entries[resource_code]
-                existing_entry.master.destroy()
-                existing_entry = tk.Entry(entry_frame, font=('Segoe UI', 9), justify='center', bd=0)
-                existing_entry.pack(fill='both', expand=True, padx=2, pady=2)
-                existing_entry.insert(0, "0")
-                self.receive_entries[resource_code] = existing_entry
-            
-            # Get unit rate from trends
-            unit_rate = self.get_unit_rate(resource_code, item.get('item_description', ''))
-            
-            # Calculate amounts
+            unit_rate = unit_rates[i]
             total_amount += received_qty * unit_rate
             balance_amount += pending_qty * unit_rate
             
-            # Unit Rate display
-            rate_label = tk.Label(self.items_table_frame, text=f"{unit_rate:.2f}" if unit_rate else "0.00", 
-                                 font=('Segoe UI', 9), bg=row_bg, fg='#2c3e50', relief='solid', bd=1)
-            rate_label.grid(row=i, column=7, sticky='nsew', padx=0, pady=0)
-            
-            # Total Price display
-            total_label = tk.Label(self.items_table_frame, text="0.00", 
-                                  font=('Segoe UI', 9, 'bold'), bg=row_bg, fg='#27ae60', relief='solid', bd=1)
-            total_label.grid(row=i, column=8, sticky='nsew', padx=0, pady=0)
-            
-            # Bind entry to update total price
-            if resource_code in self.receive_entries:
-                self.receive_entries[resource_code].bind('<KeyRelease>', 
-                    lambda e, rate=unit_rate, label=total_label, entry=self.receive_entries[resource_code]: 
-                    self.update_total_price(entry, rate, label))
-        
-        # Add summary rows
-        summary_row = len(items) + 1
-        
-        # Total Amount
-        total_label_frame = tk.Frame(self.items_table_frame, bg='#2c3e50', relief='solid', bd=1)
-        total_label_frame.grid(row=summary_row, column=0, columnspan=7, sticky='nsew', padx=0, pady=0)
-        tk.Label(total_label_frame, text="Total Amount (Received):", font=('Segoe UI', 10, 'bold'),
-                bg='#2c3e50', fg='white', anchor='e', padx=10).pack(fill='both', expand=True)
-        
-        total_amount_label = tk.Label(self.items_table_frame, text=f"{total_amount:.2f}", 
-                                     font=('Segoe UI', 10, 'bold'), bg='#27ae60', fg='white', relief='solid', bd=1)
-        total_amount_label.grid(row=summary_row, column=7, columnspan=2, sticky='nsew', padx=0, pady=0)
-        
-        # Balance Amount
-        balance_label_frame = tk.Frame(self.items_table_frame, bg='#2c3e50', relief='solid', bd=1)
-        balance_label_frame.grid(row=summary_row+1, column=0, columnspan=7, sticky='nsew', padx=0, pady=0)
-        tk.Label(balance_label_frame, text="Balance Amount (Pending):", font=('Segoe UI', 10, 'bold'),
-                bg='#2c3e50', fg='white', anchor='e', padx=10).pack(fill='both', expand=True)
-        
-        balance_amount_label = tk.Label(self.items_table_frame, text=f"{balance_amount:.2f}", 
-                                       font=('Segoe UI', 10, 'bold'), bg='#e74c3c', fg='white', relief='solid', bd=1)
-        balance_amount_label.grid(row=summary_row+1, column=7, columnspan=2, sticky='nsew', padx=0, pady=0)
\ No newline at end of file
+            rows.append((str(i), (resource_code, item.get('item_description', 'N/A'), item.get('unit', 'Nos'),
+                                  f"{ordered_qty:.0f}", f"{received_qty:.0f}", f"{pending_qty:.0f}", "0",
+                                  f"{unit_rate:.2f}" if unit_rate else "0.00", "0.00")))
+        
+        self.items_table.set_rows(rows)
+        self.items_table.fit_height(12)
+        self.total_amount_label.configure(text=f"{total_amount:.2f}")
+        self.balance_amount_label.configure(text=f"{balance_amount:.2f}")
+    
+    def receive_quantities(self):
+        """Quantities typed in the Receive Now column, by resource code"""
+        quantities = {}
+        if self.items_table is not None and self.items_table.exists():
+            for row_id in self.items_table.rows():
+                quantities[self.items_table.get(row_id, 'resource_code')] = self.items_table.get(row_id, 'receive_now')
+        return quantities
\ No newline at end of file
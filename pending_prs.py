@@ -1,20 +1,30 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
-import os
+from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
 from rejected_prs import RejectedPRs
+from storage import get_storage
+from procurement import ProcurementService, ValidationError, summary
+from card_grid import VirtualCardGrid, Selection
+from search import SearchController
+from io_worker import io_worker
+from events import event_bus, DATA_CHANGED, VIEW_LOADED
+from inventory_highlight import inventory_highlights, PENDING
 
 class PendingPRs:
     def __init__(self, parent_frame, department_name):
         self.parent_frame = parent_frame
         self.department_name = department_name
         self.pending_prs = []
-        self.data_file = f"pending_prs_{department_name.lower().replace(' ', '_')}.json"
+        self.storage = get_storage(department_name)
+        self.service = ProcurementService(self.storage)
+        self.selection = Selection(self.selection_changed)
         self.rejected_prs_handler = RejectedPRs(parent_frame, department_name, self.restore_pr_from_rejected)
         self.create_interface()
         self.load_pending_prs()
-        self.start_auto_highlight()
+        
+        # Reload (and re-highlight) whenever pending PRs change
+        event_bus.subscribe(DATA_CHANGED, lambda event: self.load_pending_prs(), self.canvas,
+                            department=department_name, collection='pending_prs')
     
     def create_interface(self):
         # Header
@@ -40,7 +50,8 @@ class PendingPRs:
         search_entry = tk.Entry(filter_frame, textvariable=self.search_var, width=30,
                                font=('Segoe UI', 10))
         search_entry.pack(side='left', padx=(0, 10))
-        search_entry.bind('<KeyRelease>', self.filter_prs)
+        self.search = SearchController(search_entry, self.display_prs)
+        search_entry.bind('<KeyRelease>', self.search.schedule)
         
         # Date filter
         tk.Label(filter_frame, text="📅 Date:", font=('Segoe UI', 10, 'bold'),
@@ -50,7 +61,7 @@ class PendingPRs:
         date_entry = tk.Entry(filter_frame, textvariable=self.date_filter_var, width=12,
                              font=('Segoe UI', 10))
         date_entry.pack(side='left', padx=(0, 5))
-        date_entry.bind('<KeyRelease>', self.filter_prs)
+        date_entry.bind('<KeyRelease>', self.search.schedule)
         
         tk.Label(filter_frame, text="(DD/MM/YYYY)", font=('Segoe UI', 8),
                 bg='#ecf0f1', fg='#7f8c8d').pack(side='left', padx=(0, 10))
@@ -63,48 +74,74 @@ class PendingPRs:
         tk.Button(filter_frame, text="🔄 Rejected", bg="#db3434", fg='white',
                  font=('Segoe UI', 9, 'bold'), command=self.rejected_prs_handler.show_rejected_prs).pack(side='left', padx=5)
         
+        # Bulk actions on the checked PRs
+        bulk_frame = tk.Frame(content_frame, bg='#ecf0f1')
+        bulk_frame.pack(fill='x', pady=(0, 10))
+        
+        tk.Button(bulk_frame, text="☑ Select All", bg='#95a5a6', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.select_all).pack(side='left', padx=(0, 5))
+        tk.Button(bulk_frame, text="☐ Clear", bg='#95a5a6', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.selection.clear).pack(side='left', padx=(0, 10))
+        self.selection_label = tk.Label(bulk_frame, text="0 selected", font=('Segoe UI', 9, 'bold'),
+                                        bg='#ecf0f1', fg='#2c3e50')
+        self.selection_label.pack(side='left')
+        
+        tk.Button(bulk_frame, text="🗑️ Delete Selected", bg='#7f8c8d', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.delete_selected).pack(side='right', padx=(5, 0))
+        tk.Button(bulk_frame, text="❌ Reject Selected", bg='#e74c3c', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.reject_selected).pack(side='right', padx=(5, 0))
+        tk.Button(bulk_frame, text="✅ Approve Selected", bg='#27ae60', fg='white',
+                 font=('Segoe UI', 8, 'bold'), command=self.approve_selected).pack(side='right', padx=(5, 0))
+        
         # PR List with scrollbar
         list_container = tk.Frame(content_frame, bg='white', relief='solid', bd=1)
         list_container.pack(fill='both', expand=True)
         
-        # Canvas for scrolling
-        self.canvas = tk.Canvas(list_container, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(list_container, orient='vertical', command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg='white')
-        
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
-        self.canvas.pack(side='left', fill='both', expand=True)
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
-        
-        # Configure scroll region
-        self.scrollable_frame.bind('<Configure>', 
-                                  lambda e: self.canvas.configure(scrollregion=self.canvas.bbox('all')))
+        # PR cards; only the rows in view are built
+        self.card_grid = VirtualCardGrid(list_container, self.create_pr_card, card_height=200,
+                                         key=lambda pr: pr.get('pr_number'))
+        self.canvas = self.card_grid.canvas
     
     def load_pending_prs(self):
-        """Load pending PRs from file"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.pending_prs = json.load(f)
-            else:
-                # Create sample data if file doesn't exist
-                self.create_sample_data()
-        except Exception as e:
-            print(f"Error loading pending PRs: {e}")
+        """Load pending PRs from storage on the I/O worker"""
+        if not self.pending_prs:
+            self.card_grid.show_message("Loading purchase requests...")
+        io_worker.submit(self.canvas, self.read_pending_prs, self.show_pending_prs, self.show_load_error)
+    
+    def read_pending_prs(self):
+        """Pending PRs and their search index, or None when there is no data (I/O worker)"""
+        if not self.storage.exists('pending_prs'):
+            return None
+        records = self.storage.load('pending_prs')
+        self.storage.search_index('pending_prs')
+        return records
+    
+    def show_load_error(self, error):
+        """Report an unreadable store; sample data is only for a department without one"""
+        print(f"Error loading pending PRs: {error}")
+        self.card_grid.show_message(f"Error loading pending PRs: {str(error)}")
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='pending_prs', error=str(error))
+    
+    def show_pending_prs(self, records):
+        """Display loaded PRs"""
+        if records is None:
+            # Create sample data if file doesn't exist
             self.create_sample_data()
+        else:
+            self.pending_prs = records
+        self.selection.retain(pr.get('pr_number') for pr in self.pending_prs)
         
         # Display PRs immediately
         self.display_prs()
+        event_bus.publish(VIEW_LOADED, department=self.department_name, view='pending_prs')
         
         # Defer highlighting to prevent blocking UI
         self.parent_frame.after_idle(self.highlight_all_pending_items)
     
     def save_pending_prs(self):
-        """Save pending PRs to file"""
+        """Replace all pending PRs in storage"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.pending_prs, f, indent=2, ensure_ascii=False)
+            self.storage.save('pending_prs', self.pending_prs)
         except Exception as e:
             print(f"Error saving pending PRs: {e}")
     
@@ -145,25 +182,19 @@ class PendingPRs:
         self.save_pending_prs()
     
     def display_prs(self):
-        """Display pending PRs in the scrollable frame"""
-        # Clear existing content
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
+        """Display pending PRs in the card grid"""
         if not self.pending_prs:
-            tk.Label(self.scrollable_frame, text="No pending purchase requests found",
-                    font=('Segoe UI', 12), bg='white', fg='#7f8c8d').pack(pady=50)
+            self.card_grid.show_message("No pending purchase requests found")
             return
         
         # Filter PRs based on search and date
-        search_text = self.search_var.get().lower()
+        matches = self.storage.search('pending_prs', self.search_var.get())
         date_filter = self.date_filter_var.get().strip()
         
         filtered_prs = []
         for pr in self.pending_prs:
-            # Search filter
-            search_match = (search_text in pr.get('pr_number', '').lower() or
-                           search_text in pr.get('description', '').lower())
+            # Search filter (PR number, description, item codes and descriptions)
+            search_match = matches is None or pr.get('pr_number') in matches
             
             # Date filter
             date_match = True
@@ -174,38 +205,21 @@ class PendingPRs:
             if search_match and date_match:
                 filtered_prs.append(pr)
         
-        # Create container for horizontal layout
-        self.cards_container = tk.Frame(self.scrollable_frame, bg='white')
-        self.cards_container.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        self.current_row = None
-        self.cards_in_row = 0
-        
-        # Create cards in batches to prevent UI blocking
-        self.create_cards_batch(filtered_prs, 0)
+        self.card_grid.set_items(filtered_prs)
     
-    def create_pr_card(self, pr, index):
-        """Create a card for each pending PR"""
-        # Create new row if needed (3 cards per row)
-        if self.cards_in_row == 0 or self.cards_in_row >= 3:
-            self.current_row = tk.Frame(self.cards_container, bg='white')
-            self.current_row.pack(fill='x', pady=5)
-            self.cards_in_row = 0
-        
-        # Main card frame with fixed width
-        card_frame = tk.Frame(self.current_row, bg='white', relief='solid', bd=1, width=450, height=200)
-        card_frame.pack(side='left', padx=5, pady=0)
-        card_frame.pack_propagate(False)
-        
-        self.cards_in_row += 1
-        
+    def create_pr_card(self, card_frame, pr):
+        """Fill a card frame for a pending PR"""
+        # Buttons act on the current copy of the record, which a reload may have replaced
+        key = pr.get('pr_number')
         # Card header with PR number and status
         header_frame = tk.Frame(card_frame, bg='#34495e', height=40)
         header_frame.pack(fill='x')
         header_frame.pack_propagate(False)
         
+        self.selection.checkbox(header_frame, pr.get('pr_number'), bg='#34495e', activebackground='#34495e',
+                                selectcolor='white').pack(side='left', padx=(8, 0))
         tk.Label(header_frame, text=f"📋 {pr.get('pr_number', 'N/A')}", 
-                font=('Segoe UI', 12, 'bold'), bg='#34495e', fg='white').pack(side='left', padx=10, pady=8)
+                font=('Segoe UI', 12, 'bold'), bg='#34495e', fg='white').pack(side='left', padx=(2, 10), pady=8)
         
         # Status badge - only show if Pending Approval
         status = pr.get('status', '')
@@ -264,19 +278,19 @@ class PendingPRs:
         
         tk.Button(action_frame, text="👁️ View", bg='#3498db', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.view_pr(pr)).pack(side='left', padx=(0, 5))
+                 command=self.card_grid.command(key, self.view_pr)).pack(side='left', padx=(0, 5))
         
         tk.Button(action_frame, text="✅ Approve", bg='#27ae60', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.approve_pr(pr)).pack(side='left', padx=(0, 5))
+                 command=self.card_grid.command(key, self.approve_pr)).pack(side='left', padx=(0, 5))
         
         tk.Button(action_frame, text="❌ Reject", bg='#e74c3c', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.reject_pr(pr)).pack(side='right', padx=(5, 0))
+                 command=self.card_grid.command(key, self.reject_pr)).pack(side='right', padx=(5, 0))
         
         tk.Button(action_frame, text="🗑️ Delete", bg='#95a5a6', fg='white',
                  font=('Segoe UI', 8, 'bold'), padx=10, pady=2,
-                 command=lambda: self.delete_pr(pr)).pack(side='right')
+                 command=self.card_grid.command(key, self.delete_pr)).pack(side='right')
     
     def get_status_color(self, status):
         """Get color based on status"""
@@ -289,11 +303,11 @@ class PendingPRs:
     def clear_date_filter(self):
         """Clear date filter"""
         self.date_filter_var.set("")
-        self.display_prs()
+        self.search.run_now()
     
     def filter_prs(self, event=None):
-        """Filter PRs based on search text"""
-        self.display_prs()
+        """Filter PRs based on search text once typing pauses"""
+        self.search.schedule()
     
     def refresh_data(self):
         """Refresh PR data"""
@@ -506,45 +520,90 @@ class PendingPRs:
     
     def approve_pr(self, pr):
         """Approve PR and move to LPO system"""
-        # Check if required fields are filled
-        if not pr.get('lpo_number', '').strip():
-            messagebox.showerror("Validation Error", "LPO Number is required before approval.\n\nPlease view the PR details and fill in the LPO Number.")
+        try:
+            self.service.approve_pr(pr)
+        except ValidationError as e:
+            messagebox.showerror("Validation Error", str(e))
             return
-        
-        if not pr.get('supplier_name', '').strip():
-            messagebox.showerror("Validation Error", "Supplier Name is required before approval.\n\nPlease view the PR details and fill in the Supplier Name.")
+        except Exception as e:
+            print(f"Error approving PR: {e}")
+            messagebox.showerror("Error", f"Failed to approve PR: {str(e)}")
             return
         
-        if not pr.get('phone_number', '').strip() or pr.get('phone_number', '').strip() == '+971':
-            messagebox.showerror("Validation Error", "Phone Number is required before approval.\n\nPlease view the PR details and fill in the Phone Number.")
-            return
+        # Remove from pending PRs
+        self.pending_prs = [p for p in self.pending_prs if p.get('pr_number') != pr.get('pr_number')]
+        self.display_prs()
         
+        # Show success message
+        messagebox.showinfo("Success", 
+                           f"PR {pr.get('pr_number')} has been approved and moved to LPO system!\n\n"
+                           f"Status: Invoice Prepared - Awaiting Delivery")
+    
+    def selection_changed(self, count):
+        self.selection_label.config(text=f"{count} selected")
+    
+    def select_all(self):
+        """Check every PR the current filters show"""
+        self.selection.set(pr.get('pr_number') for pr in self.card_grid.items)
+    
+    def selected_prs(self):
+        return self.selection.selected(self.pending_prs, lambda pr: pr.get('pr_number'))
+    
+    def remove_prs(self, pr_numbers):
+        """Drop PRs that left the pending list and redraw once"""
+        pr_numbers = set(pr_numbers)
+        self.pending_prs = [p for p in self.pending_prs if p.get('pr_number') not in pr_numbers]
+        self.selection.set(self.selection.keys - pr_numbers)
+        self.display_prs()
+    
+    def approve_selected(self):
+        """Approve all checked PRs together; PRs missing details are listed and kept"""
+        prs = self.selected_prs()
+        if not prs:
+            messagebox.showwarning("Warning", "Please select the PRs to approve.")
+            return
         try:
-            # Import LPO system
-            from lpo_s import LPOSystem
-            
-            # Create a temporary LPO instance to add the approved PR
-            temp_frame = tk.Frame()
-            lpo_system = LPOSystem(temp_frame, self.department_name)
-            
-            # Add approved PR to LPO system
-            if lpo_system.add_approved_pr(pr.copy()):
-                # Remove from pending PRs
-                self.pending_prs = [p for p in self.pending_prs if p.get('pr_number') != pr.get('pr_number')]
-                self.save_pending_prs()
-                self.display_prs()
-                
-                # Show success message
-                messagebox.showinfo("Success", 
-                                   f"PR {pr.get('pr_number')} has been approved and moved to LPO system!\n\n"
-                                   f"Status: Invoice Prepared - Awaiting Delivery")
-            
-            # Clean up temporary frame
-            temp_frame.destroy()
-            
+            lpos, problems = self.service.approve_prs(prs)
         except Exception as e:
-            print(f"Error approving PR: {e}")
-            messagebox.showerror("Error", f"Failed to approve PR: {str(e)}")
+            print(f"Error approving PRs: {e}")
+            messagebox.showerror("Error", f"Failed to approve PRs: {str(e)}")
+            return
+        self.remove_prs(lpo.get('pr_number') for lpo in lpos)
+        messagebox.showinfo("Bulk Approval", summary("Approved", len(lpos), problems))
+    
+    def reject_selected(self):
+        """Reject all checked PRs with one reason"""
+        prs = self.selected_prs()
+        if not prs:
+            messagebox.showwarning("Warning", "Please select the PRs to reject.")
+            return
+        reason = simpledialog.askstring("Reject PRs", f"Reason for rejecting {len(prs)} PR(s):",
+                                        parent=self.parent_frame)
+        if reason is None:
+            return
+        try:
+            rejected = self.service.reject_prs(prs, reason)
+        except ValidationError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        except Exception as e:
+            print(f"Error rejecting PRs: {e}")
+            messagebox.showerror("Error", f"Failed to reject PRs: {str(e)}")
+            return
+        self.remove_prs(pr.get('pr_number') for pr in rejected)
+        messagebox.showinfo("Bulk Rejection", summary("Rejected", len(rejected), []))
+    
+    def delete_selected(self):
+        """Permanently delete all checked PRs"""
+        prs = self.selected_prs()
+        if not prs:
+            messagebox.showwarning("Warning", "Please select the PRs to delete.")
+            return
+        if not messagebox.askyesno("Confirm Delete",
+                                   f"Permanently delete {len(prs)} PR(s)?\n\nThis action cannot be undone."):
+            return
+        self.service.delete_prs(prs)
+        self.remove_prs(pr.get('pr_number') for pr in prs)
     
     def reject_pr(self, pr):
         """Reject PR with reason"""
@@ -581,17 +640,14 @@ class PendingPRs:
         button_frame.pack(fill='x')
         
         def confirm_reject():
-            reason = reason_text.get('1.0', 'end-1c').strip()
-            if not reason:
-                messagebox.showwarning("Warning", "Please provide a reason for rejection.")
+            try:
+                self.service.reject_pr(pr, reason_text.get('1.0', 'end-1c'))
+            except ValidationError as e:
+                messagebox.showwarning("Warning", str(e))
                 return
             
-            # Save to rejected PRs
-            self.rejected_prs_handler.save_rejected_pr(pr, reason)
-            
             # Remove from pending PRs
             self.pending_prs = [p for p in self.pending_prs if p.get('pr_number') != pr.get('pr_number')]
-            self.save_pending_prs()
             self.display_prs()
             
             reason_window.destroy()
@@ -609,31 +665,14 @@ class PendingPRs:
     
     def save_additional_info(self, pr, window):
         """Save additional information (LPO, supplier, phone)"""
-        # Validate required fields
-        lpo_number = self.lpo_entry.get().strip()
-        supplier_name = self.supplier_entry.get().strip()
-        phone_number = self.phone_entry.get().strip()
-        
-        if not lpo_number:
-            tk.messagebox.showerror("Validation Error", "LPO Number is required.")
-            return
-        
-        if not supplier_name:
-            tk.messagebox.showerror("Validation Error", "Supplier Name is required.")
-            return
-        
-        if not phone_number or phone_number == '+971':
-            tk.messagebox.showerror("Validation Error", "Phone Number is required.")
+        # Validate and save only the changed fields
+        try:
+            self.service.update_supplier_details(pr, self.lpo_entry.get(), self.supplier_entry.get(),
+                                                 self.phone_entry.get())
+        except ValidationError as e:
+            tk.messagebox.showerror("Validation Error", str(e))
             return
         
-        # Update PR with additional info
-        pr['lpo_number'] = lpo_number
-        pr['supplier_name'] = supplier_name
-        pr['phone_number'] = phone_number
-        
-        # Save to file
-        self.save_pending_prs()
-        
         # Refresh display to show updated cards
         self.display_prs()
         
@@ -643,28 +682,13 @@ class PendingPRs:
     
     def add_new_pr(self, pr_data):
         """Add new PR from PR_rise"""
-        # Generate PR number
-        pr_number = f"PR-{len(self.pending_prs) + 1:03d}"
-        
-        # Create new PR entry
-        new_pr = {
-            "pr_number": pr_number,
-            "request_date": pr_data.get('request_date', ''),
-            "required_date": pr_data.get('required_date', ''),
-            "status": "Pending Approval",
-            "priority": "Medium",
-            "items_count": len(pr_data.get('items', [])),
-            "total_value": pr_data.get('total_value', '₹0'),
-            "description": pr_data.get('description', ''),
-            "items": pr_data.get('items', [])
-        }
+        new_pr = self.service.create_pr(pr_data)
         
         # Add to pending PRs
         self.pending_prs.append(new_pr)
-        self.save_pending_prs()
         self.display_prs()
         
-        return pr_number
+        return new_pr['pr_number']
     
     def delete_pr(self, pr):
         """Delete PR permanently"""
@@ -680,8 +704,8 @@ class PendingPRs:
             # Remove from pending PRs list
             self.pending_prs = [p for p in self.pending_prs if p.get('pr_number') != pr.get('pr_number')]
             
-            # Save updated list
-            self.save_pending_prs()
+            # Remove from storage
+            self.service.delete_pr(pr)
             
             # Refresh display
             self.display_prs()
@@ -690,13 +714,10 @@ class PendingPRs:
             messagebox.showinfo("Success", f"PR {pr.get('pr_number')} has been deleted permanently.")
     
     def restore_pr_from_rejected(self, pr):
-        """Restore a PR from rejected back to pending"""
+        """Show a PR moved back from rejected to pending"""
         # Add the PR back to pending list
         self.pending_prs.append(pr)
         
-        # Save updated pending PRs
-        self.save_pending_prs()
-        
         # Refresh display
         self.display_prs()
     
@@ -713,54 +734,17 @@ class PendingPRs:
     def highlight_inventory_items(self, pr_items):
         """Highlight matching items in inventory overview with orange color for pending approval"""
         try:
-            print(f"\n=== ORANGE HIGHLIGHTING DEBUG ===")
-            print(f"DEBUG: Highlighting {len(pr_items)} items")
-            for item in pr_items:
-                print(f"DEBUG: PR Item - Resource: '{item.get('resource_code')}', Description: '{item.get('item_description')}'")
-            
-            # Find inventory overview widget in the application
-            inventory_widget = self.find_inventory_widget()
-            print(f"DEBUG: Found inventory widget: {inventory_widget is not None}")
-            if inventory_widget:
-                print(f"DEBUG: Calling highlight_pending_items on widget: {type(inventory_widget)}")
-                inventory_widget.highlight_pending_items(pr_items)
-                print(f"DEBUG: highlight_pending_items called successfully")
-            else:
-                print("DEBUG: No inventory widget found - checking registry...")
-                from inventory_overview import get_all_inventory_instances
-                all_instances = get_all_inventory_instances()
-                print(f"DEBUG: All available inventory instances: {list(all_instances.keys())}")
+            inventory_highlights(self.department_name).highlight(PENDING, pr_items)
         except Exception as e:
-            print(f"ERROR highlighting inventory items: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error highlighting inventory items: {e}")
     
     def clear_inventory_highlights(self):
         """Clear highlights from inventory overview"""
         try:
-            inventory_widget = self.find_inventory_widget()
-            if inventory_widget:
-                inventory_widget.clear_pending_highlights()
+            inventory_highlights(self.department_name).clear(PENDING)
         except Exception as e:
             print(f"Error clearing inventory highlights: {e}")
     
-    def create_cards_batch(self, filtered_prs, start_index, batch_size=5):
-        """Create PR cards in batches to prevent UI blocking"""
-        end_index = min(start_index + batch_size, len(filtered_prs))
-        
-        for i in range(start_index, end_index):
-            self.create_pr_card(filtered_prs[i], i)
-        
-        # If more cards to create, schedule next batch
-        if end_index < len(filtered_prs):
-            self.parent_frame.after(10, lambda: self.create_cards_batch(filtered_prs, end_index, batch_size))
-    
-    def start_auto_highlight(self):
-        """Start automatic highlighting cycle"""
-        self.highlight_all_pending_items()
-        # Schedule next highlight in 15 seconds (reduced frequency)
-        self.parent_frame.after(15000, self.start_auto_highlight)
-    
     def highlight_all_pending_items(self):
         """Automatically highlight all items from pending PRs in inventory"""
         try:
@@ -770,40 +754,7 @@ class PendingPRs:
                     pr_items = pr.get('items', [])
                     all_pending_items.extend(pr_items)
             
-            if all_pending_items:
-                print(f"AUTO-HIGHLIGHT: Found {len(all_pending_items)} pending items to highlight")
-                self.highlight_inventory_items(all_pending_items)
+            self.highlight_inventory_items(all_pending_items)
         except Exception as e:
             print(f"Error in auto-highlight: {e}")
     
-    def find_inventory_widget(self):
-        """Find the inventory overview widget in the application"""
-        try:
-            # Import the function to get inventory instance
-            from inventory_overview import get_inventory_instance, get_all_inventory_instances
-            
-            all_instances = get_all_inventory_instances()
-            
-            # Find the most recently created inventory instance for this department
-            best_match = None
-            for key, instance in all_instances.items():
-                # Check if it's for the same department
-                if self.department_name.lower().replace(' ', '_') in key.lower():
-                    # Test if the widget is still valid by trying to access a property
-                    try:
-                        # Try to access the cells to see if widget is still alive
-                        if hasattr(instance, 'cells') and len(instance.cells) > 0:
-                            # Try to access the first cell to test if it's valid
-                            test_cell = instance.cells[0][1]
-                            test_cell.winfo_exists()  # This will raise an error if widget is destroyed
-                            best_match = instance
-                            break
-                    except Exception as e:
-                        continue
-            
-            return best_match
-            
-        except Exception as e:
-            print(f"Error finding inventory widget: {e}")
-            return None
-    
@@ -0,0 +1,197 @@
+import sys
+
+import numpy as np
+
+# python price_analytics.py [Department] [--drift PCT] [--window N]
+DEFAULT_WINDOW = 3
+# A latest price this many standard deviations from the item's earlier prices is an outlier
+OUTLIER_Z = 3.0
+# Earlier prices needed before a latest price can be called an outlier
+MIN_HISTORY = 3
+DEFAULT_DRIFT_PCT = 10.0
+
+
+def price_value(entry):
+    try:
+        return float(entry.get('price'))
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceAnalytics:
+    """Price statistics of every trend item, computed together over columnar arrays.
+
+    All price histories are laid end to end in one array (prices), with item_of
+    giving the item of each price, so every statistic is one pass of NumPy
+    operations over all items instead of a Python loop per item. Per-item results
+    are arrays indexed like item_keys; values an item has too few prices for are
+    NaN.
+    """
+
+    def __init__(self, trends_data, window=DEFAULT_WINDOW, outlier_z=OUTLIER_Z):
+        self.window = window
+        self.item_keys = []
+        self.resource_codes = []
+        self.descriptions = []
+        self.units = []
+        prices = []
+        counts = []
+        for item_key, trend in trends_data.items():
+            history = [price_value(entry) for entry in trend.get('price_history', [])]
+            history = [price for price in history if price is not None]
+            self.item_keys.append(item_key)
+            self.resource_codes.append(trend.get('resource_code', ''))
+            self.descriptions.append(trend.get('item_description', ''))
+            self.units.append(trend.get('unit', ''))
+            prices.extend(history)
+            counts.append(len(history))
+
+        items = len(counts)
+        self.prices = np.array(prices, dtype=float)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.starts = np.zeros(items, dtype=np.int64)
+        if items:
+            self.starts[1:] = np.cumsum(self.counts)[:-1]
+        self.item_of = np.repeat(np.arange(items), self.counts)
+        self.compute(outlier_z)
+
+    def per_item(self, values, positions=None):
+        """Sum of values per item (positions: which prices take part, all by default)"""
+        item_of = self.item_of if positions is None else self.item_of[positions]
+        return np.bincount(item_of, weights=values, minlength=len(self.counts))
+
+    def at(self, series, offset, needed):
+        """series value offset places before each item's last price; NaN for items with fewer
+        than needed prices"""
+        padded = np.append(series, np.nan)
+        return padded[np.where(self.counts >= needed, self.starts + self.counts - 1 - offset, len(series))]
+
+    def compute(self, outlier_z):
+        prices = self.prices
+        counts = self.counts
+        has = counts > 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.latest = self.at(prices, 0, 1)
+            self.previous = self.at(prices, 1, 2)
+            self.change_pct = (self.latest - self.previous) / self.previous * 100
+
+            totals = self.per_item(prices)
+            squares = self.per_item(prices * prices)
+            self.mean = np.where(has, totals / counts, np.nan)
+
+            self.minimum = np.full(len(counts), np.nan)
+            self.maximum = np.full(len(counts), np.nan)
+            if prices.size:
+                self.minimum[has] = np.minimum.reduceat(prices, self.starts[has])
+                self.maximum[has] = np.maximum.reduceat(prices, self.starts[has])
+
+            # Moving average series: rolling window sums from one running total,
+            # restarting at each item's first price
+            running = np.concatenate(([0.0], np.cumsum(prices)))
+            position = np.arange(prices.size)
+            window_start = np.maximum(position - self.window + 1, self.starts[self.item_of])
+            self.moving_average_series = ((running[position + 1] - running[window_start])
+                                          / (position + 1 - window_start))
+            self.moving_average = self.at(self.moving_average_series, 0, 1)
+
+            # Volatility: standard deviation of price-to-price changes (percent)
+            same_item = self.item_of[1:] == self.item_of[:-1]
+            steps = np.flatnonzero(same_item & (prices[:-1] != 0)) + 1
+            returns = (prices[steps] / prices[steps - 1] - 1) * 100
+            step_counts = np.bincount(self.item_of[steps], minlength=len(counts))
+            step_mean = self.per_item(returns, steps) / step_counts
+            step_variance = self.per_item(returns * returns, steps) / step_counts - step_mean ** 2
+            self.volatility = np.where(step_counts > 1, np.sqrt(np.maximum(step_variance, 0)), np.nan)
+
+            # Outliers: the latest price against the mean and spread of the earlier ones
+            earlier = counts - 1
+            earlier_mean = (totals - np.nan_to_num(self.latest)) / earlier
+            earlier_variance = (squares - np.nan_to_num(self.latest) ** 2) / earlier - earlier_mean ** 2
+            earlier_std = np.sqrt(np.maximum(earlier_variance, 0))
+            # Tolerance for rounding in the variance of identical prices
+            flat = earlier_std <= 1e-9 * np.maximum(np.abs(earlier_mean), 1)
+            self.z_score = np.where(flat, np.where(np.isclose(self.latest, earlier_mean), 0.0, np.inf),
+                                    (self.latest - earlier_mean) / earlier_std)
+            self.z_score = np.where(earlier >= MIN_HISTORY, self.z_score, np.nan)
+            self.outlier = np.abs(np.nan_to_num(self.z_score)) > outlier_z
+
+    def __len__(self):
+        return len(self.item_keys)
+
+    def find(self, resource_code, item_description):
+        """Index of an item (case-insensitive), or None"""
+        code = (resource_code or '').lower()
+        description = (item_description or '').lower()
+        for i, (item_code, item_description) in enumerate(zip(self.resource_codes, self.descriptions)):
+            if (item_code or '').lower() == code and (item_description or '').lower() == description:
+                return i
+        return None
+
+    def history(self, index):
+        """(prices, moving averages) of one item"""
+        span = slice(self.starts[index], self.starts[index] + self.counts[index])
+        return self.prices[span], self.moving_average_series[span]
+
+    def row(self, index):
+        """Statistics of one item as a dict (NaN shown as None)"""
+        def value(column):
+            number = float(column[index])
+            return round(number, 4) if np.isfinite(number) else None
+        return {
+            'item_key': self.item_keys[index],
+            'resource_code': self.resource_codes[index],
+            'item_description': self.descriptions[index],
+            'unit': self.units[index],
+            'prices': int(self.counts[index]),
+            'latest': value(self.latest),
+            'previous': value(self.previous),
+            'change_pct': value(self.change_pct),
+            'min': value(self.minimum),
+            'max': value(self.maximum),
+            'mean': value(self.mean),
+            'moving_average': value(self.moving_average),
+            'volatility': value(self.volatility),
+            'z_score': value(self.z_score),
+            'outlier': bool(self.outlier[index])
+        }
+
+    def rows(self, indices=None):
+        return [self.row(i) for i in (range(len(self)) if indices is None else indices)]
+
+    def drifting(self, threshold_pct=DEFAULT_DRIFT_PCT):
+        """Indices of items whose latest price moved more than threshold_pct, or is an
+        outlier, largest move first"""
+        moved = np.abs(np.nan_to_num(self.change_pct))
+        flagged = np.flatnonzero((moved > threshold_pct) | self.outlier)
+        return flagged[np.argsort(-moved[flagged], kind='stable')]
+
+
+def main(argv):
+    from storage import get_storage
+
+    department_name = 'Electrical'
+    threshold = DEFAULT_DRIFT_PCT
+    window = DEFAULT_WINDOW
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == '--drift' and args:
+            threshold = float(args.pop(0))
+        elif arg == '--window' and args:
+            window = int(args.pop(0))
+        else:
+            department_name = arg
+
+    analytics = get_storage(department_name).price_analytics(window)
+    flagged = analytics.drifting(threshold)
+    print(f"{department_name}: {len(analytics)} items, {len(flagged)} with price drift over {threshold}% "
+          f"or outliers")
+    for row in analytics.rows(flagged):
+        change = f"{row['change_pct']:+.1f}%" if row['change_pct'] is not None else '-'
+        print(f"{row['resource_code']:12} {row['item_description'][:40]:40} {row['latest']:>10} {change:>9}"
+              f"{'  outlier' if row['outlier'] else ''}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
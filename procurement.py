@@ -0,0 +1,341 @@
+from datetime import datetime
+
+from storage import get_storage
+
+
+class ValidationError(ValueError):
+    """A request the procurement rules refuse; the message is meant for the user"""
+
+
+def approval_problems(pr):
+    """Messages for the PR fields that still have to be filled in before approval"""
+    problems = []
+    if not (pr.get('lpo_number') or '').strip():
+        problems.append("LPO Number is required before approval.\n\n"
+                        "Please view the PR details and fill in the LPO Number.")
+    if not (pr.get('supplier_name') or '').strip():
+        problems.append("Supplier Name is required before approval.\n\n"
+                        "Please view the PR details and fill in the Supplier Name.")
+    phone_number = (pr.get('phone_number') or '').strip()
+    if not phone_number or phone_number == '+971':
+        problems.append("Phone Number is required before approval.\n\n"
+                        "Please view the PR details and fill in the Phone Number.")
+    return problems
+
+
+def lpo_from_pr(pr, approval_date=None):
+    """LPO record for an approved PR (the PR itself is left unchanged)"""
+    lpo = dict(pr)
+    lpo['status'] = 'LPO - Awaiting Delivery'
+    lpo['approval_date'] = approval_date or datetime.now().strftime('%d/%m/%Y')
+    lpo['lpo_status'] = 'Invoice Prepared'
+
+    # Preserve manually entered LPO details from PR Details section
+    manual_lpo = lpo.get('lpo_number', '')
+    if manual_lpo and manual_lpo.strip():
+        lpo['manual_lpo_number'] = manual_lpo
+
+    # Generate system LPO number based on PR number for internal tracking
+    pr_number = lpo.get('pr_number', 'PR-000')
+    lpo['lpo_number'] = pr_number.replace('PR-', 'LPO-')
+    return lpo
+
+
+def summary(action, done, problems):
+    """One message for a bulk action: how many succeeded and why the others did not"""
+    lines = [f"{action} {done} record{'s' if done != 1 else ''}."]
+    if problems:
+        lines.append(f"\n{len(problems)} skipped:")
+        lines.extend(f"• {key}: {message.splitlines()[0]}" for key, message in problems)
+    return '\n'.join(lines)
+
+
+def price_lines(lpo):
+    """(resource code, description, unit, price) of each priced item; ValidationError for non-numbers"""
+    lines = []
+    for item in lpo.get('items', []):
+        price = (item.get('unit_price') or '').strip()
+        if not price:
+            continue
+        try:
+            float(price)
+        except ValueError:
+            raise ValidationError(f"Invalid price for {item.get('resource_code', '')}")
+        lines.append((item.get('resource_code', ''), item.get('item_description', ''), item.get('unit', ''), price))
+    return lines
+
+
+def delivery_lines(lpo, delivery):
+    """(resource code, description, unit, quantity) of each item in one of an LPO's deliveries"""
+    items = {}
+    for item in lpo.get('items', []):
+        items.setdefault(item.get('resource_code'), item)
+    lines = []
+    for resource_code, qty in delivery.get('items', {}).items():
+        item = items.get(resource_code, {})
+        lines.append((resource_code, item.get('item_description', 'N/A'), item.get('unit', 'Nos'), qty))
+    return lines
+
+
+def parse_quantities(values):
+    """Received quantities above zero by resource code; ValidationError for non-numbers"""
+    quantities = {}
+    for resource_code, value in values.items():
+        try:
+            qty = float(value or 0)
+        except ValueError:
+            raise ValidationError(f"Invalid quantity for {resource_code}")
+        if qty > 0:
+            quantities[resource_code] = qty
+    return quantities
+
+
+class ProcurementService:
+    """PR, LPO, delivery and pricing operations of one department, without any UI.
+
+    Views call these instead of changing storage themselves, so the same rules
+    apply whether a change comes from a dialog, a batch or a script. Records passed
+    in may be the shared cached ones: they are updated the way the views expect
+    (e.g. a new delivery appended), and storage is written through its own ops.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    # Purchase requests
+
+    def submit_pr(self, pr):
+        """Store a PR raised with its own number"""
+        self.storage.insert('pending_prs', pr)
+        return pr
+
+    def create_pr(self, pr_data):
+        """Add a new pending PR and return it"""
+        pr_number = f"PR-{len(self.storage.load('pending_prs')) + 1:03d}"
+        pr = {
+            "pr_number": pr_number,
+            "request_date": pr_data.get('request_date', ''),
+            "required_date": pr_data.get('required_date', ''),
+            "status": "Pending Approval",
+            "priority": "Medium",
+            "items_count": len(pr_data.get('items', [])),
+            "total_value": pr_data.get('total_value', '₹0'),
+            "description": pr_data.get('description', ''),
+            "items": pr_data.get('items', [])
+        }
+        self.storage.insert('pending_prs', pr)
+        return pr
+
+    def update_supplier_details(self, pr, lpo_number, supplier_name, phone_number):
+        """Store the LPO number, supplier and phone entered for a pending PR"""
+        lpo_number = lpo_number.strip()
+        supplier_name = supplier_name.strip()
+        phone_number = phone_number.strip()
+        if not lpo_number:
+            raise ValidationError("LPO Number is required.")
+        if not supplier_name:
+            raise ValidationError("Supplier Name is required.")
+        if not phone_number or phone_number == '+971':
+            raise ValidationError("Phone Number is required.")
+
+        fields = {'lpo_number': lpo_number, 'supplier_name': supplier_name, 'phone_number': phone_number}
+        pr.update(fields)
+        self.storage.update_fields('pending_prs', pr.get('pr_number'), fields)
+        return pr
+
+    def approve_pr(self, pr):
+        """Move a pending PR to the LPO list; returns the new LPO"""
+        problems = approval_problems(pr)
+        if problems:
+            raise ValidationError(problems[0])
+        lpo = lpo_from_pr(pr)
+        with self.storage.transaction():
+            self.storage.insert('lpo', lpo)
+            self.storage.delete('pending_prs', pr.get('pr_number'))
+        return lpo
+
+    def reject_pr(self, pr, reason):
+        """Move a pending PR to the rejected list with a reason"""
+        reason = (reason or '').strip()
+        if not reason:
+            raise ValidationError("Please provide a reason for rejection.")
+        pr['status'] = 'Rejected'
+        pr['rejection_reason'] = reason
+        pr['rejection_date'] = datetime.now().strftime('%d/%m/%Y %H:%M')
+        with self.storage.transaction():
+            self.storage.insert('rejected_prs', pr)
+            self.storage.delete('pending_prs', pr.get('pr_number'))
+        return pr
+
+    def undo_rejection(self, pr):
+        """Move a rejected PR back to pending"""
+        pr['status'] = 'Pending Approval'
+        pr.pop('rejection_reason', None)
+        pr.pop('rejection_date', None)
+        with self.storage.transaction():
+            self.storage.delete('rejected_prs', pr.get('pr_number'))
+            self.storage.insert('pending_prs', pr)
+        return pr
+
+    def delete_pr(self, pr):
+        self.storage.delete('pending_prs', pr.get('pr_number'))
+
+    def approve_prs(self, prs):
+        """Approve several PRs with one write per store.
+
+        Returns (new LPOs, [(pr number, problem)]) - PRs that fail validation are
+        left pending and reported, the others are approved together.
+        """
+        lpos = []
+        problems = []
+        approved = []
+        for pr in prs:
+            pr_problems = approval_problems(pr)
+            if pr_problems:
+                problems.append((pr.get('pr_number'), pr_problems[0]))
+            else:
+                lpos.append(lpo_from_pr(pr))
+                approved.append(pr.get('pr_number'))
+        with self.storage.transaction():
+            self.storage.batch('lpo', [{'op': 'insert', 'record': lpo} for lpo in lpos])
+            self.storage.batch('pending_prs', [{'op': 'delete', 'key': key} for key in approved])
+        return lpos, problems
+
+    def reject_prs(self, prs, reason):
+        """Reject several PRs with the same reason; returns the rejected PRs"""
+        reason = (reason or '').strip()
+        if not reason:
+            raise ValidationError("Please provide a reason for rejection.")
+        rejection_date = datetime.now().strftime('%d/%m/%Y %H:%M')
+        for pr in prs:
+            pr['status'] = 'Rejected'
+            pr['rejection_reason'] = reason
+            pr['rejection_date'] = rejection_date
+        with self.storage.transaction():
+            self.storage.batch('rejected_prs', [{'op': 'insert', 'record': pr} for pr in prs])
+            self.storage.batch('pending_prs', [{'op': 'delete', 'key': pr.get('pr_number')} for pr in prs])
+        return list(prs)
+
+    def delete_prs(self, prs):
+        self.storage.batch('pending_prs', [{'op': 'delete', 'key': pr.get('pr_number')} for pr in prs])
+
+    # LPOs
+
+    def mark_delivered(self, lpo):
+        fields = {'lpo_status': 'Delivered', 'delivery_date': datetime.now().strftime('%d/%m/%Y')}
+        lpo.update(fields)
+        self.storage.update_fields('lpo', lpo.get('lpo_number'), fields)
+        return lpo
+
+    def delete_lpo(self, lpo):
+        self.storage.delete('lpo', lpo.get('lpo_number'))
+
+    def mark_lpos_delivered(self, lpos):
+        fields = {'lpo_status': 'Delivered', 'delivery_date': datetime.now().strftime('%d/%m/%Y')}
+        for lpo in lpos:
+            lpo.update(fields)
+        self.storage.batch('lpo', [{'op': 'update_fields', 'key': lpo.get('lpo_number'), 'fields': fields}
+                                   for lpo in lpos])
+        return list(lpos)
+
+    def delete_lpos(self, lpos):
+        self.storage.batch('lpo', [{'op': 'delete', 'key': lpo.get('lpo_number')} for lpo in lpos])
+
+    # Deliveries
+
+    def record_delivery(self, lpo, quantities, date):
+        """Record received quantities ({resource code: qty}) on date (YYYY-MM-DD)"""
+        if not quantities:
+            raise ValidationError("Please enter quantities to receive")
+        delivery = {'date': date, 'items': dict(quantities)}
+        with self.storage.transaction():
+            self.storage.add_delivery(lpo.get('lpo_number'), delivery)
+            lpo.setdefault('deliveries', []).append(delivery)
+
+            # Mark as completed once all items are received
+            if self.storage.delivery_status(lpo) == 'Completed':
+                lpo['lpo_status'] = 'Completed'
+            else:
+                lpo['lpo_status'] = 'Partially Received'
+            self.storage.update_fields('lpo', lpo.get('lpo_number'), {'lpo_status': lpo['lpo_status']})
+        return delivery
+
+    def update_delivery(self, lpo, index, date, quantities):
+        """Replace the date and quantities of an LPO's delivery"""
+        delivery = lpo.get('deliveries', [])[index]
+        delivery['date'] = date
+        delivery['items'] = dict(quantities)
+        self.storage.update_delivery(lpo.get('lpo_number'), index, delivery)
+        return delivery
+
+    def delete_delivery(self, lpo, index):
+        deliveries = lpo.get('deliveries', [])
+        if index >= len(deliveries):
+            return
+        with self.storage.transaction():
+            self.storage.delete_delivery(lpo.get('lpo_number'), index)
+            del deliveries[index]
+            lpo['lpo_status'] = self.storage.delivery_status(lpo)
+            self.storage.update_fields('lpo', lpo.get('lpo_number'), {'lpo_status': lpo['lpo_status']})
+
+    # Pricing
+
+    def priced_lpo(self, lpo, prices):
+        """Copy of an LPO with prices applied; prices maps item index -> (unit_price, unit)"""
+        items = []
+        for i, item in enumerate(lpo.get('items', [])):
+            item = dict(item)
+            if i in prices:
+                price, unit = prices[i]
+                item['unit_price'] = (price or '').strip() or None
+                item['unit'] = unit
+            else:
+                item['unit_price'] = None
+            items.append(item)
+        return dict(lpo, items=items, pricing_updated=True)
+
+    def store_prices(self, lpo):
+        """Archive a priced LPO and add its prices to the trends; returns how many were added"""
+        prices = price_lines(lpo)
+        with self.storage.transaction():
+            self.storage.insert('archived_lpos', lpo)
+            return self.storage.record_prices(prices)
+
+    def store_prices_batch(self, lpos):
+        """Archive several priced LPOs and record all their prices with one write per store.
+
+        LPOs without any price are not archived; they are reported as problems.
+        Returns (archived LPOs, trend prices added, [(lpo number, problem)]).
+        """
+        archived = []
+        prices = []
+        problems = []
+        for lpo in lpos:
+            lpo_number = lpo.get('manual_lpo_number') or lpo.get('lpo_number')
+            try:
+                lines = price_lines(lpo)
+            except ValidationError as e:
+                problems.append((lpo_number, str(e)))
+                continue
+            if not lines:
+                problems.append((lpo_number, "No prices entered"))
+                continue
+            archived.append(lpo)
+            prices.extend(lines)
+        with self.storage.transaction():
+            self.storage.batch('archived_lpos', [{'op': 'insert', 'record': lpo} for lpo in archived])
+            self.storage.record_prices(prices)
+        return archived, len(prices), problems
+
+    def revert_pricing(self, lpo):
+        """Take a priced LPO out of the archive so it can be priced again"""
+        for item in lpo.get('items', []):
+            item.pop('unit_price', None)
+        lpo['pricing_updated'] = False
+        self.storage.delete('archived_lpos', lpo.get('lpo_number'))
+        return lpo
+
+
+def procurement_service(department_name):
+    """Service for a department, on its shared storage"""
+    return ProcurementService(get_storage(department_name))
@@ -1,64 +1,24 @@
 import tkinter as tk
 from tkinter import messagebox
-import json
-import os
 from datetime import datetime
+from storage import get_storage
+from procurement import ProcurementService
 
 class RejectedPRs:
     def __init__(self, parent_frame, department_name, pending_prs_callback=None):
         self.parent_frame = parent_frame
         self.department_name = department_name
-        self.rejected_file = f"rejected_prs_{department_name.lower().replace(' ', '_')}.json"
+        self.storage = get_storage(department_name)
+        self.service = ProcurementService(self.storage)
         self.pending_prs_callback = pending_prs_callback
     
-    def save_rejected_pr(self, pr, reason):
-        """Save rejected PR with reason"""
-        print(f"DEBUG: Saving rejected PR: {pr.get('pr_number')} with reason: {reason}")
-        print(f"DEBUG: Rejected file path: {self.rejected_file}")
-        
-        # Load existing rejected PRs
-        rejected_prs = []
-        try:
-            if os.path.exists(self.rejected_file):
-                with open(self.rejected_file, 'r') as f:
-                    rejected_prs = json.load(f)
-                print(f"DEBUG: Loaded {len(rejected_prs)} existing rejected PRs")
-        except Exception as e:
-            print(f"Error loading rejected PRs: {e}")
-        
-        # Add rejection info
-        pr['status'] = 'Rejected'
-        pr['rejection_reason'] = reason
-        pr['rejection_date'] = datetime.now().strftime('%d/%m/%Y %H:%M')
-        
-        # Add to rejected PRs
-        rejected_prs.append(pr)
-        print(f"DEBUG: Added PR to rejected list. Total rejected PRs: {len(rejected_prs)}")
-        
-        # Save rejected PRs
-        try:
-            with open(self.rejected_file, 'w') as f:
-                json.dump(rejected_prs, f, indent=2)
-            print(f"DEBUG: Successfully saved rejected PRs to {self.rejected_file}")
-        except Exception as e:
-            print(f"Error saving rejected PRs: {e}")
-            import traceback
-            traceback.print_exc()
-    
     def show_rejected_prs(self):
         """Show rejected PRs in a new window"""
-        print(f"DEBUG: Loading rejected PRs from: {self.rejected_file}")
-        print(f"DEBUG: File exists: {os.path.exists(self.rejected_file)}")
-        
         # Load rejected PRs
         rejected_prs = []
         try:
-            if os.path.exists(self.rejected_file):
-                with open(self.rejected_file, 'r') as f:
-                    rejected_prs = json.load(f)
-                print(f"DEBUG: Loaded {len(rejected_prs)} rejected PRs")
-            else:
-                print("DEBUG: Rejected PRs file does not exist")
+            rejected_prs = self.storage.load('rejected_prs')
+            print(f"DEBUG: Loaded {len(rejected_prs)} rejected PRs")
         except Exception as e:
             print(f"Error loading rejected PRs: {e}")
             import traceback
@@ -250,26 +210,9 @@ class RejectedPRs:
         if not result:
             return
         
-        # Remove rejection info and restore to pending status
-        pr['status'] = 'Pending Approval'
-        if 'rejection_reason' in pr:
-            del pr['rejection_reason']
-        if 'rejection_date' in pr:
-            del pr['rejection_date']
-        
-        # Remove from rejected PRs file
+        # Move from the rejected PRs store back to pending
         try:
-            rejected_prs = []
-            if os.path.exists(self.rejected_file):
-                with open(self.rejected_file, 'r') as f:
-                    rejected_prs = json.load(f)
-            
-            # Remove this PR from rejected list
-            rejected_prs = [p for p in rejected_prs if p.get('pr_number') != pr.get('pr_number')]
-            
-            # Save updated rejected PRs
-            with open(self.rejected_file, 'w') as f:
-                json.dump(rejected_prs, f, indent=2)
+            self.service.undo_rejection(pr)
             
             # Add back to pending PRs if callback is available
             if self.pending_prs_callback:
@@ -0,0 +1,56 @@
+class SearchController:
+    """Debounces search input so that only the latest query reaches the screen.
+
+    Keystrokes restart a short timer and the view's filter runs once typing pauses.
+    Follow-up work a render schedules (e.g. the next batch of cards) goes through
+    after(); it is cancelled as soon as a newer query comes in, so a stale result can
+    never be drawn over a newer one.
+    """
+
+    def __init__(self, widget, run, delay=250):
+        self.widget = widget
+        self.run = run
+        self.delay = delay
+        self.job = None
+        self.jobs = set()
+        self.generation = 0
+
+    def schedule(self, event=None):
+        """Run the filter once input has been quiet for delay ms"""
+        self.cancel()
+        self.job = self.widget.after(self.delay, self.fire)
+
+    def fire(self):
+        self.job = None
+        self.run()
+
+    def run_now(self):
+        """Run the filter immediately (clear buttons, refresh), dropping pending work"""
+        self.cancel()
+        self.run()
+
+    def cancel(self):
+        """Drop the pending query and every render step scheduled for earlier queries"""
+        self.generation += 1
+        for job in [self.job] + list(self.jobs):
+            if job is not None:
+                try:
+                    self.widget.after_cancel(job)
+                except Exception:
+                    pass
+        self.job = None
+        self.jobs.clear()
+
+    def after(self, ms, func):
+        """Schedule render work belonging to the current query"""
+        generation = self.generation
+        job = None
+
+        def call():
+            self.jobs.discard(job)
+            if generation == self.generation:
+                func()
+
+        job = self.widget.after(ms, call)
+        self.jobs.add(job)
+        return job
@@ -0,0 +1,251 @@
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+from storage import apply_operation, get_storage, to_float, LPO_COLLECTIONS
+
+# python spend_rollup.py Department [--supplier NAME] [--code CODE] [--from YYYY-MM] [--to YYYY-MM] [--by supplier|month|resource_code]
+FIELDS = ('spend', 'committed', 'delivered', 'committed_qty', 'delivered_qty')
+FIELD_INDEX = {field: i for i, field in enumerate(FIELDS)}
+DIMENSIONS = ('supplier', 'month', 'resource_code')
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d')
+UNKNOWN_SUPPLIER = 'Unknown'
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_text):
+    """date of a stored date string (dd/mm/YYYY or YYYY-mm-dd), None when it cannot be read"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime((date_text or '').strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def month_of(date_text):
+    """'YYYY-MM' of a stored date, '' when it cannot be read"""
+    date = parse_date(date_text)
+    return date.strftime('%Y-%m') if date else ''
+
+
+def months_between(first, last):
+    """'YYYY-MM' months from first to last inclusive"""
+    year, month = map(int, first.split('-'))
+    months = []
+    while f"{year:04d}-{month:02d}" <= last:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def copy_record(record):
+    """Own copy of an LPO, so later changes to the caller's record do not leak in"""
+    return dict(record, items=[dict(item) for item in record.get('items', [])],
+                deliveries=[dict(delivery, items=dict(delivery.get('items', {})))
+                            for delivery in record.get('deliveries', [])])
+
+
+class LpoAggregate:
+    """Totals over LPO records, kept current from storage mutations.
+
+    Keeps its own copy of each LPO in collections and the contribution each LPO
+    made to the totals. A mutation takes the LPOs it touches out of the totals and
+    adds them back, so nothing else is rescanned. Subclasses provide
+    contribution(lpo_number) and adjust(contribution, sign).
+    """
+
+    collections = LPO_COLLECTIONS
+
+    def __init__(self, records, signature=None):
+        """records: {collection: [LPO records]}"""
+        self.signature = signature
+        self.records = {collection: {} for collection in self.collections}
+        self.contributions = {}
+        for collection, rows in records.items():
+            for record in rows:
+                self.records[collection][record.get('lpo_number')] = copy_record(record)
+
+    def lpo_numbers(self):
+        numbers = set()
+        for records in self.records.values():
+            numbers.update(records)
+        return numbers
+
+    def add(self, lpo_number):
+        if any(lpo_number in records for records in self.records.values()):
+            contribution = self.contribution(lpo_number)
+            self.contributions[lpo_number] = contribution
+            self.adjust(contribution, 1)
+
+    def remove(self, lpo_number):
+        contribution = self.contributions.pop(lpo_number, None)
+        if contribution:
+            self.adjust(contribution, -1)
+
+    def apply(self, collection, operation):
+        """Apply a storage mutation of one of the collections"""
+        if collection not in self.collections:
+            return
+        op = operation['op']
+        records = self.records[collection]
+        if op == 'batch':
+            for part in operation['operations']:
+                self.apply(collection, part)
+            return
+        if op == 'save':
+            changed = set(records)
+            records.clear()
+            for record in operation['records']:
+                records[record.get('lpo_number')] = copy_record(record)
+            changed |= set(records)
+        elif op in ('insert', 'update'):
+            record = copy_record(operation['record'])
+            changed = {record.get('lpo_number')}
+            records[record.get('lpo_number')] = record
+        elif op == 'delete':
+            changed = {operation['key']}
+            records.pop(operation['key'], None)
+        elif operation.get('key') in records:
+            changed = {operation['key']}
+            apply_operation([records[operation['key']]], collection, operation)
+        else:
+            return
+        for lpo_number in changed:
+            self.remove(lpo_number)
+            self.add(lpo_number)
+
+
+class SpendRollup(LpoAggregate):
+    """Spend, committed and delivered values per supplier x month x resource code.
+
+    - spend: quantity x unit price of the priced (archived) LPOs, in their approval month
+    - committed: ordered quantity and value of the approved LPOs, in their approval month
+    - delivered: received quantity and value, in the month of each delivery
+
+    Values use the unit prices entered in Costs; quantities of unpriced items are
+    counted without a value. Every total is also kept for each combination of the
+    three keys with any of them left out (None), so a query is a dictionary lookup.
+    """
+
+    def __init__(self, lpos, archived_lpos, signature=None):
+        super().__init__({'lpo': lpos, 'archived_lpos': archived_lpos}, signature)
+        self.totals = {}
+        # Sum every LPO's cells first, so each cell is projected into the totals once
+        cells = {}
+        for lpo_number in self.lpo_numbers():
+            self.contributions[lpo_number] = self.contribution(lpo_number)
+            for cell, values in self.contributions[lpo_number].items():
+                total = cells.get(cell)
+                cells[cell] = values if total is None else [a + b for a, b in zip(total, values)]
+        self.adjust(cells, 1)
+
+    def contribution(self, lpo_number):
+        """{(supplier, month, resource code): [values in FIELDS order]} of one LPO"""
+        live = self.records['lpo'].get(lpo_number)
+        priced = self.records['archived_lpos'].get(lpo_number)
+        record = live or priced
+        supplier = (record.get('supplier_name') or '').strip() or UNKNOWN_SUPPLIER
+        month = month_of(record.get('approval_date') or record.get('date'))
+        cells = {}
+
+        def add(resource_code, cell_month, field, value):
+            values = cells.setdefault((supplier, cell_month, resource_code), [0.0] * len(FIELDS))
+            values[FIELD_INDEX[field]] += value
+
+        prices = {}
+        for item in (priced or {}).get('items', []):
+            price = to_float(item.get('unit_price'))
+            if price is not None:
+                prices[item.get('resource_code', '')] = price
+                add(item.get('resource_code', ''), month, 'spend', price * (to_float(item.get('quantity')) or 0.0))
+
+        if live is not None:
+            for item in live.get('items', []):
+                code = item.get('resource_code', '')
+                qty = to_float(item.get('quantity')) or 0.0
+                add(code, month, 'committed_qty', qty)
+                add(code, month, 'committed', qty * prices.get(code, 0.0))
+            for delivery in live.get('deliveries', []):
+                delivery_month = month_of(delivery.get('date')) or month
+                for code, qty in delivery.get('items', {}).items():
+                    qty = to_float(qty) or 0.0
+                    add(code, delivery_month, 'delivered_qty', qty)
+                    add(code, delivery_month, 'delivered', qty * prices.get(code, 0.0))
+        return cells
+
+    def adjust(self, cells, sign):
+        for (supplier, month, code), values in cells.items():
+            if sign < 0:
+                values = [-value for value in values]
+            for key in ((supplier, month, code), (supplier, month, None), (supplier, None, code),
+                        (None, month, code), (supplier, None, None), (None, month, None),
+                        (None, None, code), (None, None, None)):
+                totals = self.totals.get(key)
+                if totals is None:
+                    self.totals[key] = list(values)
+                    continue
+                totals = [total + value for total, value in zip(totals, values)]
+                if sign < 0 and all(abs(total) < 1e-9 for total in totals):
+                    del self.totals[key]
+                else:
+                    self.totals[key] = totals
+
+    def total(self, supplier=None, month=None, resource_code=None):
+        """{field: value} for one supplier/month/resource code; None means all of them"""
+        values = self.totals.get((supplier, month, resource_code))
+        return dict(zip(FIELDS, values or [0.0] * len(FIELDS)))
+
+    def total_over(self, months, supplier=None, resource_code=None):
+        """Totals summed over several months (e.g. a quarter)"""
+        result = dict.fromkeys(FIELDS, 0.0)
+        for month in months:
+            for field, value in self.total(supplier, month, resource_code).items():
+                result[field] += value
+        return result
+
+    def breakdown(self, dimension, supplier=None, month=None, resource_code=None):
+        """[(value of dimension, {field: value})] under the given filters, largest spend first"""
+        position = DIMENSIONS.index(dimension)
+        wanted = (supplier, month, resource_code)
+        rows = []
+        for key, values in self.totals.items():
+            if key[position] is None:
+                continue
+            if all(key[i] == wanted[i] for i in range(len(DIMENSIONS)) if i != position):
+                rows.append((key[position], dict(zip(FIELDS, values))))
+        rows.sort(key=lambda row: (-row[1]['spend'], str(row[0])))
+        return rows
+
+
+def main(argv):
+    args = list(argv)
+    options = {'supplier': None, 'code': None, 'from': None, 'to': None, 'by': 'supplier'}
+    department_name = 'Electrical'
+    while args:
+        arg = args.pop(0)
+        if arg.startswith('--') and arg[2:] in options and args:
+            options[arg[2:]] = args.pop(0)
+        else:
+            department_name = arg
+
+    rollup = get_storage(department_name).spend_rollup()
+    if options['from'] or options['to']:
+        months = months_between(options['from'] or options['to'], options['to'] or options['from'])
+        total = rollup.total_over(months, options['supplier'], options['code'])
+        rows = []
+    else:
+        months = None
+        total = rollup.total(options['supplier'], None, options['code'])
+        rows = rollup.breakdown(options['by'], options['supplier'], None, options['code'])
+
+    period = f"{months[0]} to {months[-1]}" if months else "all months"
+    print(f"{department_name}, {options['supplier'] or 'all suppliers'}, {period}:")
+    print(f"  spend {total['spend']:.2f}  committed {total['committed']:.2f}  delivered {total['delivered']:.2f}")
+    for value, values in rows:
+        print(f"  {value or '-':30} spend {values['spend']:>12.2f}  committed {values['committed']:>12.2f}  "
+              f"delivered {values['delivered']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,197 @@
+import json
+import os
+import platform
+import sys
+import time
+
+# main_page.py --profile-startup[=report.json] [--profile-department NAME] [--startup-budget-ms MS]
+DEFAULT_REPORT = 'startup_profile.json'
+DEFAULT_DEPARTMENT = 'Electrical'
+# (tab, subtab) opened in the department; it is interactive once this view has shown its data
+PROFILE_VIEW = ('Purchase Request', "📋 Pending PR'S")
+# Give up on a view that never reports its load
+TIMEOUT_MS = 60000
+
+
+class TimedLoader:
+    """Wraps a module loader to time exec_module (everything else is passed through)"""
+
+    def __init__(self, loader, name, timer):
+        self.loader = loader
+        self.name = name
+        self.timer = timer
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.begin(self.name)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.end()
+
+
+class ImportTimer:
+    """Meta path finder that records how long each newly imported module takes.
+
+    inclusive_ms covers the module and everything it imported; self_ms leaves out
+    the modules it imported.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.records = []
+        self.stack = []
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def begin(self, name):
+        self.stack.append({'module': name, 'start': self.clock(), 'children': 0.0,
+                           'parent': self.stack[-1]['module'] if self.stack else None})
+
+    def end(self):
+        frame = self.stack.pop()
+        elapsed = self.clock() - frame['start']
+        if self.stack:
+            self.stack[-1]['children'] += elapsed
+        self.records.append({
+            'module': frame['module'],
+            'parent': frame['parent'],
+            'inclusive_ms': round(elapsed * 1000, 3),
+            'self_ms': round((elapsed - frame['children']) * 1000, 3)
+        })
+
+
+class StartupProfile:
+    """Collects import times and startup milestones and writes them as JSON"""
+
+    def __init__(self, report_path=DEFAULT_REPORT, department=DEFAULT_DEPARTMENT, budget_ms=None):
+        self.report_path = report_path
+        self.department = department
+        self.budget_ms = budget_ms
+        self.started = time.perf_counter()
+        self.marks = {}
+        self.imports = ImportTimer(time.perf_counter)
+
+    def start(self):
+        sys.meta_path.insert(0, self.imports)
+
+    def stop(self):
+        if self.imports in sys.meta_path:
+            sys.meta_path.remove(self.imports)
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+    def mark(self, name):
+        self.marks[name] = self.elapsed_ms()
+
+    def report(self):
+        interactive = self.marks.get('department_interactive_ms')
+        records = sorted(self.imports.records, key=lambda r: r['inclusive_ms'], reverse=True)
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'department': self.department,
+            'marks': dict(self.marks),
+            'budget_ms': self.budget_ms,
+            'over_budget': (self.budget_ms is not None
+                            and (interactive is None or interactive > self.budget_ms)),
+            'import_total_ms': round(sum(r['self_ms'] for r in records), 3),
+            'imports': records
+        }
+
+    def write(self):
+        report = self.report()
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Startup profile written to {os.path.abspath(self.report_path)}")
+        except Exception as e:
+            print(f"Error writing startup profile: {e}")
+        return report
+
+    def run(self, root, app):
+        """Mark first paint, open the department's view, mark it interactive once the
+        view has shown its first load, then write and quit"""
+        from events import event_bus, VIEW_LOADED
+
+        def exposed(event):
+            if 'first_paint_ms' in self.marks:
+                return
+            # Expose only schedules the redraw; it is done when the idle tasks have run
+            root.update_idletasks()
+            self.mark('first_paint_ms')
+            root.after(0, open_view)
+
+        def open_view():
+            department = app.show_department(self.department)
+            department.show_tab(*PROFILE_VIEW)
+
+        def loaded(event):
+            if event.get('error'):
+                # A view showing a load error is not interactive
+                print(f"Error loading {event.get('view')}: {event['error']}")
+            else:
+                self.mark('department_interactive_ms')
+            event_bus.unsubscribe(subscription)
+            root.after_idle(finish)
+
+        def timeout():
+            if subscription in event_bus.subscriptions:
+                finish()
+
+        def finish():
+            event_bus.unsubscribe(subscription)
+            self.stop()
+            report = self.write()
+            root.destroy()
+            if report['over_budget']:
+                interactive = report['marks'].get('department_interactive_ms')
+                if interactive is None:
+                    print(f"Startup over budget: {PROFILE_VIEW[1]} did not load")
+                else:
+                    print(f"Startup over budget: {interactive} ms > {self.budget_ms} ms")
+                sys.exit(1)
+
+        self.mark('main_window_built_ms')
+        subscription = event_bus.subscribe(VIEW_LOADED, loaded, department=self.department)
+        root.bind('<Expose>', exposed, add='+')
+        root.after(TIMEOUT_MS, timeout)
+
+
+def from_args(argv):
+    """A started StartupProfile when argv asks for one, else None"""
+    profile = None
+    department = DEFAULT_DEPARTMENT
+    budget_ms = None
+    args = list(argv[1:])
+    while args:
+        arg = args.pop(0)
+        if arg == '--profile-startup' or arg.startswith('--profile-startup='):
+            profile = arg.partition('=')[2] or DEFAULT_REPORT
+        elif arg == '--profile-department' and args:
+            department = args.pop(0)
+        elif arg == '--startup-budget-ms' and args:
+            budget_ms = float(args.pop(0))
+    if profile is None:
+        return None
+    startup = StartupProfile(profile, department, budget_ms)
+    startup.start()
+    return startup
@@ -0,0 +1,1572 @@
+import bisect
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from atomic_io import (DEFAULT_BACKUPS, DEFAULT_FORMAT, PRETTY, fsync_directory, load_data, rotate_backups,
+                       save_data)
+from document_cache import document_cache, file_signature
+from events import DATA_CHANGED, OPERATION_EVENTS, event_bus, file_watcher
+
+SETTINGS_FILE = 'storage_settings.json'
+DEFAULT_SETTINGS = {
+    'backend': 'sqlite',
+    'database': 'stock_tracker.db'
+}
+
+# Collection name -> key field. Names match the legacy "<collection>_<dept>.json" files.
+COLLECTIONS = {
+    'pending_prs': 'pr_number',
+    'rejected_prs': 'pr_number',
+    'completed_prs': 'pr_id',
+    'lpo': 'lpo_number',
+    'archived_lpos': 'lpo_number'
+}
+
+PR_COLLECTIONS = ('pending_prs', 'rejected_prs', 'completed_prs')
+LPO_COLLECTIONS = ('lpo', 'archived_lpos')
+TRENDS = 'trends'
+
+# Journal size (bytes) after which it is folded back into the JSON snapshots
+DEFAULT_COMPACT_BYTES = 1024 * 1024
+
+
+def department_slug(department_name):
+    """File-name friendly department name"""
+    return department_name.lower().replace(' ', '_')
+
+
+def collection_file(collection, department_name):
+    """Legacy JSON file holding a collection for a department"""
+    return f"{collection}_{department_slug(department_name)}.json"
+
+
+def load_settings():
+    """Load storage settings, falling back to defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        if os.path.exists(SETTINGS_FILE):
+            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+                settings.update(json.load(f))
+    except Exception as e:
+        print(f"Error loading storage settings: {e}")
+    return settings
+
+
+def find_record(records, collection, key):
+    """Return the first record in a list matching the collection key"""
+    key_field = COLLECTIONS[collection]
+    for record in records:
+        if record.get(key_field) == key:
+            return record
+    return None
+
+
+class RecordIndex:
+    """Hash maps over a loaded collection by key, PR number and resource code"""
+
+    def __init__(self, records, key_field):
+        self.by_key = {}
+        self.by_pr = {}
+        self.by_code = {}
+        for record in records:
+            self.by_key.setdefault(record.get(key_field), record)
+            pr_number = record.get('pr_number')
+            if pr_number:
+                self.by_pr.setdefault(pr_number, []).append(record)
+            codes = {item.get('resource_code') for item in record.get('items', [])}
+            for code in codes:
+                if code:
+                    self.by_code.setdefault(code, []).append(record)
+
+    def __contains__(self, key):
+        return key in self.by_key
+
+    def get(self, key):
+        return self.by_key.get(key)
+
+    def with_pr(self, pr_number):
+        return self.by_pr.get(pr_number, [])
+
+    def with_code(self, resource_code):
+        return self.by_code.get(resource_code, [])
+
+
+class ReceivedLedger:
+    """Running received quantities per (LPO, resource code).
+
+    Built once from the LPO collection, then kept current from the delivery
+    mutations themselves instead of re-summing every delivery on each render.
+    """
+
+    def __init__(self, records, signature=None):
+        self.signature = signature
+        self.deliveries = {}
+        self.totals = {}
+        for record in records:
+            self.add_record(record)
+
+    def add_record(self, record):
+        lpo_number = record.get('lpo_number')
+        if lpo_number in self.totals:
+            return
+        self.deliveries[lpo_number] = []
+        self.totals[lpo_number] = {}
+        for delivery in record.get('deliveries', []):
+            self.add_delivery(lpo_number, delivery)
+
+    def adjust(self, lpo_number, items, sign):
+        totals = self.totals[lpo_number]
+        for code, qty in items.items():
+            totals[code] = totals.get(code, 0.0) + sign * (to_float(qty) or 0.0)
+
+    def add_delivery(self, lpo_number, delivery):
+        items = dict(delivery.get('items', {}))
+        self.deliveries[lpo_number].append(items)
+        self.adjust(lpo_number, items, 1)
+
+    def apply(self, operation):
+        """Apply a storage mutation of the LPO collection"""
+        op = operation['op']
+        if op == 'batch':
+            for part in operation['operations']:
+                self.apply(part)
+        elif op == 'save':
+            self.__init__(operation['records'], self.signature)
+        elif op == 'insert':
+            self.add_record(operation['record'])
+        elif op == 'update':
+            record = operation['record']
+            self.totals.pop(record.get('lpo_number'), None)
+            self.add_record(record)
+        elif op == 'delete':
+            self.totals.pop(operation['key'], None)
+            self.deliveries.pop(operation['key'], None)
+        elif operation.get('key') in self.totals:
+            lpo_number = operation['key']
+            deliveries = self.deliveries[lpo_number]
+            if op == 'add_delivery':
+                self.add_delivery(lpo_number, operation['delivery'])
+            elif op in ('update_delivery', 'delete_delivery') and operation['index'] < len(deliveries):
+                self.adjust(lpo_number, deliveries[operation['index']], -1)
+                if op == 'update_delivery':
+                    items = dict(operation['delivery'].get('items', {}))
+                    deliveries[operation['index']] = items
+                    self.adjust(lpo_number, items, 1)
+                else:
+                    del deliveries[operation['index']]
+
+    def received(self, lpo_number):
+        return self.totals.get(lpo_number)
+
+
+def price_key(resource_code, item_description):
+    """Case-insensitive item key, matching find_trend"""
+    return ((resource_code or '').lower(), (item_description or '').lower())
+
+
+class PriceIndex:
+    """Latest unit price per item.
+
+    Built once from the price trends, then kept current from the record_price
+    mutations, so a dialog's unit rates are dictionary lookups instead of a scan
+    of every trend per row.
+    """
+
+    def __init__(self, trends_data, signature=None):
+        self.signature = signature
+        self.latest = {}
+        for trend in trends_data.values():
+            key = price_key(trend.get('resource_code'), trend.get('item_description'))
+            # The first trend of an item is the one find_trend (and record_price) use
+            if key not in self.latest:
+                history = trend.get('price_history', [])
+                self.latest[key] = to_float(history[-1].get('price')) if history else None
+
+    def apply(self, operation):
+        """Apply a storage mutation of the trends"""
+        op = operation['op']
+        if op == 'batch':
+            for part in operation['operations']:
+                self.apply(part)
+        elif op == 'save':
+            self.__init__(operation['records'], self.signature)
+        elif op == 'record_price':
+            key = price_key(operation['resource_code'], operation['item_description'])
+            self.latest[key] = to_float(operation['entry'].get('price'))
+
+    def rate(self, resource_code, item_description):
+        """Latest price of an item, 0.0 when it has none"""
+        return self.latest.get(price_key(resource_code, item_description)) or 0.0
+
+
+WORD = re.compile(r'[^\W_]+')
+WORD_PART = re.compile(r'[^\W\d_]+|\d+')
+PUNCTUATION = '.,;:!?()[]{}"\''
+
+
+def query_words(text):
+    """Whitespace separated words of a text, lower-cased, without edge punctuation"""
+    words = (chunk.strip(PUNCTUATION) for chunk in str(text).lower().split())
+    return {word for word in words if word}
+
+
+def search_tokens(text):
+    """Words of a text (as typed, e.g. "lpo-0012"), their alphanumeric parts and
+    the letter and digit runs inside those ("pr001" -> "pr", "001")"""
+    tokens = query_words(text)
+    for chunk in list(tokens):
+        words = (chunk,) if chunk.isalnum() else WORD.findall(chunk)
+        for word in words:
+            tokens.add(word)
+            if not (word.isalpha() or word.isdigit()):
+                tokens.update(WORD_PART.findall(word))
+    return tokens
+
+
+class SearchIndex:
+    """Inverted index from words to record keys over the searchable fields.
+
+    Covers PR/LPO numbers, descriptions, supplier names and the resource codes and
+    descriptions of every line item. Queries match records containing a word that
+    starts with each query word. Kept current from the storage mutations.
+    """
+
+    FIELDS = ('pr_number', 'lpo_number', 'manual_lpo_number', 'description', 'supplier_name')
+    ITEM_FIELDS = ('resource_code', 'item_description')
+
+    def __init__(self, records, key_field, signature=None):
+        self.key_field = key_field
+        self.signature = signature
+        self.postings = {}
+        self.vocabulary = []
+        self.documents = {}
+        self.prefixes = {}
+        self.tokens = {}
+        for record in records:
+            key = record.get(key_field)
+            if key not in self.documents:
+                self.index(key, self.searchable(record), bulk=True)
+        self.vocabulary = sorted(self.postings)
+        self.tokens = {}
+
+    def searchable(self, fields):
+        """The indexed part of a record (or of an update_fields change)"""
+        document = {field: fields[field] for field in self.FIELDS if fields.get(field)}
+        if 'items' in fields:
+            document['items'] = [tuple(item.get(field) for field in self.ITEM_FIELDS)
+                                 for item in fields.get('items') or []]
+        return document
+
+    def add(self, record):
+        key = record.get(self.key_field)
+        if key not in self.documents:
+            self.index(key, self.searchable(record))
+
+    def text_tokens(self, text):
+        """search_tokens(), remembered while building (descriptions repeat a lot)"""
+        tokens = self.tokens.get(text)
+        if tokens is None:
+            tokens = self.tokens[text] = search_tokens(text)
+        return tokens
+
+    def index(self, key, document, bulk=False):
+        tokens = set()
+        for field in self.FIELDS:
+            if document.get(field):
+                tokens |= self.text_tokens(document[field])
+        for values in document.get('items', []):
+            for value in values:
+                if value:
+                    tokens |= self.text_tokens(value)
+        self.documents[key] = (document, tokens)
+        for token in tokens:
+            keys = self.postings.get(token)
+            if keys is None:
+                keys = self.postings[token] = set()
+                if not bulk:
+                    bisect.insort(self.vocabulary, token)
+            keys.add(key)
+        self.prefixes = {}
+
+    def remove(self, key):
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        for token in document[1]:
+            keys = self.postings[token]
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        self.prefixes = {}
+
+    def apply(self, operation):
+        """Apply a storage mutation of the indexed collection"""
+        op = operation['op']
+        if op == 'batch':
+            for part in operation['operations']:
+                self.apply(part)
+        elif op == 'save':
+            self.__init__(operation['records'], self.key_field, self.signature)
+        elif op == 'insert':
+            self.add(operation['record'])
+        elif op == 'update':
+            self.remove(operation['record'].get(self.key_field))
+            self.add(operation['record'])
+        elif op == 'delete':
+            self.remove(operation['key'])
+        elif op == 'update_fields' and operation['key'] in self.documents:
+            document = dict(self.documents[operation['key']][0])
+            document.update(self.searchable(operation['fields']))
+            self.remove(operation['key'])
+            self.index(operation['key'], document)
+
+    def matching(self, prefix):
+        """Keys of records having a word that starts with prefix"""
+        keys = self.prefixes.get(prefix)
+        if keys is None:
+            keys = set()
+            start = bisect.bisect_left(self.vocabulary, prefix)
+            for token in self.vocabulary[start:]:
+                if not token.startswith(prefix) or len(keys) == len(self.documents):
+                    break
+                keys |= self.postings[token]
+            if len(self.prefixes) >= 256:
+                self.prefixes = {}
+            self.prefixes[prefix] = keys
+        return keys
+
+    def search(self, query):
+        """Keys of records matching every word of the query, None for an empty query"""
+        words = query_words(query)
+        if not words:
+            return None
+        result = None
+        for word in sorted(words, key=len, reverse=True):
+            keys = self.matching(word)
+            result = set(keys) if result is None else result & keys
+            if not result:
+                break
+        return result
+
+
+def received_from_deliveries(lpo):
+    """Received quantity per resource code, summed from an LPO's deliveries"""
+    totals = {}
+    for delivery in lpo.get('deliveries', []):
+        for code, qty in delivery.get('items', {}).items():
+            totals[code] = totals.get(code, 0.0) + (to_float(qty) or 0.0)
+    return totals
+
+
+class StorageBase:
+    """Lookups shared by every backend, derived from load().
+
+    Storages are used from the Tk thread and the background I/O worker; self.lock
+    guards the derived lookups (ledger, search indexes) and whole-file rewrites.
+    """
+
+    ledger = None
+    search_indexes = None
+    prices = None
+    rollup = None
+    performance = None
+    # Set while batch() runs its operations, which it then tracks as one change
+    batching = False
+
+    def index(self, collection):
+        """Hash index over a collection, shared until the collection changes"""
+        records = self.load(collection)
+        return document_cache.derived(('index', type(self).__name__, self.department_name, collection),
+                                      records, lambda r: RecordIndex(r, COLLECTIONS[collection]))
+
+    def collection_signature(self, collection):
+        """Detects changes to a collection made outside this storage object"""
+        return None
+
+    def ledger_signature(self):
+        return self.collection_signature('lpo')
+
+    def received(self, lpo):
+        """Received quantity per resource code for a pending LPO"""
+        with self.lock:
+            signature = self.ledger_signature()
+            if self.ledger is None or self.ledger.signature != signature:
+                self.ledger = ReceivedLedger(self.load('lpo'), signature)
+            totals = self.ledger.received(lpo.get('lpo_number'))
+        if totals is None:
+            return received_from_deliveries(lpo)
+        return totals
+
+    def delivery_status(self, lpo):
+        """'Pending', 'Partial' or 'Completed' from the LPO's received quantities"""
+        if not lpo.get('deliveries'):
+            return 'Pending'
+        received = self.received(lpo)
+        for item in lpo.get('items', []):
+            if received.get(item.get('resource_code', ''), 0) < float(item.get('quantity', 0)):
+                return 'Partial'
+        return 'Completed'
+
+    def price_index(self):
+        """Latest price per item, kept current from price mutations"""
+        with self.lock:
+            signature = self.collection_signature(TRENDS)
+            if self.prices is None or self.prices.signature != signature:
+                self.prices = PriceIndex(self.load_trends(), signature)
+            return self.prices
+
+    def unit_rates(self, items):
+        """Latest trend price of each item (0.0 when it has none), in item order"""
+        with self.lock:
+            index = self.price_index()
+            return [index.rate(item.get('resource_code'), item.get('item_description')) for item in items]
+
+    def rollup_signature(self):
+        return (self.collection_signature('lpo'), self.collection_signature('archived_lpos'))
+
+    def spend_rollup(self):
+        """Spend/committed/delivered totals by supplier, month and resource code (spend_rollup.py)"""
+        from spend_rollup import SpendRollup
+        with self.lock:
+            signature = self.rollup_signature()
+            if self.rollup is None or self.rollup.signature != signature:
+                self.rollup = SpendRollup(self.load('lpo'), self.load('archived_lpos'), signature)
+            return self.rollup
+
+    def supplier_performance(self):
+        """Lead time, on-time and fill-rate statistics per supplier (supplier_performance.py)"""
+        from supplier_performance import SupplierPerformance
+        with self.lock:
+            signature = self.collection_signature('lpo')
+            if self.performance is None or self.performance.signature != signature:
+                self.performance = SupplierPerformance(self.load('lpo'), signature)
+            return self.performance
+
+    def price_analytics(self, window=None):
+        """Vectorized statistics of every item's price history, shared until the trends change.
+
+        Needs numpy (imported here, so storage works without it).
+        """
+        from price_analytics import PriceAnalytics, DEFAULT_WINDOW
+        window = window or DEFAULT_WINDOW
+        return document_cache.derived(('price_analytics', type(self).__name__, self.department_name, window),
+                                      self.load_trends(), lambda trends: PriceAnalytics(trends, window))
+
+    def search_index(self, collection):
+        """Word index over a PR or LPO collection, kept current from mutations"""
+        with self.lock:
+            if self.search_indexes is None:
+                self.search_indexes = {}
+            signature = self.collection_signature(collection)
+            index = self.search_indexes.get(collection)
+            if index is None or index.signature != signature:
+                index = SearchIndex(self.load(collection), COLLECTIONS[collection], signature)
+                self.search_indexes[collection] = index
+            return index
+
+    def search(self, collection, query):
+        """Keys of the records matching a search query, None when the query is empty"""
+        with self.lock:
+            return self.search_index(collection).search(query)
+
+    def track(self, collection, operation):
+        """Keep the received ledger and search indexes current after a successful mutation"""
+        if self.batching:
+            return
+        if operation is not None:
+            with self.lock:
+                if collection == 'lpo' and self.ledger is not None:
+                    self.ledger.apply(operation)
+                    self.ledger.signature = self.ledger_signature()
+                if collection == 'lpo' and self.performance is not None:
+                    self.performance.apply(collection, operation)
+                    self.performance.signature = self.collection_signature('lpo')
+                if collection in LPO_COLLECTIONS and self.rollup is not None:
+                    self.rollup.apply(collection, operation)
+                    self.rollup.signature = self.rollup_signature()
+                if collection == TRENDS and self.prices is not None:
+                    self.prices.apply(operation)
+                    self.prices.signature = self.collection_signature(TRENDS)
+                index = (self.search_indexes or {}).get(collection)
+                if index is not None:
+                    index.apply(operation)
+                    index.signature = self.collection_signature(collection)
+        self.announce(collection, operation)
+
+    def announce(self, collection, operation):
+        """Publish the change on the event bus (a batch is one change)"""
+        op = operation['op'] if operation else None
+        parts = operation['operations'] if op == 'batch' else [operation]
+        key = operation_key(collection, operation) if op != 'batch' else None
+        event_bus.publish(DATA_CHANGED, department=self.department_name, collection=collection,
+                          operation=op, key=key)
+        for part in parts:
+            topic = OPERATION_EVENTS.get((collection, part['op'] if part else None))
+            if topic is not None:
+                event_bus.publish(topic, department=self.department_name, collection=collection,
+                                  key=operation_key(collection, part))
+
+    def batch(self, collection, operations):
+        """Apply several mutations of one collection in one transaction, tracked and
+        announced as a single 'batch' change"""
+        operations = list(operations)
+        if not operations:
+            return
+        with self.transaction():
+            self.batching = True
+            try:
+                for operation in operations:
+                    self.perform(collection, operation)
+            finally:
+                self.batching = False
+        self.track(collection, {'op': 'batch', 'operations': operations})
+
+    def record_prices(self, prices):
+        """Append many prices [(resource_code, item_description, unit, price)] as one write"""
+        operations = [{'op': 'record_price', 'resource_code': resource_code,
+                       'item_description': item_description, 'unit': unit,
+                       'entry': new_price_entry(price, unit)}
+                      for resource_code, item_description, unit, price in prices]
+        self.batch(TRENDS, operations)
+        return len(operations)
+
+    def perform(self, collection, operation):
+        """Run one recorded mutation through this backend's own methods"""
+        op = operation['op']
+        if op == 'save':
+            self.save(collection, operation['records'])
+        elif op == 'insert':
+            self.insert(collection, operation['record'])
+        elif op == 'update':
+            self.update(collection, operation['record'])
+        elif op == 'update_fields':
+            self.update_fields(collection, operation['key'], operation['fields'])
+        elif op == 'delete':
+            self.delete(collection, operation['key'])
+        elif op == 'add_delivery':
+            self.add_delivery(operation['key'], operation['delivery'], collection)
+        elif op == 'update_delivery':
+            self.update_delivery(operation['key'], operation['index'], operation['delivery'], collection)
+        elif op == 'delete_delivery':
+            self.delete_delivery(operation['key'], operation['index'], collection)
+        elif op == 'record_price':
+            self.record_price(operation['resource_code'], operation['item_description'],
+                              operation['unit'], operation['entry']['price'])
+
+    def watched_files(self):
+        """(path, collection) pairs whose external edits should be reported"""
+        return []
+
+
+def find_trend(trends_data, resource_code, item_description):
+    """Find the trend entry for an item (case-insensitive match)"""
+    code = (resource_code or '').lower()
+    desc = (item_description or '').lower()
+    for item_key, trend in trends_data.items():
+        if (trend.get('resource_code', '').lower() == code and
+            trend.get('item_description', '').lower() == desc):
+            return item_key, trend
+    return None, None
+
+
+def operation_key(collection, operation):
+    """Key of the record a mutation touches, if it names one"""
+    if not operation:
+        return None
+    if 'key' in operation:
+        return operation['key']
+    if 'record' in operation:
+        return operation['record'].get(COLLECTIONS.get(collection))
+    return None
+
+
+def new_price_entry(price, unit=''):
+    """Build a price history entry"""
+    return {
+        'price': float(price),
+        'unit': unit,
+        'date': datetime.now().strftime('%d/%m/%Y')
+    }
+
+
+def add_prices(data, operations):
+    """Append record_price entries to the trends, looking each item up in one pass"""
+    trend_keys = {}
+    for item_key, trend in data.items():
+        trend_keys.setdefault(price_key(trend.get('resource_code'), trend.get('item_description')), item_key)
+    for operation in operations:
+        key = price_key(operation['resource_code'], operation['item_description'])
+        item_key = trend_keys.get(key)
+        if item_key is None:
+            item_key = f"{operation['resource_code']}_{operation['item_description']}"
+            data[item_key] = {
+                'resource_code': operation['resource_code'],
+                'item_description': operation['item_description'],
+                'unit': operation['unit'],
+                'price_history': []
+            }
+            trend_keys[key] = item_key
+        data[item_key].setdefault('price_history', []).append(operation['entry'])
+    return data
+
+
+def apply_operation(data, collection, operation):
+    """Apply one recorded mutation to a parsed collection document"""
+    op = operation['op']
+    if op == 'save':
+        return operation['records']
+
+    if op == 'batch':
+        parts = operation['operations']
+        if collection == TRENDS and all(part['op'] == 'record_price' for part in parts):
+            return add_prices(data, parts)
+        for part in parts:
+            data = apply_operation(data, collection, part)
+        return data
+
+    if op == 'record_price':
+        return add_prices(data, [operation])
+
+    key_field = COLLECTIONS[collection]
+    if op == 'insert':
+        data.append(operation['record'])
+    elif op == 'update':
+        record = operation['record']
+        for i, existing in enumerate(data):
+            if existing.get(key_field) == record.get(key_field):
+                data[i] = record
+                break
+        else:
+            data.append(record)
+    elif op == 'delete':
+        data = [r for r in data if r.get(key_field) != operation['key']]
+    else:
+        record = find_record(data, collection, operation['key'])
+        if record is None:
+            return data
+        deliveries = record.get('deliveries', [])
+        if op == 'update_fields':
+            record.update(operation['fields'])
+        elif op == 'add_delivery':
+            record.setdefault('deliveries', []).append(operation['delivery'])
+        elif op == 'update_delivery' and operation['index'] < len(deliveries):
+            deliveries[operation['index']] = operation['delivery']
+        elif op == 'delete_delivery' and operation['index'] < len(deliveries):
+            del deliveries[operation['index']]
+    return data
+
+
+class JsonStorage(StorageBase):
+    """Legacy storage: one JSON document per collection, rewritten on every change"""
+
+    def __init__(self, department_name, settings=None):
+        self.department_name = department_name
+        self.settings = settings or load_settings()
+        self.backups = int(self.settings.get('backups', DEFAULT_BACKUPS))
+        self.format = self.settings.get('format', DEFAULT_FORMAT)
+        self.lock = threading.RLock()
+
+    def path(self, collection):
+        return collection_file(collection, self.department_name)
+
+    def exists(self, collection):
+        return os.path.exists(self.path(collection))
+
+    def read_document(self, collection):
+        """Parse a collection file (from its backup if a crash left it unreadable)"""
+        empty = {} if collection == TRENDS else []
+        return load_data(self.path(collection), empty, self.backups)
+
+    def write_document(self, collection, data):
+        """Serialize a collection file atomically, keeping the previous versions as backups"""
+        path = self.path(collection)
+        save_data(path, data, self.backups, self.format)
+        document_cache.put(('json', os.path.abspath(path)), file_signature(path), data)
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def load(self, collection):
+        """Load all records of a collection (parsed once, until the file changes)"""
+        path = self.path(collection)
+        return document_cache.get(('json', os.path.abspath(path)), file_signature(path),
+                                  lambda: self.read_document(collection))
+
+    def collection_signature(self, collection):
+        return file_signature(self.path(collection))
+
+    def watched_files(self):
+        return [(self.path(collection), collection) for collection in list(COLLECTIONS) + [TRENDS]]
+
+    def apply(self, collection, operation):
+        """Apply a mutation by rewriting the whole collection file"""
+        with self.lock:
+            data = self.read_document(collection)
+            self.write_document(collection, apply_operation(data, collection, operation))
+            self.track(collection, operation)
+
+    def save(self, collection, records):
+        """Replace all records of a collection"""
+        self.apply(collection, {'op': 'save', 'records': records})
+
+    def batch(self, collection, operations):
+        """Apply several mutations with one rewrite (one journal line for JournalStorage)"""
+        operations = list(operations)
+        if operations:
+            self.apply(collection, {'op': 'batch', 'operations': operations})
+
+    def insert(self, collection, record):
+        self.apply(collection, {'op': 'insert', 'record': record})
+
+    def update(self, collection, record):
+        self.apply(collection, {'op': 'update', 'record': record})
+
+    def update_fields(self, collection, key, fields):
+        self.apply(collection, {'op': 'update_fields', 'key': key, 'fields': fields})
+
+    def delete(self, collection, key):
+        self.apply(collection, {'op': 'delete', 'key': key})
+
+    def add_delivery(self, lpo_number, delivery, collection='lpo'):
+        self.apply(collection, {'op': 'add_delivery', 'key': lpo_number, 'delivery': delivery})
+
+    def update_delivery(self, lpo_number, index, delivery, collection='lpo'):
+        self.apply(collection, {'op': 'update_delivery', 'key': lpo_number,
+                                'index': index, 'delivery': delivery})
+
+    def delete_delivery(self, lpo_number, index, collection='lpo'):
+        self.apply(collection, {'op': 'delete_delivery', 'key': lpo_number, 'index': index})
+
+    def load_trends(self):
+        """Load price trends keyed by item"""
+        return self.load(TRENDS)
+
+    def record_price(self, resource_code, item_description, unit, price):
+        """Append a price to an item's history"""
+        self.apply(TRENDS, {'op': 'record_price', 'resource_code': resource_code,
+                            'item_description': item_description, 'unit': unit,
+                            'entry': new_price_entry(price, unit)})
+        return True
+
+
+class JournalStorage(JsonStorage):
+    """JSON snapshots plus an append-only per-department log of mutations.
+
+    Every change is appended as one line to the journal, so a write costs the size
+    of the change. Loads replay the journal tail over the snapshot, and a background
+    thread folds the journal into the snapshots once it grows past
+    journal_compact_bytes.
+    """
+
+    def __init__(self, department_name, settings=None):
+        super().__init__(department_name, settings)
+        self.journal_path = f"journal_{department_slug(department_name)}.log"
+        # Compaction: the journal is renamed to a sealed segment, folded into staged
+        # snapshots, and committed by writing the manifest (see compact)
+        self.sealed_path = f"{self.journal_path}.sealed"
+        self.manifest_path = f"{self.journal_path}.manifest"
+        self.compact_bytes = int(self.settings.get('journal_compact_bytes', DEFAULT_COMPACT_BYTES))
+        self.compactor = None
+        # One compaction at a time; its fold runs without self.lock
+        self.compacting = threading.Lock()
+        # (signature of sealed segment + journal, collections with entries in them)
+        self.logged = None
+        self.recover()
+        self.maybe_compact()
+
+    def read_journal(self, path=None):
+        """Parse the journal (or a sealed segment); a torn last line from a crash is skipped"""
+        path = path or self.journal_path
+        entries = []
+        if not os.path.exists(path):
+            return entries
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    print(f"Skipping unreadable journal entry in {path}")
+        return entries
+
+    def pending_entries(self):
+        """Entries not yet in the snapshots: the sealed segment, then the journal"""
+        self.recover()
+        return self.read_journal(self.sealed_path) + self.read_journal()
+
+    def log_signature(self):
+        return file_signature(self.sealed_path, self.journal_path)
+
+    def logged_collections(self):
+        """Collections with entries in the sealed segment or journal. Parsed once, then kept
+        current by this storage's own appends and compactions; parsed again after an
+        outside change to those files."""
+        with self.lock:
+            self.recover()
+            if self.logged is None or self.logged[0] != self.log_signature():
+                collections = {entry.get('collection') for entry in self.pending_entries()}
+                self.logged = (self.log_signature(), collections)
+            return self.logged[1]
+
+    def keep_logged(self, signature, collection=None):
+        """Carry the logged collections over a change of ours to the log files (made when
+        they had signature)"""
+        if self.logged is not None and self.logged[0] == signature:
+            collections = (self.logged[1] | {collection}) if collection else self.logged[1]
+            self.logged = (self.log_signature(), collections)
+
+    def exists(self, collection):
+        if os.path.exists(self.path(collection)):
+            return True
+        return collection in self.logged_collections()
+
+    def replay(self, collection):
+        """Snapshot of a collection with the journal applied"""
+        with self.lock:
+            entries = self.pending_entries()
+            data = self.read_document(collection)
+            for entry in entries:
+                if entry.get('collection') == collection:
+                    data = apply_operation(data, collection, entry)
+            return data
+
+    def load(self, collection):
+        return document_cache.get(('journal', os.path.abspath(self.journal_path), collection),
+                                  self.collection_signature(collection),
+                                  lambda: self.replay(collection))
+
+    def apply(self, collection, operation):
+        """Append a mutation to the journal"""
+        entry = dict(operation, collection=collection)
+        with self.lock:
+            self.recover()
+            signature = self.log_signature()
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.keep_logged(signature, collection)
+            self.track(collection, operation)
+        self.maybe_compact()
+
+    def collection_signature(self, collection):
+        return file_signature(self.path(collection), self.sealed_path, self.journal_path)
+
+    def watched_files(self):
+        return super().watched_files() + [(self.sealed_path, None), (self.journal_path, None)]
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def maybe_compact(self):
+        """Start a background compaction once the journal is over the size limit (or an
+        earlier compaction was interrupted)"""
+        if self.journal_size() < self.compact_bytes and not os.path.exists(self.sealed_path):
+            return
+        if self.compacting.locked():
+            # The running compaction has the sealed segment; the journal waits for the next one
+            return
+        with self.lock:
+            if self.compactor is not None and self.compactor.is_alive():
+                return
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+
+    def staged_path(self, collection):
+        return f"{self.path(collection)}.compact"
+
+    def compact(self):
+        """Fold the journal into the collection snapshots.
+
+        The journal is sealed under self.lock, which is then released while the sealed
+        segment is folded, so appends are not held up. The snapshots are only replaced
+        after the folded ones are all on disk and the manifest naming them is written,
+        and the sealed segment is deleted after that. A crash at any step leaves either
+        the old snapshots with the whole segment still to replay, or a manifest that
+        recover() finishes, so no entry is applied twice or lost.
+        """
+        with self.compacting:
+            try:
+                with self.lock:
+                    self.recover()
+                    # A segment left by an interrupted compaction is folded first, on its own
+                    if not os.path.exists(self.sealed_path):
+                        if not self.journal_size():
+                            return
+                        signature = self.log_signature()
+                        os.replace(self.journal_path, self.sealed_path)
+                        fsync_directory(os.path.dirname(os.path.abspath(self.sealed_path)))
+                        self.keep_logged(signature)
+
+                # Only recover() replaces the snapshots, and it runs on this thread
+                entries = self.read_journal(self.sealed_path)
+                for collection in list(COLLECTIONS) + [TRENDS]:
+                    # Left by a compaction that stopped before its commit
+                    if os.path.exists(self.staged_path(collection)):
+                        os.remove(self.staged_path(collection))
+                touched = []
+                for entry in entries:
+                    if entry.get('collection') not in touched:
+                        touched.append(entry.get('collection'))
+                for collection in touched:
+                    data = self.read_document(collection)
+                    for entry in entries:
+                        if entry.get('collection') == collection:
+                            data = apply_operation(data, collection, entry)
+                    save_data(self.staged_path(collection), data, 0, self.format)
+
+                with self.lock:
+                    save_data(self.manifest_path, touched, 0)
+                    self.recover()
+            except Exception as e:
+                print(f"Error compacting journal {self.journal_path}: {e}")
+
+    def recover(self):
+        """Finish a compaction whose manifest was written: move its staged snapshots into
+        place, then drop the sealed segment and the manifest. Each step can be repeated."""
+        with self.lock:
+            if not os.path.exists(self.manifest_path):
+                return
+            signature = self.log_signature()
+            for collection in load_data(self.manifest_path, [], 0):
+                staged = self.staged_path(collection)
+                if os.path.exists(staged):
+                    rotate_backups(self.path(collection), self.backups)
+                    os.replace(staged, self.path(collection))
+            directory = os.path.dirname(os.path.abspath(self.manifest_path))
+            fsync_directory(directory)
+            if os.path.exists(self.sealed_path):
+                os.remove(self.sealed_path)
+                fsync_directory(directory)
+            os.remove(self.manifest_path)
+            fsync_directory(directory)
+            # The folded collections are now in their snapshots, so they still exist
+            self.keep_logged(signature)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prs (
+    id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    pr_number TEXT,
+    status TEXT,
+    request_date TEXT,
+    has_items INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prs_key ON prs(department, collection, pr_number);
+
+CREATE TABLE IF NOT EXISTS lpos (
+    id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    lpo_number TEXT,
+    pr_number TEXT,
+    supplier_name TEXT,
+    approval_date TEXT,
+    has_items INTEGER NOT NULL DEFAULT 0,
+    has_deliveries INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lpos_key ON lpos(department, collection, lpo_number);
+CREATE INDEX IF NOT EXISTS idx_lpos_pr ON lpos(department, collection, pr_number);
+CREATE INDEX IF NOT EXISTS idx_lpos_supplier ON lpos(department, supplier_name);
+
+CREATE TABLE IF NOT EXISTS line_items (
+    id INTEGER PRIMARY KEY,
+    pr_id INTEGER REFERENCES prs(id) ON DELETE CASCADE,
+    lpo_id INTEGER REFERENCES lpos(id) ON DELETE CASCADE,
+    resource_code TEXT,
+    item_description TEXT,
+    unit TEXT,
+    quantity REAL,
+    unit_price REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_line_items_pr ON line_items(pr_id);
+CREATE INDEX IF NOT EXISTS idx_line_items_lpo ON line_items(lpo_id);
+CREATE INDEX IF NOT EXISTS idx_line_items_code ON line_items(resource_code);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY,
+    lpo_id INTEGER NOT NULL REFERENCES lpos(id) ON DELETE CASCADE,
+    delivery_date TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_lpo ON deliveries(lpo_id);
+
+CREATE TABLE IF NOT EXISTS trend_items (
+    id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    code_norm TEXT NOT NULL,
+    description_norm TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    UNIQUE(department, item_key)
+);
+CREATE INDEX IF NOT EXISTS idx_trend_items_item ON trend_items(department, code_norm, description_norm);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    trend_id INTEGER NOT NULL REFERENCES trend_items(id) ON DELETE CASCADE,
+    price REAL,
+    recorded_on TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_trend ON price_history(trend_id);
+
+CREATE TABLE IF NOT EXISTS collections (
+    department TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    PRIMARY KEY (department, collection)
+);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    department TEXT PRIMARY KEY,
+    migrated_on TEXT NOT NULL
+);
+"""
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class SQLiteDatabase:
+    """Shared connection to the SQLite database file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.versions = {}
+        self.rollbacks = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Nestable transaction; only the outermost level commits"""
+        with self.lock:
+            if self.depth == 0:
+                self.conn.execute('BEGIN IMMEDIATE')
+            self.depth += 1
+            try:
+                yield self.conn
+            except Exception:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute('ROLLBACK')
+                    self.rollbacks += 1
+                raise
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute('COMMIT')
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def changed(self, department_name, collection):
+        """Record a write so cached loads of the collection are refreshed"""
+        with self.lock:
+            key = (department_name, collection)
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+    def signature(self, department_name, collection):
+        """Changes on the collection from this connection, other processes and rollbacks"""
+        with self.lock:
+            data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            return (data_version, self.rollbacks, self.versions.get((department_name, collection), 0))
+
+
+class SQLiteStorage(StorageBase):
+    """Indexed SQLite storage; every mutation touches only the affected rows"""
+
+    def __init__(self, department_name, database, settings=None, auto_migrate=True):
+        self.department_name = department_name
+        self.db = database
+        self.settings = settings or load_settings()
+        self.lock = threading.RLock()
+        if auto_migrate:
+            self.ensure_migrated()
+
+    def ensure_migrated(self):
+        """Import the legacy JSON files the first time a department is opened"""
+        rows = self.db.query('SELECT 1 FROM migrations WHERE department = ?', (self.department_name,))
+        if not rows:
+            migrate_department(self)
+
+    @contextmanager
+    def transaction(self):
+        with self.db.transaction():
+            yield self
+
+    @contextmanager
+    def write(self, collection, operation=None):
+        """Transaction for a change to one collection"""
+        try:
+            with self.db.transaction() as conn:
+                yield conn
+            self.track(collection, operation)
+        finally:
+            self.db.changed(self.department_name, collection)
+
+    def cached(self, collection, loader):
+        return document_cache.get(('sqlite', os.path.abspath(self.db.path), self.department_name, collection),
+                                  self.db.signature(self.department_name, collection), loader)
+
+    def table(self, collection):
+        return 'lpos' if collection in LPO_COLLECTIONS else 'prs'
+
+    def key_column(self, collection):
+        return 'lpo_number' if collection in LPO_COLLECTIONS else 'pr_number'
+
+    def mark_collection(self, conn, collection):
+        conn.execute('INSERT OR IGNORE INTO collections (department, collection) VALUES (?, ?)',
+                     (self.department_name, collection))
+
+    def exists(self, collection):
+        rows = self.db.query('SELECT 1 FROM collections WHERE department = ? AND collection = ?',
+                             (self.department_name, collection))
+        return bool(rows)
+
+    def row_id(self, conn, collection, key):
+        table = self.table(collection)
+        row = conn.execute(f"SELECT id FROM {table} WHERE department = ? AND collection = ? "
+                           f"AND {self.key_column(collection)} = ? ORDER BY id LIMIT 1",
+                           (self.department_name, collection, key)).fetchone()
+        return row['id'] if row else None
+
+    # Reads
+
+    def load(self, collection):
+        """Load all records of a collection (cached until it changes)"""
+        return self.cached(collection, lambda: self.read_collection(collection))
+
+    def collection_signature(self, collection):
+        with self.db.lock:
+            data_version = self.db.conn.execute('PRAGMA data_version').fetchone()[0]
+            return (data_version, self.db.rollbacks)
+
+    def watched_files(self):
+        return [(self.db.path, None), (self.db.path + '-wal', None)]
+
+    def read_collection(self, collection):
+        """Build the records of a collection in insertion order"""
+        table = self.table(collection)
+        owner = 'lpo_id' if table == 'lpos' else 'pr_id'
+        with self.db.lock:
+            rows = self.db.conn.execute(
+                f"SELECT * FROM {table} WHERE department = ? AND collection = ? ORDER BY id",
+                (self.department_name, collection)).fetchall()
+            ids = [row['id'] for row in rows]
+            items = self.children('line_items', owner, ids)
+            deliveries = self.children('deliveries', 'lpo_id', ids) if table == 'lpos' else {}
+
+        records = []
+        for row in rows:
+            record = json.loads(row['doc'])
+            if row['has_items']:
+                record['items'] = items.get(row['id'], [])
+            if table == 'lpos' and row['has_deliveries']:
+                record['deliveries'] = deliveries.get(row['id'], [])
+            records.append(record)
+        return records
+
+    def children(self, table, owner_column, owner_ids):
+        """Fetch child documents grouped by owner id"""
+        grouped = {}
+        if not owner_ids:
+            return grouped
+        # Chunk to stay below SQLite's host parameter limit
+        for start in range(0, len(owner_ids), 500):
+            chunk = owner_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.conn.execute(
+                f"SELECT {owner_column} AS owner, doc FROM {table} "
+                f"WHERE {owner_column} IN ({placeholders}) ORDER BY id", chunk).fetchall()
+            for row in rows:
+                grouped.setdefault(row['owner'], []).append(json.loads(row['doc']))
+        return grouped
+
+    # Writes
+
+    def split_record(self, collection, record):
+        """Separate line items and deliveries from the record document"""
+        doc = dict(record)
+        items = doc.get('items')
+        has_items = isinstance(items, list) and all(isinstance(i, dict) for i in items)
+        if has_items:
+            doc.pop('items')
+        else:
+            items = []
+        deliveries = doc.get('deliveries') if collection in LPO_COLLECTIONS else None
+        has_deliveries = isinstance(deliveries, list)
+        if has_deliveries:
+            doc.pop('deliveries')
+        else:
+            deliveries = []
+        return doc, has_items, items, has_deliveries, deliveries
+
+    def write_children(self, conn, collection, row_id, items, deliveries):
+        owner = 'lpo_id' if collection in LPO_COLLECTIONS else 'pr_id'
+        conn.executemany(
+            f"INSERT INTO line_items ({owner}, resource_code, item_description, unit, quantity, unit_price, doc) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(row_id, item.get('resource_code'), item.get('item_description'), item.get('unit'),
+              to_float(item.get('quantity')), to_float(item.get('unit_price')), dumps(item))
+             for item in items])
+        if deliveries:
+            conn.executemany(
+                'INSERT INTO deliveries (lpo_id, delivery_date, doc) VALUES (?, ?, ?)',
+                [(row_id, d.get('date'), dumps(d)) for d in deliveries])
+
+    def insert_row(self, conn, collection, record):
+        doc, has_items, items, has_deliveries, deliveries = self.split_record(collection, record)
+        if collection in LPO_COLLECTIONS:
+            cursor = conn.execute(
+                'INSERT INTO lpos (department, collection, lpo_number, pr_number, supplier_name, '
+                'approval_date, has_items, has_deliveries, doc) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.department_name, collection, doc.get('lpo_number'), doc.get('pr_number'),
+                 doc.get('supplier_name'), doc.get('approval_date'), int(has_items),
+                 int(has_deliveries), dumps(doc)))
+        else:
+            cursor = conn.execute(
+                'INSERT INTO prs (department, collection, pr_number, status, request_date, has_items, doc) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self.department_name, collection, doc.get(COLLECTIONS[collection]),
+                 doc.get('status'), doc.get('request_date', doc.get('date_submitted')),
+                 int(has_items), dumps(doc)))
+        self.write_children(conn, collection, cursor.lastrowid, items, deliveries)
+
+    def write_doc(self, conn, collection, row_id, doc):
+        if collection in LPO_COLLECTIONS:
+            conn.execute('UPDATE lpos SET lpo_number = ?, pr_number = ?, supplier_name = ?, '
+                         'approval_date = ?, doc = ? WHERE id = ?',
+                         (doc.get('lpo_number'), doc.get('pr_number'), doc.get('supplier_name'),
+                          doc.get('approval_date'), dumps(doc), row_id))
+        else:
+            conn.execute('UPDATE prs SET pr_number = ?, status = ?, request_date = ?, doc = ? WHERE id = ?',
+                         (doc.get(COLLECTIONS[collection]), doc.get('status'),
+                          doc.get('request_date', doc.get('date_submitted')), dumps(doc), row_id))
+
+    def save(self, collection, records):
+        """Replace all records of a collection"""
+        table = self.table(collection)
+        with self.write(collection, {'op': 'save', 'records': records}) as conn:
+            conn.execute(f"DELETE FROM {table} WHERE department = ? AND collection = ?",
+                         (self.department_name, collection))
+            for record in records:
+                self.insert_row(conn, collection, record)
+            self.mark_collection(conn, collection)
+
+    def insert(self, collection, record):
+        with self.write(collection, {'op': 'insert', 'record': record}) as conn:
+            self.insert_row(conn, collection, record)
+            self.mark_collection(conn, collection)
+
+    def update(self, collection, record):
+        """Rewrite one record with its line items and deliveries"""
+        with self.write(collection, {'op': 'update', 'record': record}) as conn:
+            row_id = self.row_id(conn, collection, record.get(COLLECTIONS[collection]))
+            if row_id is None:
+                self.insert_row(conn, collection, record)
+                return
+            doc, has_items, items, has_deliveries, deliveries = self.split_record(collection, record)
+            self.write_doc(conn, collection, row_id, doc)
+            owner = 'lpo_id' if collection in LPO_COLLECTIONS else 'pr_id'
+            conn.execute(f"DELETE FROM line_items WHERE {owner} = ?", (row_id,))
+            conn.execute(f"UPDATE {self.table(collection)} SET has_items = ? WHERE id = ?",
+                         (int(has_items), row_id))
+            if collection in LPO_COLLECTIONS:
+                conn.execute('DELETE FROM deliveries WHERE lpo_id = ?', (row_id,))
+                conn.execute('UPDATE lpos SET has_deliveries = ? WHERE id = ?',
+                             (int(has_deliveries), row_id))
+            self.write_children(conn, collection, row_id, items, deliveries)
+
+    def update_fields(self, collection, key, fields):
+        """Update top-level fields of one record without touching its children"""
+        table = self.table(collection)
+        children = ('items', 'deliveries')
+        operation = {'op': 'update_fields', 'key': key,
+                     'fields': {k: v for k, v in fields.items() if k not in children}}
+        with self.write(collection, operation) as conn:
+            row_id = self.row_id(conn, collection, key)
+            if row_id is None:
+                return
+            row = conn.execute(f"SELECT doc FROM {table} WHERE id = ?", (row_id,)).fetchone()
+            doc = json.loads(row['doc'])
+            doc.update(operation['fields'])
+            self.write_doc(conn, collection, row_id, doc)
+
+    def delete(self, collection, key):
+        table = self.table(collection)
+        with self.write(collection, {'op': 'delete', 'key': key}) as conn:
+            conn.execute(f"DELETE FROM {table} WHERE department = ? AND collection = ? "
+                         f"AND {self.key_column(collection)} = ?",
+                         (self.department_name, collection, key))
+
+    def delivery_ids(self, conn, lpo_id):
+        return [row['id'] for row in conn.execute(
+            'SELECT id FROM deliveries WHERE lpo_id = ? ORDER BY id', (lpo_id,))]
+
+    def add_delivery(self, lpo_number, delivery, collection='lpo'):
+        with self.write(collection, {'op': 'add_delivery', 'key': lpo_number, 'delivery': delivery}) as conn:
+            lpo_id = self.row_id(conn, collection, lpo_number)
+            if lpo_id is None:
+                return
+            conn.execute('INSERT INTO deliveries (lpo_id, delivery_date, doc) VALUES (?, ?, ?)',
+                         (lpo_id, delivery.get('date'), dumps(delivery)))
+            conn.execute('UPDATE lpos SET has_deliveries = 1 WHERE id = ?', (lpo_id,))
+
+    def update_delivery(self, lpo_number, index, delivery, collection='lpo'):
+        operation = {'op': 'update_delivery', 'key': lpo_number, 'index': index, 'delivery': delivery}
+        with self.write(collection, operation) as conn:
+            lpo_id = self.row_id(conn, collection, lpo_number)
+            if lpo_id is None:
+                return
+            ids = self.delivery_ids(conn, lpo_id)
+            if index < len(ids):
+                conn.execute('UPDATE deliveries SET delivery_date = ?, doc = ? WHERE id = ?',
+                             (delivery.get('date'), dumps(delivery), ids[index]))
+
+    def delete_delivery(self, lpo_number, index, collection='lpo'):
+        with self.write(collection, {'op': 'delete_delivery', 'key': lpo_number, 'index': index}) as conn:
+            lpo_id = self.row_id(conn, collection, lpo_number)
+            if lpo_id is None:
+                return
+            ids = self.delivery_ids(conn, lpo_id)
+            if index < len(ids):
+                conn.execute('DELETE FROM deliveries WHERE id = ?', (ids[index],))
+
+    # Price trends
+
+    def load_trends(self):
+        """Load price trends keyed by item (cached until they change)"""
+        return self.cached(TRENDS, self.read_trends)
+
+    def read_trends(self):
+        with self.db.lock:
+            rows = self.db.conn.execute(
+                'SELECT id, item_key, doc FROM trend_items WHERE department = ? ORDER BY id',
+                (self.department_name,)).fetchall()
+            history = self.children('price_history', 'trend_id', [row['id'] for row in rows])
+        trends_data = {}
+        for row in rows:
+            trend = json.loads(row['doc'])
+            trend['price_history'] = history.get(row['id'], [])
+            trends_data[row['item_key']] = trend
+        return trends_data
+
+    def trend_id(self, conn, resource_code, item_description, unit='', create=True):
+        code_norm = (resource_code or '').lower()
+        desc_norm = (item_description or '').lower()
+        row = conn.execute('SELECT id FROM trend_items WHERE department = ? AND code_norm = ? '
+                           'AND description_norm = ? ORDER BY id LIMIT 1',
+                           (self.department_name, code_norm, desc_norm)).fetchone()
+        if row:
+            return row['id']
+        if not create:
+            return None
+        doc = {'resource_code': resource_code, 'item_description': item_description, 'unit': unit}
+        cursor = conn.execute('INSERT INTO trend_items (department, item_key, code_norm, '
+                              'description_norm, doc) VALUES (?, ?, ?, ?, ?)',
+                              (self.department_name, f"{resource_code}_{item_description}",
+                               code_norm, desc_norm, dumps(doc)))
+        return cursor.lastrowid
+
+    def insert_trend(self, conn, item_key, trend):
+        doc = {k: v for k, v in trend.items() if k != 'price_history'}
+        cursor = conn.execute('INSERT OR REPLACE INTO trend_items (department, item_key, code_norm, '
+                              'description_norm, doc) VALUES (?, ?, ?, ?, ?)',
+                              (self.department_name, item_key,
+                               (trend.get('resource_code') or '').lower(),
+                               (trend.get('item_description') or '').lower(), dumps(doc)))
+        conn.executemany('INSERT INTO price_history (trend_id, price, recorded_on, doc) VALUES (?, ?, ?, ?)',
+                         [(cursor.lastrowid, to_float(entry.get('price')), entry.get('date'), dumps(entry))
+                          for entry in trend.get('price_history', [])])
+
+    def record_price(self, resource_code, item_description, unit, price):
+        """Append a price to an item's history"""
+        entry = new_price_entry(price, unit)
+        operation = {'op': 'record_price', 'resource_code': resource_code,
+                     'item_description': item_description, 'unit': unit, 'entry': entry}
+        with self.write(TRENDS, operation) as conn:
+            trend_id = self.trend_id(conn, resource_code, item_description, unit)
+            conn.execute('INSERT INTO price_history (trend_id, price, recorded_on, doc) VALUES (?, ?, ?, ?)',
+                         (trend_id, entry['price'], entry['date'], dumps(entry)))
+        return True
+
+
+def migrate_department(storage, overwrite=False):
+    """Import a department's legacy JSON files into the SQLite database"""
+    legacy = JsonStorage(storage.department_name, storage.settings)
+    counts = {}
+    with storage.db.transaction() as conn:
+        for collection in COLLECTIONS:
+            if not legacy.exists(collection):
+                continue
+            try:
+                records = legacy.load(collection)
+            except Exception as e:
+                print(f"Error reading {legacy.path(collection)} for migration: {e}")
+                continue
+            if overwrite:
+                conn.execute(f"DELETE FROM {storage.table(collection)} WHERE department = ? AND collection = ?",
+                             (storage.department_name, collection))
+            for record in records:
+                storage.insert_row(conn, collection, record)
+            storage.mark_collection(conn, collection)
+            storage.db.changed(storage.department_name, collection)
+            counts[collection] = len(records)
+
+        if legacy.exists(TRENDS):
+            try:
+                trends_data = legacy.load_trends()
+            except Exception as e:
+                print(f"Error reading {legacy.path(TRENDS)} for migration: {e}")
+                trends_data = {}
+            if overwrite:
+                conn.execute('DELETE FROM trend_items WHERE department = ?', (storage.department_name,))
+            for item_key, trend in trends_data.items():
+                storage.insert_trend(conn, item_key, trend)
+            storage.db.changed(storage.department_name, TRENDS)
+            counts[TRENDS] = len(trends_data)
+
+        conn.execute('INSERT OR REPLACE INTO migrations (department, migrated_on) VALUES (?, ?)',
+                     (storage.department_name, datetime.now().strftime('%d/%m/%Y %H:%M')))
+
+    if counts:
+        print(f"Migrated {storage.department_name} JSON data into SQLite: {counts}")
+    return counts
+
+
+_databases = {}
+_storages = {}
+_registry_lock = threading.Lock()
+
+
+def get_database(path):
+    """Shared SQLite connection per database file"""
+    with _registry_lock:
+        if path not in _databases:
+            _databases[path] = SQLiteDatabase(path)
+        return _databases[path]
+
+
+def get_storage(department_name):
+    """Return the shared storage object for a department"""
+    with _registry_lock:
+        storage = _storages.get(department_name)
+    if storage is not None:
+        return storage
+
+    settings = load_settings()
+    if settings.get('backend') == 'json':
+        storage = JsonStorage(department_name, settings)
+    elif settings.get('backend') == 'journal':
+        storage = JournalStorage(department_name, settings)
+    else:
+        storage = SQLiteStorage(department_name, get_database(settings['database']), settings)
+
+    with _registry_lock:
+        if department_name in _storages:
+            return _storages[department_name]
+        _storages[department_name] = storage
+
+    # Optionally report edits made by other programs (Linux inotify)
+    if settings.get('watch_files'):
+        for path, collection in storage.watched_files():
+            file_watcher.watch(path, department_name, collection)
+    return storage
+
+
+def legacy_departments():
+    """Departments that have legacy JSON files in the working directory"""
+    slugs = set()
+    prefixes = list(COLLECTIONS) + [TRENDS]
+    for filename in os.listdir('.'):
+        if not filename.endswith('.json'):
+            continue
+        for prefix in sorted(prefixes, key=len, reverse=True):
+            if filename.startswith(prefix + '_'):
+                slugs.add(filename[len(prefix) + 1:-5])
+                break
+    return sorted(slug.replace('_', ' ').title() for slug in slugs)
+
+
+def stored_departments(settings):
+    """Departments that have data in the configured backend"""
+    if settings.get('backend') in ('json', 'journal'):
+        return legacy_departments()
+    rows = get_database(settings['database']).query(
+        'SELECT department FROM collections UNION SELECT department FROM trend_items')
+    return sorted(row['department'] for row in rows)
+
+
+def export(department_names=None, directory='export'):
+    """Write every collection of the departments as indented JSON files into directory.
+
+    The files are named like the legacy JSON files, so an export can be read back
+    with the JSON backend or imported with migrate.
+    """
+    settings = load_settings()
+    os.makedirs(directory, exist_ok=True)
+    for department_name in department_names or stored_departments(settings):
+        storage = get_storage(department_name)
+        for collection in list(COLLECTIONS) + [TRENDS]:
+            if collection != TRENDS and not storage.exists(collection):
+                continue
+            data = storage.load_trends() if collection == TRENDS else storage.load(collection)
+            path = os.path.join(directory, collection_file(collection, department_name))
+            save_data(path, data, backups=0, format=PRETTY)
+        print(f"Exported {department_name} to {os.path.abspath(directory)}")
+
+
+def migrate(department_names=None, overwrite=True):
+    """One-shot migration of legacy JSON files into the configured database"""
+    settings = load_settings()
+    database = get_database(settings['database'])
+    results = {}
+    for department_name in department_names or legacy_departments():
+        storage = SQLiteStorage(department_name, database, settings, auto_migrate=False)
+        results[department_name] = migrate_department(storage, overwrite=overwrite)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python storage.py migrate [Department ...]
+    #        python storage.py export [Department ...]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate':
+        migrate(sys.argv[2:] or None)
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'export':
+        export(sys.argv[2:] or None)
+    else:
+        print("Usage: python storage.py migrate|export [Department ...]")
@@ -0,0 +1,162 @@
+import sys
+from collections import Counter
+
+from spend_rollup import LpoAggregate, parse_date, UNKNOWN_SUPPLIER
+from storage import get_storage, to_float
+
+# python supplier_performance.py Department [Supplier]
+
+
+def supplier_key(name):
+    return (name or '').strip().lower()
+
+
+def percentile(counts, fraction):
+    """Value at fraction (0-1) of a {value: count} distribution"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    wanted = fraction * (total - 1)
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen > wanted:
+            return value
+    return max(counts)
+
+
+class SupplierStats:
+    """Running delivery statistics of one supplier"""
+
+    def __init__(self, name):
+        self.name = name
+        self.lpos = 0
+        self.lead_days = Counter()
+        self.completed_due = 0
+        self.on_time = 0
+        self.ordered = 0.0
+        self.received = 0.0
+        self.complete_lines = 0
+        self.lines = 0
+
+    def adjust(self, contribution, sign):
+        self.lpos += sign
+        if contribution['lead_days'] is not None:
+            self.lead_days[contribution['lead_days']] += sign
+            if self.lead_days[contribution['lead_days']] <= 0:
+                del self.lead_days[contribution['lead_days']]
+        if contribution['on_time'] is not None:
+            self.completed_due += sign
+            self.on_time += sign * contribution['on_time']
+        self.ordered += sign * contribution['ordered']
+        self.received += sign * contribution['received']
+        self.complete_lines += sign * contribution['complete_lines']
+        self.lines += sign * contribution['lines']
+
+
+class SupplierPerformance(LpoAggregate):
+    """Lead time, on-time and fill-rate statistics per supplier from the approved LPOs.
+
+    - lead time: days from approval to an LPO's first delivery, kept as a
+      {days: LPOs} distribution for the median and 90th percentile
+    - on time: share of fully received LPOs whose last needed delivery came by
+      their required date
+    - fill rate: received share of the ordered quantity (capped per item) and
+      share of lines received in full
+    """
+
+    collections = ('lpo',)
+
+    def __init__(self, lpos, signature=None):
+        super().__init__({'lpo': lpos}, signature)
+        self.suppliers = {}
+        for lpo_number in self.lpo_numbers():
+            self.add(lpo_number)
+
+    def contribution(self, lpo_number):
+        lpo = self.records['lpo'][lpo_number]
+        ordered = {}
+        for item in lpo.get('items', []):
+            code = item.get('resource_code', '')
+            ordered[code] = ordered.get(code, 0.0) + (to_float(item.get('quantity')) or 0.0)
+
+        approved = parse_date(lpo.get('approval_date'))
+        deliveries = sorted(((parse_date(delivery.get('date')), delivery) for delivery in lpo.get('deliveries', [])
+                             if parse_date(delivery.get('date'))), key=lambda pair: pair[0])
+        received = {}
+        completed = None
+        for date, delivery in deliveries:
+            for code, qty in delivery.get('items', {}).items():
+                received[code] = received.get(code, 0.0) + (to_float(qty) or 0.0)
+            if completed is None and all(received.get(code, 0.0) >= qty for code, qty in ordered.items()):
+                completed = date
+
+        lead_days = None
+        if approved and deliveries:
+            lead_days = max((deliveries[0][0] - approved).days, 0)
+        required = parse_date(lpo.get('required_date'))
+        return {
+            'supplier': (lpo.get('supplier_name') or '').strip() or UNKNOWN_SUPPLIER,
+            'lead_days': lead_days,
+            'on_time': (completed <= required) if completed and required else None,
+            'ordered': sum(ordered.values()),
+            'received': sum(min(received.get(code, 0.0), qty) for code, qty in ordered.items()),
+            'complete_lines': sum(1 for code, qty in ordered.items() if received.get(code, 0.0) >= qty),
+            'lines': len(ordered)
+        }
+
+    def adjust(self, contribution, sign):
+        key = supplier_key(contribution['supplier'])
+        if key not in self.suppliers:
+            self.suppliers[key] = SupplierStats(contribution['supplier'])
+        stats = self.suppliers[key]
+        stats.adjust(contribution, sign)
+        if stats.lpos <= 0:
+            del self.suppliers[key]
+
+    def names(self):
+        return sorted(stats.name for stats in self.suppliers.values())
+
+    def stats(self, supplier):
+        """Statistics of a supplier (case-insensitive name), None when it has no LPOs"""
+        stats = self.suppliers.get(supplier_key(supplier))
+        if stats is None:
+            return None
+        deliveries = sum(stats.lead_days.values())
+        return {
+            'supplier': stats.name,
+            'lpos': stats.lpos,
+            'delivered_lpos': deliveries,
+            'lead_days_mean': (sum(days * count for days, count in stats.lead_days.items()) / deliveries
+                               if deliveries else None),
+            'lead_days_median': percentile(stats.lead_days, 0.5),
+            'lead_days_p90': percentile(stats.lead_days, 0.9),
+            'on_time_rate': stats.on_time / stats.completed_due if stats.completed_due else None,
+            'fill_rate': stats.received / stats.ordered if stats.ordered else None,
+            'line_fill_rate': stats.complete_lines / stats.lines if stats.lines else None
+        }
+
+
+def summary_text(stats):
+    """One line for a supplier's statistics (as shown in the PR form)"""
+    if stats is None:
+        return "No LPOs with this supplier yet"
+    parts = [f"{stats['lpos']} LPO{'s' if stats['lpos'] != 1 else ''}"]
+    if stats['lead_days_median'] is not None:
+        parts.append(f"lead time {stats['lead_days_median']}d median / {stats['lead_days_p90']}d p90")
+    if stats['on_time_rate'] is not None:
+        parts.append(f"on time {stats['on_time_rate']:.0%}")
+    if stats['fill_rate'] is not None:
+        parts.append(f"fill rate {stats['fill_rate']:.0%}")
+    return " · ".join(parts)
+
+
+def main(argv):
+    department_name = argv[0] if argv else 'Electrical'
+    performance = get_storage(department_name).supplier_performance()
+    for name in argv[1:] or performance.names():
+        print(f"{name}: {summary_text(performance.stats(name))}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,29 @@
+import pytest
+
+from benchmark import Run, bench_ui, make_dataset, table_rows
+
+
+def test_table_rows_are_iid_value_pairs():
+    lpos = make_dataset(100)['lpo'][:3]
+
+    rows = table_rows(lpos)
+
+    items = [item for lpo in lpos for item in lpo['items']]
+    assert len(rows) == len(items)
+    for i, (iid, values) in enumerate(rows):
+        assert iid == str(i)
+        assert values == (items[i]['resource_code'], items[i]['item_description'], items[i]['quantity'])
+
+
+def test_ui_benchmarks_time_every_render():
+    tk = pytest.importorskip('tkinter')
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    run = Run()
+
+    bench_ui(run, 100, make_dataset(100))
+
+    operations = [result['operation'] for result in run.results]
+    assert any(operation.startswith('table rows') for operation in operations)
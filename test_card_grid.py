@@ -0,0 +1,40 @@
+from card_grid import RecordCards, VersionCache, find_record
+
+
+def test_reloaded_records_keep_their_version():
+    calls = []
+    versions = VersionCache(lambda record: calls.append(record) or repr(record))
+    loaded = [{'lpo_number': 'L1', 'supplier_name': 'Gulf'}, {'lpo_number': 'L2', 'supplier_name': 'Delta'}]
+    first = [versions.get(record) for record in loaded]
+
+    # Filtering passes over the same objects do not fingerprint them again
+    versions.retain(loaded[:1])
+    versions.get(loaded[0])
+    assert len(calls) == 2
+
+    # A reload with the same content gives the same versions; a changed record a new one
+    reloaded = [dict(loaded[0]), dict(loaded[1], supplier_name='Falcon')]
+    versions.retain(reloaded)
+    assert [versions.get(record) for record in reloaded][0] == first[0]
+    assert versions.get(reloaded[1]) != first[1]
+
+
+class Listed(RecordCards):
+    def __init__(self, records):
+        self.records = records
+
+    def record(self, key):
+        return find_record(self.records, lambda record: record['pr_number'], key)
+
+
+def test_card_command_uses_the_current_record():
+    cards = Listed([{'pr_number': 'PR-001', 'status': 'Pending'}])
+    clicked = []
+    command = cards.command('PR-001', clicked.append)
+
+    cards.records = [{'pr_number': 'PR-001', 'status': 'Approved'}]
+    command()
+    cards.records = []
+    command()
+
+    assert clicked == [{'pr_number': 'PR-001', 'status': 'Approved'}]
@@ -0,0 +1,46 @@
+from inventory_highlight import LPO, PENDING, InventoryHighlights
+
+
+class Overview:
+    """Records the per-row highlight calls an InventoryOverview receives"""
+
+    def __init__(self):
+        self.calls = []
+
+    def highlight_code(self, layer, code):
+        self.calls.append(('highlight', layer, code))
+
+    def clear_code_highlight(self, layer, code):
+        self.calls.append(('clear', layer, code))
+
+
+def items(*codes):
+    return [{'resource_code': code} for code in codes]
+
+
+def test_only_changed_codes_are_repainted():
+    overview = Overview()
+    highlights = InventoryHighlights()
+    highlights.highlight(PENDING, items('R1', 'R2'))
+    highlights.attach(overview)
+    assert sorted(overview.calls) == [('highlight', PENDING, 'R1'), ('highlight', PENDING, 'R2')]
+
+    overview.calls = []
+    assert highlights.highlight(PENDING, items('r2 ', 'R3')) == 2
+    highlights.highlight(LPO, items('R2'))
+    highlights.highlight(PENDING, items('R2', 'R3'))
+    highlights.clear(LPO)
+    assert overview.calls == [('clear', PENDING, 'R1'), ('highlight', PENDING, 'R3'),
+                              ('highlight', LPO, 'R2'), ('clear', LPO, 'R2')]
+
+
+def test_a_new_table_gets_the_highlights_and_the_old_one_is_cleared():
+    old, new = Overview(), Overview()
+    highlights = InventoryHighlights()
+    highlights.attach(old)
+    highlights.highlight(LPO, items('R1'))
+
+    highlights.attach(new)
+
+    assert old.calls == [('highlight', LPO, 'R1'), ('clear', LPO, 'R1')]
+    assert new.calls == [('highlight', LPO, 'R1')]
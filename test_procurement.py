@@ -0,0 +1,18 @@
+from procurement import delivery_lines
+
+
+def test_delivery_lines_of_lpo_with_deliveries():
+    lpo = {
+        'lpo_number': 'LPO-001',
+        'items': [{'resource_code': 'R1', 'item_description': 'Cable 4mm', 'unit': 'Mtr', 'quantity': 100},
+                  {'resource_code': 'R2', 'item_description': 'Breaker', 'unit': 'Nos', 'quantity': 4}],
+        'deliveries': [{'date': '2025-01-05', 'items': {'R1': 60.0}},
+                       {'date': '2025-01-09', 'items': {'R1': 40.0, 'R2': 4.0, 'R9': 1.0}}]
+    }
+
+    history = [delivery_lines(lpo, delivery) for delivery in lpo['deliveries']]
+
+    assert history == [
+        [('R1', 'Cable 4mm', 'Mtr', 60.0)],
+        [('R1', 'Cable 4mm', 'Mtr', 40.0), ('R2', 'Breaker', 'Nos', 4.0), ('R9', 'N/A', 'Nos', 1.0)]
+    ]
@@ -0,0 +1,86 @@
+import pytest
+
+from events import VIEW_LOADED, event_bus
+from startup_profile import PROFILE_VIEW, StartupProfile
+
+
+class Root:
+    """Runs Tk callbacks when the test says so"""
+
+    def __init__(self):
+        self.bindings = {}
+        self.callbacks = []
+        self.destroyed = False
+
+    def bind(self, sequence, func, add=None):
+        self.bindings[sequence] = func
+
+    def after(self, ms, func):
+        self.callbacks.append((ms, func))
+
+    def after_idle(self, func):
+        self.after(0, func)
+
+    def update_idletasks(self):
+        pass
+
+    def destroy(self):
+        self.destroyed = True
+
+    def run_due(self):
+        due = [func for ms, func in self.callbacks if ms == 0]
+        self.callbacks = [(ms, func) for ms, func in self.callbacks if ms != 0]
+        for func in due:
+            func()
+
+
+class Department:
+    def __init__(self):
+        self.tabs = []
+
+    def show_tab(self, tab_name, current_subtab=None):
+        self.tabs.append((tab_name, current_subtab))
+
+
+class App:
+    def __init__(self):
+        self.department = Department()
+
+    def show_department(self, department):
+        return self.department
+
+
+def test_interactive_is_marked_when_the_view_shows_its_load(tmp_path):
+    profile = StartupProfile(str(tmp_path / 'profile.json'), 'Electrical', budget_ms=10 ** 6)
+    root, app = Root(), App()
+    profile.run(root, app)
+
+    root.run_due()
+    assert 'first_paint_ms' not in profile.marks
+    root.bindings['<Expose>'](None)
+    root.run_due()
+    assert app.department.tabs == [PROFILE_VIEW]
+    assert 'department_interactive_ms' not in profile.marks
+
+    event_bus.publish(VIEW_LOADED, department='Plumbing', view='pending_prs')
+    event_bus.publish(VIEW_LOADED, department='Electrical', view='pending_prs')
+    root.run_due()
+
+    assert root.destroyed
+    report = profile.report()
+    assert report['marks']['first_paint_ms'] <= report['marks']['department_interactive_ms']
+    assert not report['over_budget']
+
+
+def test_a_view_that_fails_to_load_is_over_budget(tmp_path):
+    profile = StartupProfile(str(tmp_path / 'profile.json'), 'Electrical', budget_ms=10 ** 6)
+    root = Root()
+    profile.run(root, App())
+    root.bindings['<Expose>'](None)
+    root.run_due()
+
+    event_bus.publish(VIEW_LOADED, department='Electrical', view='pending_prs', error='unreadable')
+    with pytest.raises(SystemExit) as exit:
+        root.run_due()
+    assert exit.value.code == 1
+    assert 'department_interactive_ms' not in profile.marks
@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+import storage
+from events import DATA_CHANGED, event_bus
+from procurement import ProcurementService
+from storage import JournalStorage, JsonStorage, SQLiteDatabase, SQLiteStorage
+
+SETTINGS = {'backend': 'journal', 'journal_compact_bytes': 10 ** 9}
+
+
+def lpo(number):
+    return {'lpo_number': number, 'supplier_name': 'Gulf', 'items': [{'resource_code': 'R1', 'quantity': 5}]}
+
+
+def journal_with_two_collections():
+    s = JournalStorage('A', SETTINGS)
+    s.insert('lpo', lpo('L1'))
+    s.add_delivery('L1', {'date': '2025-01-05', 'items': {'R1': 2}})
+    s.insert('archived_lpos', lpo('L1'))
+    return s
+
+
+def snapshot(s):
+    lpos = [(r['lpo_number'], len(r.get('deliveries', []))) for r in s.replay('lpo')]
+    return lpos, [r['lpo_number'] for r in s.replay('archived_lpos')]
+
+
+EXPECTED = ([('L1', 1)], ['L1'])
+
+
+class Crash(Exception):
+    pass
+
+
+def fail_on_call(monkeypatch, name, call):
+    """Make storage.<name> raise on its call-th use"""
+    original = getattr(storage, name)
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == call:
+            raise Crash(name)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(storage, name, failing)
+
+
+@pytest.mark.parametrize('name, call', [('save_data', 2), ('save_data', 3), ('rotate_backups', 2)])
+def test_interrupted_compaction_applies_each_entry_once(tmp_path, monkeypatch, name, call):
+    monkeypatch.chdir(tmp_path)
+    s = journal_with_two_collections()
+    fail_on_call(monkeypatch, name, call)
+    s.compact()
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+
+    # A restart sees the same records, and the next compaction completes
+    restarted = JournalStorage('A', SETTINGS)
+    assert snapshot(restarted) == EXPECTED
+    restarted.compact()
+    assert snapshot(restarted) == EXPECTED
+    assert not (tmp_path / restarted.sealed_path).exists()
+    assert not (tmp_path / restarted.manifest_path).exists()
+    assert restarted.read_journal() == []
+
+
+def test_writes_after_interrupted_compaction_are_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s = journal_with_two_collections()
+    fail_on_call(monkeypatch, 'save_data', 2)
+    s.compact()
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+
+    s.insert('lpo', lpo('L2'))
+    s.compact()
+    s.compact()
+    assert snapshot(JournalStorage('A', SETTINGS)) == ([('L1', 1), ('L2', 0)], ['L1'])
+
+
+def test_appends_go_on_while_compaction_folds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s = journal_with_two_collections()
+    save_data = storage.save_data
+    appended = []
+
+    def save_while_appending(path, *args):
+        if path.endswith('.compact') and not appended:
+            writer = threading.Thread(target=lambda: (s.insert('lpo', lpo('L2')), appended.append(True)))
+            writer.start()
+            writer.join(5)
+        return save_data(path, *args)
+    monkeypatch.setattr(storage, 'save_data', save_while_appending)
+    s.compact()
+
+    assert appended == [True]
+    assert s.compactor is None
+    assert len(s.read_journal()) == 1
+    assert snapshot(JournalStorage('A', SETTINGS)) == ([('L1', 1), ('L2', 0)], ['L1'])
+
+
+def test_exists_does_not_reparse_the_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s = journal_with_two_collections()
+    assert s.exists('lpo') and not s.exists('pending_prs')
+
+    def read_journal(path=None):
+        raise AssertionError("journal parsed again")
+    monkeypatch.setattr(s, 'read_journal', read_journal)
+    s.insert('pending_prs', {'pr_number': 'PR-001', 'items': []})
+    assert s.exists('pending_prs') and not s.exists('rejected_prs')
+
+
+BACKENDS = {
+    'json': lambda: JsonStorage('A', {'backend': 'json'}),
+    'journal': lambda: JournalStorage('A', SETTINGS),
+    'sqlite': lambda: SQLiteStorage('A', SQLiteDatabase('test.db'), {'backend': 'sqlite'}, auto_migrate=False)
+}
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_batch_is_announced_once(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    s = BACKENDS[backend]()
+    s.save('pending_prs', [{'pr_number': f'PR-00{i}', 'lpo_number': f'M{i}', 'supplier_name': 'Gulf',
+                            'phone_number': '+971 50', 'items': []} for i in range(5)])
+    events = []
+    subscription = event_bus.subscribe(DATA_CHANGED, events.append, department='A')
+    try:
+        ProcurementService(s).approve_prs(s.load('pending_prs'))
+    finally:
+        event_bus.unsubscribe(subscription)
+
+    assert [(event['collection'], event['operation']) for event in events] == [
+        ('lpo', 'batch'), ('pending_prs', 'batch')]
+    assert len(s.load('lpo')) == 5
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from inventory_overview import InventoryOverview
+from inventory_highlight import register_inventory
 
 class ViewDetails:
     def __init__(self, parent_frame, department_name, include_inventory=False):
@@ -39,6 +40,7 @@ class ViewDetails:
             
             self.inventory_overview = InventoryOverview(left_frame, self.department_name)
             self.inventory_overview.set_details_callback(self.update_details)
+            register_inventory(self.department_name, self.inventory_overview)
             
             # Right side - Additional content area
             right_frame = tk.Frame(main_container, bg='#ecf0f1')